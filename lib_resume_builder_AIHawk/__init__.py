@@ -1,6 +1,37 @@
 __version__ = '0.1'
 
-from .resume_generator import ResumeGenerator
-from .style_manager import StyleManager
-from .manager_facade import FacadeManager
-from .resume import Resume
\ No newline at end of file
+import importlib
+from typing import TYPE_CHECKING
+
+# Le classi pubbliche si importano al primo accesso: chi legge solo un Resume o
+# elenca gli stili non carica langchain, openai e selenium
+_LAZY_ATTRIBUTES = {
+    "ResumeGenerator": "lib_resume_builder_AIHawk.resume_generator",
+    "StyleManager": "lib_resume_builder_AIHawk.style_manager",
+    "AsyncFacadeManager": "lib_resume_builder_AIHawk.manager_facade",
+    "FacadeManager": "lib_resume_builder_AIHawk.manager_facade",
+    "Resume": "lib_resume_builder_AIHawk.resume",
+    "setup": "lib_resume_builder_AIHawk.bootstrap",
+}
+
+__all__ = list(_LAZY_ATTRIBUTES)
+
+if TYPE_CHECKING:
+    from .bootstrap import setup
+    from .manager_facade import AsyncFacadeManager, FacadeManager
+    from .resume import Resume
+    from .resume_generator import ResumeGenerator
+    from .style_manager import StyleManager
+
+
+def __getattr__(name):
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
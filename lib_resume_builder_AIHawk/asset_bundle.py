@@ -0,0 +1,406 @@
+import argparse
+import base64
+import hashlib
+import html as html_lib
+import io
+import json
+import logging
+import os
+import re
+import threading
+import time
+import urllib.parse
+import urllib.request
+from functools import lru_cache
+from pathlib import Path
+from string import Template
+from typing import FrozenSet, Iterable, List, Optional, Set
+from lib_resume_builder_AIHawk.config import global_config
+
+logger = logging.getLogger(__name__)
+
+# Google Fonts restituisce woff2 solo a user agent recenti
+DOWNLOAD_USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+DOWNLOAD_TIMEOUT = 15
+
+FONT_FORMAT_PREFERENCE = ["woff2", "woff", "truetype", "opentype"]
+FONT_MIME_TYPES = {
+    ".woff2": "font/woff2",
+    ".woff": "font/woff",
+    ".ttf": "font/ttf",
+    ".otf": "font/otf",
+}
+
+LINK_STYLESHEET_RE = re.compile(r'<link\b[^>]*\brel=["\']stylesheet["\'][^>]*>', re.IGNORECASE)
+HREF_RE = re.compile(r'\bhref=["\']([^"\']+)["\']', re.IGNORECASE)
+IMPORT_RE = re.compile(r'@import\s+(?:url\(\s*)?(?:"([^"]+)"|\'([^\']+)\'|([^"\')\s;]+))\s*\)?[^;]*;', re.IGNORECASE)
+FONT_FACE_RE = re.compile(r'@font-face\s*\{[^}]*\}', re.IGNORECASE)
+FONT_SOURCE_RE = re.compile(r'url\(\s*["\']?([^"\')]+)["\']?\s*\)(?:\s*format\(\s*["\']?([^"\')]+)["\']?\s*\))?', re.IGNORECASE)
+LOCAL_FONT_RE = re.compile(r'url\("fonts/([^"]+)"\)')
+UNICODE_RANGE_RE = re.compile(r'unicode-range\s*:\s*([^;}]+)', re.IGNORECASE)
+ICON_SELECTOR_RE = re.compile(r'^\.fa-([\w-]+)::?before$')
+CLASS_ATTRIBUTE_RE = re.compile(r'\bclass=["\']([^"\']*)["\']', re.IGNORECASE)
+CSS_CONTENT_RE = re.compile(r'content\s*:\s*"((?:\\.|[^"\\])*)"|content\s*:\s*\'((?:\\.|[^\'\\])*)\'')
+CSS_ESCAPE_RE = re.compile(r'\\([0-9a-fA-F]{1,6})\s?|\\(.)')
+TAG_RE = re.compile(r'<(script|style)\b.*?</\1\s*>|<[^>]+>', re.DOTALL | re.IGNORECASE)
+
+
+def _is_remote(url: str) -> bool:
+    return url.startswith(("http://", "https://", "//"))
+
+
+def _import_url(match) -> str:
+    return next(group for group in match.groups() if group)
+
+
+def _fetch(url: str) -> bytes:
+    if url.startswith("//"):
+        url = "https:" + url
+    request = urllib.request.Request(url, headers={"User-Agent": DOWNLOAD_USER_AGENT})
+    with urllib.request.urlopen(request, timeout=DOWNLOAD_TIMEOUT) as response:
+        return response.read()
+
+
+def _url_key(url: str) -> str:
+    return hashlib.sha1(url.encode("utf-8")).hexdigest()[:16]
+
+
+def text_codepoints(html: str) -> Set[int]:
+    # Caratteri effettivamente visibili nel documento, piu' l'ASCII stampabile per sicurezza
+    text = html_lib.unescape(TAG_RE.sub(" ", html))
+    return {ord(char) for char in text} | set(range(0x20, 0x7F))
+
+
+def used_icon_names(html: str) -> Set[str]:
+    icons = set()
+    for classes in CLASS_ATTRIBUTE_RE.findall(html):
+        icons.update(name[3:] for name in classes.split() if name.startswith("fa-"))
+    return icons
+
+
+def _decode_css_string(value: str) -> str:
+    return CSS_ESCAPE_RE.sub(lambda m: chr(int(m.group(1), 16)) if m.group(1) else m.group(2), value)
+
+
+def _css_content_codepoints(css: str) -> Set[int]:
+    codepoints = set()
+    for double_quoted, single_quoted in CSS_CONTENT_RE.findall(css):
+        codepoints.update(ord(char) for char in _decode_css_string(double_quoted or single_quoted))
+    return codepoints
+
+
+def _top_level_rules(css: str) -> List[tuple]:
+    # (inizio, fine, selettore) delle regole di primo livello, ignorando i commenti
+    rules = []
+    depth = 0
+    rule_start = 0
+    selector_end = 0
+    i = 0
+    while i < len(css):
+        if css.startswith("/*", i):
+            end = css.find("*/", i + 2)
+            i = len(css) if end == -1 else end + 2
+            if depth == 0:
+                rule_start = i
+            continue
+        char = css[i]
+        if char == "{":
+            if depth == 0:
+                selector_end = i
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                rules.append((rule_start, i + 1, css[rule_start:selector_end]))
+                rule_start = i + 1
+        elif char == ";" and depth == 0:
+            rule_start = i + 1
+        i += 1
+    return rules
+
+
+def prune_icon_rules(css: str, used_icons: Set[str]) -> str:
+    # Elimina le regole .fa-xxx:before delle icone che il documento non usa
+    pieces = []
+    last = 0
+    for start, end, selector in _top_level_rules(css):
+        selectors = [s.strip() for s in selector.split(",")]
+        matches = [ICON_SELECTOR_RE.match(s) for s in selectors]
+        if selectors and all(matches) and not any(m.group(1) in used_icons for m in matches):
+            pieces.append(css[last:start])
+            last = end
+    pieces.append(css[last:])
+    return "".join(pieces)
+
+
+def _unicode_range_matches(unicode_range: str, codepoints: Set[int]) -> bool:
+    for part in unicode_range.split(","):
+        part = part.strip().upper()
+        if not part.startswith("U+"):
+            continue
+        part = part[2:]
+        if "?" in part:
+            low, high = int(part.replace("?", "0"), 16), int(part.replace("?", "F"), 16)
+        elif "-" in part:
+            low, high = (int(bound, 16) for bound in part.split("-", 1))
+        else:
+            low = high = int(part, 16)
+        if any(low <= codepoint <= high for codepoint in codepoints):
+            return True
+    return False
+
+
+@lru_cache(maxsize=None)
+def _font_tools():
+    # fontTools e' opzionale e lento da importare: si carica al primo font da incorporare
+    try:
+        from fontTools import subset
+        from fontTools.ttLib import TTFont
+    except ImportError:
+        return None
+    return subset, TTFont
+
+
+def font_subsetting_available() -> bool:
+    return _font_tools() is not None
+
+
+@lru_cache(maxsize=128)
+def _font_data_uri(font_path: str, codepoints: Optional[FrozenSet[int]]) -> Optional[str]:
+    # None se il font non contiene nessuno dei caratteri richiesti
+    data = Path(font_path).read_bytes()
+    font_tools = _font_tools()
+    if font_tools is not None and codepoints is not None:
+        font_subset, TTFont = font_tools
+        try:
+            font = TTFont(io.BytesIO(data))
+            cmap = font.getBestCmap() or {}
+            wanted = [codepoint for codepoint in codepoints if codepoint in cmap]
+            if not wanted:
+                return None
+            options = font_subset.Options()
+            options.flavor = font.flavor
+            subsetter = font_subset.Subsetter(options)
+            subsetter.populate(unicodes=wanted)
+            subsetter.subset(font)
+            output = io.BytesIO()
+            font.save(output)
+            data = output.getvalue()
+        except Exception as e:
+            logger.debug(f"Font subsetting failed for {font_path}, embedding the full font: {e}")
+    mime_type = FONT_MIME_TYPES.get(Path(font_path).suffix.lower(), "application/octet-stream")
+    return f"data:{mime_type};base64,{base64.b64encode(data).decode('ascii')}"
+
+
+class AssetBundle:
+    """Local copy of the remote stylesheets and fonts used by the resume templates.
+
+    Stylesheets are stored with their @font-face sources rewritten to local
+    font files, so `inline` can turn a document into a fully self-contained one
+    (fonts as subsetted data URIs) that renders without any network access.
+    """
+
+    def __init__(self, directory: Path = None):
+        self.directory = Path(directory or global_config.ASSETS_DIRECTORY)
+        self._lock = threading.Lock()
+        self._manifest = None
+        # url -> istante del download fallito: si riprova dopo ASSETS_RETRY_INTERVAL
+        self._failed_urls = {}
+        self._reported_missing = set()
+
+    @property
+    def manifest(self) -> dict:
+        if self._manifest is None:
+            try:
+                with open(self.directory / "manifest.json", "r", encoding="utf-8") as f:
+                    self._manifest = json.load(f)
+            except (FileNotFoundError, ValueError):
+                self._manifest = {}
+        return self._manifest
+
+    def _save_manifest(self):
+        manifest_path = self.directory / "manifest.json"
+        temp_path = manifest_path.with_suffix(f".{os.getpid()}.tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, indent=2, sort_keys=True)
+        os.replace(temp_path, manifest_path)
+
+    def stylesheet(self, url: str) -> Optional[str]:
+        name = self.manifest.get(url)
+        if name is None:
+            if not global_config.ASSETS_DOWNLOAD_MISSING:
+                if url not in self._reported_missing:
+                    self._reported_missing.add(url)
+                    logger.warning(f"{url} is not in the asset bundle at {self.directory}, {_missing_fallback()}; "
+                                   f"run `python -m lib_resume_builder_AIHawk.asset_bundle` to prefetch the assets")
+                return None
+            failed_at = self._failed_urls.get(url)
+            if failed_at is not None and time.monotonic() - failed_at < global_config.ASSETS_RETRY_INTERVAL:
+                return None
+            try:
+                name = self.download_stylesheet(url)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Could not add {url} to the asset bundle, {_missing_fallback()}: {e}")
+                self._failed_urls[url] = time.monotonic()
+                return None
+            self._failed_urls.pop(url, None)
+        return (self.directory / "css" / name).read_text(encoding="utf-8")
+
+    def download_stylesheet(self, url: str) -> str:
+        css = _fetch(url).decode("utf-8")
+        css = FONT_FACE_RE.sub(lambda m: self._localize_font_face(m.group(0), url), css)
+        css = IMPORT_RE.sub(lambda m: f'@import url("{urllib.parse.urljoin(url, _import_url(m))}");', css)
+        name = f"{_url_key(url)}.css"
+        with self._lock:
+            (self.directory / "css").mkdir(parents=True, exist_ok=True)
+            (self.directory / "css" / name).write_text(css, encoding="utf-8")
+            self.manifest[url] = name
+            self._save_manifest()
+        return name
+
+    def _localize_font_face(self, block: str, base_url: str) -> str:
+        sources = FONT_SOURCE_RE.findall(block)
+        if not sources:
+            return block
+        # Si tiene un solo formato, il migliore disponibile
+        ranked = sorted(
+            sources,
+            key=lambda s: FONT_FORMAT_PREFERENCE.index(s[1].lower()) if s[1].lower() in FONT_FORMAT_PREFERENCE else len(FONT_FORMAT_PREFERENCE),
+        )
+        font_url, font_format = ranked[0]
+        font_name = self._download_font(urllib.parse.urljoin(base_url, font_url))
+        body = block[block.index("{") + 1:-1]
+        declarations = [d.strip() for d in body.split(";") if d.strip() and not d.strip().lower().startswith("src")]
+        declarations.append(f'src:url("fonts/{font_name}") format("{font_format or "woff2"}")')
+        return "@font-face{" + ";".join(declarations) + "}"
+
+    def _download_font(self, url: str) -> str:
+        extension = Path(urllib.parse.urlparse(url).path).suffix.lower() or ".woff2"
+        name = f"{_url_key(url)}{extension}"
+        font_path = self.directory / "fonts" / name
+        if not font_path.is_file():
+            data = _fetch(url)
+            font_path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = font_path.with_suffix(f".{os.getpid()}.tmp")
+            temp_path.write_bytes(data)
+            os.replace(temp_path, font_path)
+        return name
+
+    def _load_stylesheet(self, href: str, seen: Set[str]) -> Optional[str]:
+        if _is_remote(href):
+            css = self.stylesheet(href)
+        elif href.startswith("data:text/css;base64,"):
+            css = base64.b64decode(href.split(",", 1)[1]).decode("utf-8")
+        else:
+            path = urllib.request.url2pathname(urllib.parse.urlparse(href).path) if href.startswith("file:") else href
+            try:
+                css = Path(path).read_text(encoding="utf-8")
+            except OSError:
+                return None
+        if css is None:
+            return None
+
+        def resolve_import(match):
+            url = _import_url(match)
+            if url in seen:
+                return ""
+            seen.add(url)
+            css = self._load_stylesheet(url, seen)
+            if css is None and _is_remote(url) and not global_config.ASSETS_STRICT_OFFLINE:
+                # Non e' nel bundle: resta l'@import verso il CDN
+                return f'@import url("{url}");'
+            return css or ""
+
+        return IMPORT_RE.sub(resolve_import, css)
+
+    def _embed_fonts(self, css: str, codepoints: FrozenSet[int]) -> str:
+        def embed(match):
+            block = match.group(0)
+            unicode_range = UNICODE_RANGE_RE.search(block)
+            if unicode_range and not _unicode_range_matches(unicode_range.group(1), codepoints):
+                return ""
+            local_font = LOCAL_FONT_RE.search(block)
+            if local_font is None:
+                return block
+            data_uri = _font_data_uri(str(self.directory / "fonts" / local_font.group(1)), codepoints)
+            if data_uri is None:
+                return ""
+            return block.replace(local_font.group(0), f'url("{data_uri}")')
+
+        return FONT_FACE_RE.sub(embed, css)
+
+    def inline(self, html: str) -> str:
+        # Sostituisce ogni <link rel="stylesheet"> con il CSS locale; quelli remoti non in bundle restano link al CDN
+        # (o vengono rimossi con ASSETS_STRICT_OFFLINE)
+        used_icons = used_icon_names(html)
+        codepoints = text_codepoints(html)
+        seen = set()
+
+        def replace_link(match):
+            href = HREF_RE.search(match.group(0))
+            if href is None:
+                return match.group(0)
+            href = html_lib.unescape(href.group(1))
+            if href in seen:
+                return ""
+            seen.add(href)
+            css = self._load_stylesheet(href, seen)
+            if css is None:
+                return "" if _is_remote(href) and global_config.ASSETS_STRICT_OFFLINE else match.group(0)
+            # Gli @import rimasti valgono solo in testa al foglio di stile
+            imports = [m.group(0) for m in IMPORT_RE.finditer(css)]
+            css = "\n".join(imports + [IMPORT_RE.sub("", css)])
+            css = prune_icon_rules(css, used_icons)
+            css = self._embed_fonts(css, frozenset(codepoints | _css_content_codepoints(css)))
+            return f"<style>\n{css}\n</style>"
+
+        return LINK_STYLESHEET_RE.sub(replace_link, html)
+
+
+def _missing_fallback() -> str:
+    return "rendering without it" if global_config.ASSETS_STRICT_OFFLINE else "falling back to the CDN"
+
+
+def remote_stylesheet_urls(styles_directory: Path = None) -> List[str]:
+    # Tutti i CSS remoti usati dal template HTML e dagli stili inclusi
+    styles_directory = Path(styles_directory or global_config.STYLES_DIRECTORY or Path(__file__).resolve().parent / "resume_style")
+    template = Template(global_config.html_template).safe_substitute(style_path="", markdown="")
+    hrefs = (HREF_RE.search(link) for link in LINK_STYLESHEET_RE.findall(template))
+    urls = [html_lib.unescape(href.group(1)) for href in hrefs if href is not None]
+    for style_file in sorted(styles_directory.glob("*.css")):
+        urls.extend(_import_url(match) for match in IMPORT_RE.finditer(style_file.read_text(encoding="utf-8")))
+    return [url for url in dict.fromkeys(urls) if _is_remote(url)]
+
+
+def prepare_asset_bundle(directory: Path = None, urls: Iterable[str] = None) -> AssetBundle:
+    bundle = AssetBundle(directory)
+    for url in urls or remote_stylesheet_urls():
+        logger.info(f"Bundling {url}")
+        bundle.download_stylesheet(url)
+    return bundle
+
+
+_asset_bundle = None
+_asset_bundle_lock = threading.Lock()
+
+
+def get_asset_bundle() -> AssetBundle:
+    global _asset_bundle
+    with _asset_bundle_lock:
+        if _asset_bundle is None or _asset_bundle.directory != Path(global_config.ASSETS_DIRECTORY):
+            _asset_bundle = AssetBundle()
+        return _asset_bundle
+
+
+def main(argv=None):
+    # Unico passo che accede alla rete: il rendering usa solo il bundle preparato qui
+    parser = argparse.ArgumentParser(description="Download the fonts and icon stylesheets used by the resume templates for offline rendering.")
+    parser.add_argument("--directory", type=Path, default=None, help="Target directory (defaults to global_config.ASSETS_DIRECTORY)")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    prepared = prepare_asset_bundle(args.directory)
+    print(f"Asset bundle ready in {prepared.directory} ({len(prepared.manifest)} stylesheets)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+import logging
+import os
+import threading
+
+LOG_FOLDER = "log"
+LOG_FILE_NAME = "app.log"
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+_setup_done = False
+_setup_lock = threading.Lock()
+
+
+def setup(log_folder: str = LOG_FOLDER, level: int = logging.INFO, load_env: bool = True):
+    """Process-wide setup that used to run when the package was imported:
+    loads `.env` into the environment and sends log records to
+    `<log_folder>/app.log`. The library never calls it; applications call
+    it once at startup if they want this behaviour. Only the first call has
+    an effect; pass `log_folder=None` to leave logging to the application."""
+    global _setup_done
+    with _setup_lock:
+        if _setup_done:
+            return
+        _setup_done = True
+        if load_env:
+            from dotenv import load_dotenv
+            load_dotenv()
+        if log_folder is not None:
+            os.makedirs(log_folder, exist_ok=True)
+            # Come prima: nessun effetto se l'applicazione ha gia' configurato il logging
+            logging.basicConfig(
+                level=level,
+                format=LOG_FORMAT,
+                handlers=[logging.FileHandler(os.path.join(log_folder, LOG_FILE_NAME), encoding="utf-8")],
+            )
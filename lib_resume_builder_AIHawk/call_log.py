@@ -0,0 +1,187 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from lib_resume_builder_AIHawk.config import global_config
+
+logger = logging.getLogger(__name__)
+
+CALL_LOG_FILE_NAME = "open_ai_calls.jsonl"
+# Sezione del resume per cui si sta chiamando il modello (finisce nel log di ogni chiamata)
+current_llm_section: ContextVar = ContextVar("current_llm_section", default=None)
+
+
+@contextmanager
+def llm_section(section: str):
+    token = current_llm_section.set(section)
+    try:
+        yield
+    finally:
+        current_llm_section.reset(token)
+
+
+class CallLogWriter:
+    """Appends LLM call records to a JSONL file from a background thread.
+
+    `write()` only puts the record on a bounded queue and never waits: when
+    the queue is full the record is dropped and counted. The writer thread
+    writes whatever has queued up as one batch, flushes at most every
+    `flush_interval` seconds, and rotates the file to `.1`, `.2`, ... once it
+    exceeds `max_bytes` or is older than `rotate_interval` seconds.
+    """
+
+    def __init__(self, path: Path, max_bytes: int = None, rotate_interval: float = None, backup_count: int = None,
+                 flush_interval: float = None, queue_size: int = 10000):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.rotate_interval = rotate_interval
+        self.backup_count = backup_count
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self.written = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._file = None
+        self._opened_at = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="llm-call-log", daemon=True)
+        self._thread.start()
+
+    def write(self, entry: dict):
+        if self._closed:
+            return
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self, timeout: float = None):
+        # Attende che i record gia' in coda siano su disco (per i test e prima di uscire)
+        if self._closed:
+            return True
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def close(self, timeout: float = 5):
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+
+    def _open(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8")
+        # Dopo un riavvio l'eta' del file conta dall'ultima modifica
+        self._opened_at = os.path.getmtime(self.path) if self._file.tell() else time.time()
+
+    def _should_rotate(self) -> bool:
+        if self.max_bytes and self._file.tell() >= self.max_bytes:
+            return True
+        return bool(self.rotate_interval) and self._file.tell() > 0 and time.time() - self._opened_at >= self.rotate_interval
+
+    def _rotate(self):
+        self._file.close()
+        if self.backup_count:
+            for i in range(self.backup_count - 1, 0, -1):
+                source = self.path.with_name(f"{self.path.name}.{i}")
+                if source.exists():
+                    os.replace(source, self.path.with_name(f"{self.path.name}.{i + 1}"))
+            os.replace(self.path, self.path.with_name(f"{self.path.name}.1"))
+        else:
+            self.path.unlink()
+        self._open()
+
+    def _write_batch(self, entries: list):
+        if self._file is None:
+            self._open()
+        for entry in entries:
+            self._file.write(json.dumps(entry, ensure_ascii=False, separators=(",", ":"), default=str) + "\n")
+            self.written += 1
+            if self._should_rotate():
+                self._file.flush()
+                self._rotate()
+
+    def _run(self):
+        pending = []
+        last_flush = time.monotonic()
+        running = True
+        while running:
+            try:
+                item = self._queue.get(timeout=self.flush_interval or None)
+            except queue.Empty:
+                item = False
+            waiting = []
+            # Tutto cio' che e' gia' in coda va nello stesso batch
+            while item is not False:
+                if item is None:
+                    running = False
+                elif isinstance(item, threading.Event):
+                    waiting.append(item)
+                else:
+                    pending.append(item)
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    item = False
+            try:
+                if pending:
+                    self._write_batch(pending)
+                    pending = []
+                now = time.monotonic()
+                if self._file is not None and (waiting or not running or now - last_flush >= (self.flush_interval or 0)):
+                    self._file.flush()
+                    last_flush = now
+            except OSError as e:
+                logger.error(f"Failed to write LLM call log {self.path}: {e}")
+                pending = []
+            for event in waiting:
+                event.set()
+        if self._file is not None:
+            self._file.close()
+
+
+_call_log_writers = {}
+_call_log_writers_lock = threading.Lock()
+
+
+def _close_call_log_writers():
+    with _call_log_writers_lock:
+        writers = list(_call_log_writers.values())
+        _call_log_writers.clear()
+    for writer in writers:
+        writer.close()
+
+
+atexit.register(_close_call_log_writers)
+
+
+def get_call_log_writer() -> CallLogWriter:
+    # Un writer per cartella di log; None finche' LOG_OUTPUT_FILE_PATH non e' impostato
+    if global_config.LOG_OUTPUT_FILE_PATH is None:
+        return None
+    path = Path(global_config.LOG_OUTPUT_FILE_PATH) / CALL_LOG_FILE_NAME
+    with _call_log_writers_lock:
+        writer = _call_log_writers.get(path)
+        if writer is None:
+            writer = CallLogWriter(
+                path,
+                max_bytes=global_config.LLM_CALL_LOG_MAX_BYTES,
+                rotate_interval=global_config.LLM_CALL_LOG_ROTATE_INTERVAL,
+                backup_count=global_config.LLM_CALL_LOG_BACKUP_COUNT,
+                flush_interval=global_config.LLM_CALL_LOG_FLUSH_INTERVAL,
+            )
+            _call_log_writers[path] = writer
+        return writer
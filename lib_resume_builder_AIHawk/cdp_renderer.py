@@ -0,0 +1,431 @@
+import asyncio
+import base64
+import json
+import logging
+import os
+import platform
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import List
+import websockets
+from lib_resume_builder_AIHawk.config import global_config
+from lib_resume_builder_AIHawk.renderer import Renderer
+from lib_resume_builder_AIHawk.tracing import span
+from lib_resume_builder_AIHawk.utils import PAGE_READY_FUNCTION, PDF_PRINT_OPTIONS, PDF_STREAM_CHUNK_SIZE, page_quiet_timeout_ms
+
+logger = logging.getLogger(__name__)
+
+CHROME_ARGUMENTS = [
+    "--headless=new",
+    "--no-sandbox",
+    "--disable-dev-shm-usage",
+    "--disable-gpu",
+    "--disable-extensions",
+    "--disable-background-networking",
+    "--disable-background-timer-throttling",
+    "--disable-backgrounding-occluded-windows",
+    "--disable-renderer-backgrounding",
+    "--disable-translate",
+    "--disable-popup-blocking",
+    "--no-first-run",
+    "--no-default-browser-check",
+    "--hide-scrollbars",
+    "--mute-audio",
+]
+
+CHROME_EXECUTABLE_NAMES = ["google-chrome", "google-chrome-stable", "chromium", "chromium-browser", "chrome"]
+
+CHROME_EXECUTABLE_PATHS = {
+    "Darwin": ["/Applications/Google Chrome.app/Contents/MacOS/Google Chrome"],
+    "Windows": [
+        os.path.expandvars(r"%ProgramFiles%\Google\Chrome\Application\chrome.exe"),
+        os.path.expandvars(r"%ProgramFiles(x86)%\Google\Chrome\Application\chrome.exe"),
+        os.path.expandvars(r"%LocalAppData%\Google\Chrome\Application\chrome.exe"),
+    ],
+}
+
+
+def find_chrome_binary() -> str:
+    configured = global_config.CHROME_BINARY_PATH or os.environ.get("CHROME_PATH")
+    if configured:
+        return str(configured) if os.path.isfile(configured) else None
+    for name in CHROME_EXECUTABLE_NAMES:
+        path = shutil.which(name)
+        if path:
+            return path
+    for path in CHROME_EXECUTABLE_PATHS.get(platform.system(), []):
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+class CDPError(RuntimeError):
+    pass
+
+
+class CDPConnection:
+    """Minimal DevTools protocol client over the browser websocket, with flattened target sessions."""
+
+    def __init__(self, websocket):
+        self._websocket = websocket
+        self._next_id = 0
+        self._pending = {}
+        self._event_waiters = []
+        self.closed = False
+        self._reader = asyncio.ensure_future(self._read_loop())
+
+    async def send(self, method: str, params: dict = None, session_id: str = None) -> dict:
+        if self.closed:
+            raise CDPError("The DevTools connection is closed.")
+        self._next_id += 1
+        message = {"id": self._next_id, "method": method, "params": params or {}}
+        if session_id is not None:
+            message["sessionId"] = session_id
+        future = asyncio.get_running_loop().create_future()
+        self._pending[self._next_id] = future
+        try:
+            await self._websocket.send(json.dumps(message))
+            return await future
+        finally:
+            self._pending.pop(message["id"], None)
+
+    def wait_for_event(self, method: str, session_id: str = None) -> asyncio.Future:
+        # Future risolto dal prossimo evento `method` della sessione indicata
+        future = asyncio.get_running_loop().create_future()
+        self._event_waiters.append((method, session_id, future))
+        return future
+
+    def _dispatch_event(self, message: dict):
+        remaining = []
+        for method, session_id, future in self._event_waiters:
+            if future.done():
+                continue
+            if method == message["method"] and session_id == message.get("sessionId"):
+                future.set_result(message.get("params", {}))
+            else:
+                remaining.append((method, session_id, future))
+        self._event_waiters = remaining
+
+    async def _read_loop(self):
+        try:
+            async for raw_message in self._websocket:
+                message = json.loads(raw_message)
+                if "method" in message:
+                    self._dispatch_event(message)
+                    continue
+                future = self._pending.get(message.get("id"))
+                if future is None or future.done():
+                    continue  # Risposta a una richiesta gia' annullata
+                if "error" in message:
+                    error = message["error"]
+                    future.set_exception(CDPError(f"{error.get('message')} ({error.get('code')})"))
+                else:
+                    future.set_result(message.get("result", {}))
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            self.closed = True
+            waiting = list(self._pending.values()) + [future for _, _, future in self._event_waiters]
+            for future in waiting:
+                if not future.done():
+                    future.set_exception(CDPError("The DevTools connection was closed."))
+
+    async def close(self):
+        await self._websocket.close()
+        await self._reader
+
+
+class CDPPage:
+    def __init__(self, connection: CDPConnection, session_id: str):
+        self.connection = connection
+        self.session_id = session_id
+
+    async def send(self, method: str, params: dict = None) -> dict:
+        return await self.connection.send(method, params, self.session_id)
+
+    async def set_content(self, html: str):
+        frame_tree = await self.send("Page.getFrameTree")
+        await self.send("Page.setDocumentContent", {"frameId": frame_tree["frameTree"]["frame"]["id"], "html": html})
+
+    async def navigate(self, url: str, timeout: float = None):
+        timeout = timeout or global_config.PAGE_READY_TIMEOUT
+        await self.send("Page.enable")
+        load_event = self.connection.wait_for_event("Page.loadEventFired", self.session_id)
+        result = await self.send("Page.navigate", {"url": url})
+        if result.get("errorText"):
+            load_event.cancel()
+            raise CDPError(f"Navigation to {url} failed: {result['errorText']}")
+        try:
+            await asyncio.wait_for(load_event, timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"{url} did not fire the load event after {timeout} seconds, continuing anyway.")
+
+    async def body_html(self) -> str:
+        result = await self.send("Runtime.evaluate", {
+            "expression": "(document.body || document.documentElement).outerHTML",
+            "returnByValue": True,
+        })
+        return result["result"]["value"]
+
+    async def wait_until_ready(self, timeout: float = None, quiet_ms: int = 0) -> bool:
+        timeout = timeout or global_config.PAGE_READY_TIMEOUT
+        try:
+            await asyncio.wait_for(self.send("Runtime.evaluate", {
+                "expression": f"({PAGE_READY_FUNCTION})({int(quiet_ms)}, {page_quiet_timeout_ms()})",
+                "awaitPromise": True,
+                "returnByValue": True,
+            }), timeout)
+            return True
+        except asyncio.TimeoutError:
+            logger.warning(f"Page was not ready after {timeout} seconds, continuing anyway.")
+            return False
+
+    async def print_base64(self, print_options: dict = None) -> str:
+        options = dict(PDF_PRINT_OPTIONS, **(print_options or {}))
+        options["transferMode"] = "ReturnAsBase64"
+        return (await self.send("Page.printToPDF", options))["data"]
+
+    async def print_stream(self, fileobj, chunk_size: int = PDF_STREAM_CHUNK_SIZE) -> int:
+        options = dict(PDF_PRINT_OPTIONS, transferMode="ReturnAsStream")
+        handle = (await self.send("Page.printToPDF", options))["stream"]
+        written = 0
+        try:
+            while True:
+                chunk = await self.send("IO.read", {"handle": handle, "size": chunk_size})
+                data = chunk.get("data", "")
+                if data:
+                    data = base64.b64decode(data) if chunk.get("base64Encoded") else data.encode("utf-8")
+                    fileobj.write(data)
+                    written += len(data)
+                if chunk.get("eof"):
+                    break
+        finally:
+            await self.send("IO.close", {"handle": handle})
+        return written
+
+
+class ChromeProcess:
+    def __init__(self, binary: str):
+        self.binary = binary
+        self.process = None
+        self.connection = None
+        self.user_data_dir = None
+        self.renders = 0
+        self.active_pages = 0
+
+    @property
+    def alive(self) -> bool:
+        return (self.process is not None and self.process.poll() is None
+                and self.connection is not None and not self.connection.closed)
+
+    async def start(self, timeout: float = 30):
+        self.user_data_dir = tempfile.mkdtemp(prefix="lib_resume_builder_chrome_")
+        self.process = subprocess.Popen(
+            [self.binary, *CHROME_ARGUMENTS, "--remote-debugging-port=0", f"--user-data-dir={self.user_data_dir}", "about:blank"],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        websocket_url = await self._wait_for_devtools_url(timeout)
+        self.connection = CDPConnection(await websockets.connect(websocket_url, max_size=None))
+
+    async def _wait_for_devtools_url(self, timeout: float) -> str:
+        # Con --remote-debugging-port=0 Chrome sceglie una porta libera e la scrive in DevToolsActivePort
+        port_file = Path(self.user_data_dir) / "DevToolsActivePort"
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"Chrome exited with code {self.process.returncode} before DevTools was ready.")
+            try:
+                port, path = port_file.read_text(encoding="utf-8").splitlines()[:2]
+                return f"ws://127.0.0.1:{port}{path}"
+            except (FileNotFoundError, ValueError):
+                await asyncio.sleep(0.05)
+        raise TimeoutError(f"Chrome did not expose DevTools within {timeout} seconds.")
+
+    async def close(self):
+        if self.connection is not None and not self.connection.closed:
+            try:
+                await asyncio.wait_for(self.connection.send("Browser.close"), 5)
+            except Exception:
+                pass
+            await self.connection.close()
+        if self.process is not None:
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+        if self.user_data_dir is not None:
+            shutil.rmtree(self.user_data_dir, ignore_errors=True)
+
+
+class CDPRenderer(Renderer):
+    """Drives a headless Chrome directly over the DevTools protocol, without Selenium.
+
+    All protocol traffic runs on a private event loop thread, so the renderer can
+    be used from plain threads and from any asyncio loop. Every job gets its own
+    target (tab) in a shared browser, which lets batches render concurrently.
+    """
+
+    def __init__(self, chrome_binary: str = None, max_renders: int = None, concurrency: int = None):
+        self.chrome_binary = chrome_binary or find_chrome_binary()
+        if not self.chrome_binary:
+            raise FileNotFoundError("Chrome executable not found, set global_config.CHROME_BINARY_PATH or CHROME_PATH.")
+        self.max_renders = max_renders or global_config.RENDERER_MAX_RENDERS
+        self.concurrency = concurrency or global_config.RENDER_BATCH_CONCURRENCY
+        self._loop = None
+        self._loop_lock = threading.Lock()
+        self._browser = None
+        self._browser_lock = None
+        # Browser riciclati che finiscono le pagine ancora aperte prima di essere chiusi
+        self._draining = set()
+
+    def _submit(self, coroutine):
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="cdp-renderer", daemon=True).start()
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop)
+
+    def _run(self, coroutine):
+        return self._submit(coroutine).result()
+
+    async def _await(self, coroutine):
+        return await asyncio.wrap_future(self._submit(coroutine))
+
+    async def _acquire_browser(self) -> ChromeProcess:
+        if self._browser_lock is None:
+            self._browser_lock = asyncio.Lock()
+        async with self._browser_lock:
+            browser = self._browser
+            if browser is not None and not browser.alive:
+                await browser.close()
+                self._browser = None
+            elif browser is not None and browser.renders >= self.max_renders:
+                # Riciclo anche sotto carico: le nuove pagine vanno su un browser nuovo,
+                # il vecchio si chiude quando finisce l'ultima pagina aperta
+                self._browser = None
+                if browser.active_pages:
+                    self._draining.add(browser)
+                else:
+                    await browser.close()
+            if self._browser is None:
+                browser = ChromeProcess(self.chrome_binary)
+                try:
+                    with span("renderer.browser_launch", backend="cdp"):
+                        await browser.start()
+                except Exception:
+                    await browser.close()
+                    raise
+                self._browser = browser
+            self._browser.active_pages += 1
+            self._browser.renders += 1
+            return self._browser
+
+    async def _release_browser(self, browser: ChromeProcess):
+        browser.active_pages -= 1
+        if browser in self._draining and browser.active_pages == 0:
+            self._draining.discard(browser)
+            await browser.close()
+
+    @asynccontextmanager
+    async def _page(self):
+        browser = await self._acquire_browser()
+        target_id = None
+        try:
+            target_id = (await browser.connection.send("Target.createTarget", {"url": "about:blank"}))["targetId"]
+            attached = await browser.connection.send("Target.attachToTarget", {"targetId": target_id, "flatten": True})
+            yield CDPPage(browser.connection, attached["sessionId"])
+        finally:
+            try:
+                if target_id is not None and browser.alive:
+                    try:
+                        await browser.connection.send("Target.closeTarget", {"targetId": target_id})
+                    except CDPError as e:
+                        logger.debug(f"Failed to close DevTools target {target_id}: {e}")
+            finally:
+                await self._release_browser(browser)
+
+    async def _pdf_base64(self, html: str, print_options: dict = None) -> str:
+        with span("renderer.pdf", backend="cdp"):
+            async with self._page() as page:
+                with span("renderer.set_content"):
+                    await page.set_content(html)
+                    await page.wait_until_ready()
+                with span("renderer.print_to_pdf"):
+                    return await page.print_base64(print_options)
+
+    async def _write_pdf(self, html: str, fileobj) -> int:
+        with span("renderer.write_pdf", backend="cdp"):
+            async with self._page() as page:
+                with span("renderer.set_content"):
+                    await page.set_content(html)
+                    await page.wait_until_ready()
+                with span("renderer.print_to_pdf"):
+                    return await page.print_stream(fileobj)
+
+    async def _pdf_base64_batch(self, html_documents: List[str], print_options: dict = None, concurrency: int = None) -> List[str]:
+        semaphore = asyncio.Semaphore(concurrency or self.concurrency)
+
+        async def render(html):
+            async with semaphore:
+                return await self._pdf_base64(html, print_options)
+
+        return list(await asyncio.gather(*(render(html) for html in html_documents)))
+
+    async def _fetch_html(self, url: str, quiet_ms: int = 0) -> str:
+        with span("renderer.fetch_html", backend="cdp"):
+            async with self._page() as page:
+                await page.navigate(url)
+                await page.wait_until_ready(quiet_ms=quiet_ms)
+                return await page.body_html()
+
+    def pdf_base64(self, html: str) -> str:
+        return self._run(self._pdf_base64(html))
+
+    def write_pdf(self, html: str, fileobj) -> int:
+        return self._run(self._write_pdf(html, fileobj))
+
+    def pdf_base64_batch(self, html_documents: List[str], print_options: dict = None, concurrency: int = None) -> List[str]:
+        return self._run(self._pdf_base64_batch(html_documents, print_options, concurrency))
+
+    def fetch_html(self, url: str, quiet_ms: int = 0) -> str:
+        return self._run(self._fetch_html(url, quiet_ms))
+
+    async def apdf_base64(self, html: str) -> str:
+        return await self._await(self._pdf_base64(html))
+
+    async def awrite_pdf(self, html: str, fileobj) -> int:
+        return await self._await(self._write_pdf(html, fileobj))
+
+    async def apdf_base64_batch(self, html_documents: List[str], print_options: dict = None, concurrency: int = None) -> List[str]:
+        return await self._await(self._pdf_base64_batch(html_documents, print_options, concurrency))
+
+    async def afetch_html(self, url: str, quiet_ms: int = 0) -> str:
+        return await self._await(self._fetch_html(url, quiet_ms))
+
+    def browser_pids(self) -> List[int]:
+        browsers = [self._browser, *self._draining]
+        return [browser.process.pid for browser in browsers if browser is not None and browser.alive]
+
+    async def _close(self):
+        browsers = [self._browser, *self._draining]
+        self._browser = None
+        self._draining.clear()
+        for browser in browsers:
+            if browser is not None:
+                await browser.close()
+
+    def close(self):
+        if self._loop is None:
+            return
+        try:
+            self._run(self._close())
+        finally:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._loop = None
@@ -9,6 +9,60 @@ class GlobalConfig:
         self.STYLES_DIRECTORY: Path = None
         self.LOG_OUTPUT_FILE_PATH: Path = None
         self.API_KEY: str = None
+        self.CHROMEDRIVER_PATH: Path = None  # Percorso fisso di chromedriver (anche via env CHROMEDRIVER_PATH), niente download
+        self.CHROMEDRIVER_CACHE_FILE: Path = Path.home() / ".cache" / "lib_resume_builder_AIHawk" / "chromedriver.json"
+        self.RENDERER_BACKEND: str = "auto"  # "cdp", "selenium" oppure "auto" (CDP con ripiego su Selenium)
+        self.CHROME_BINARY_PATH: Path = None  # Eseguibile di Chrome per il backend CDP (anche via env CHROME_PATH)
+        self.RENDERER_POOL_SIZE: int = 2  # Numero di browser Chrome tenuti caldi per il rendering
+        self.RENDERER_MAX_RENDERS: int = 50  # Dopo quanti PDF un browser viene riciclato
+        self.RENDER_BATCH_CONCURRENCY: int = 4  # Schede aperte in parallelo per il rendering in batch
+        self.PAGE_READY_TIMEOUT: float = 10  # Attesa massima (secondi) perche' una pagina sia pronta
+        self.JOB_DESCRIPTION_FETCH_MODE: str = "auto"  # "http", "browser" oppure "auto" (HTTP, browser solo per pagine JS)
+        self.JOB_DESCRIPTION_MIN_TEXT_LENGTH: int = 500  # Sotto questa soglia di testo visibile la pagina va renderizzata nel browser
+        self.JOB_DESCRIPTION_QUIET_MS: int = 500  # Millisecondi senza modifiche al DOM prima di leggere la job description
+        self.PAGE_QUIET_TIMEOUT: float = 2.5  # Attesa massima (secondi) del DOM quieto, dopo il caricamento: poi si legge il DOM com'e'
+        self.ASSETS_MODE: str = "bundle"  # "bundle": font e icone inline dal bundle locale, "cdn": link esterni come da template
+        self.ASSETS_DIRECTORY: Path = Path.home() / ".cache" / "lib_resume_builder_AIHawk" / "assets"
+        self.ASSETS_DOWNLOAD_MISSING: bool = False  # Se True scarica al primo uso i CSS mancanti; altrimenti il bundle si prepara con `python -m lib_resume_builder_AIHawk.asset_bundle`
+        self.ASSETS_STRICT_OFFLINE: bool = False  # Se True i CSS remoti assenti dal bundle vengono tolti invece di restare link al CDN
+        self.ASSETS_RETRY_INTERVAL: float = 300  # Secondi prima di riprovare il download di un CSS fallito
+        self.LLM_CACHE_ENABLED: bool = True  # Riusa le risposte del modello per prompt e parametri identici
+        self.LLM_CACHE_PATH: Path = Path.home() / ".cache" / "lib_resume_builder_AIHawk" / "llm_cache.sqlite3"
+        self.LLM_CACHE_TTL: float = 30 * 24 * 3600  # Secondi dopo i quali una risposta in cache scade
+        self.LLM_CACHE_MAX_ENTRIES: int = 5000  # Oltre questo numero si scartano le risposte usate meno di recente
+        self.SECTION_CACHE_ENABLED: bool = True  # Riusa l'HTML di ogni sezione finche' i suoi input non cambiano (stesso file della cache LLM)
+        self.JOB_DESCRIPTION_CACHE_ENABLED: bool = True  # Riusa il riassunto della job description per lo stesso URL o testo
+        self.JOB_DESCRIPTION_CACHE_TTL: float = 7 * 24 * 3600  # Secondi dopo i quali il riassunto va rifatto (gli annunci cambiano)
+        self.LLM_REQUESTS_PER_MINUTE: int = 500  # Budget di richieste al minuto condiviso da tutto il processo (None: nessun limite)
+        self.LLM_TOKENS_PER_MINUTE: int = 200000  # Budget di token al minuto condiviso da tutto il processo (None: nessun limite)
+        self.LLM_MAX_CONCURRENT_REQUESTS: int = 8  # Richieste al modello in volo contemporaneamente
+        self.LLM_COMPLETION_TOKENS_ESTIMATE: int = 800  # Token di risposta prenotati per richiesta, poi corretti con usage_metadata
+        self.LLM_RETRY_MAX_ATTEMPTS: int = 6  # Tentativi massimi per una richiesta al modello
+        self.LLM_RETRY_DEADLINE: float = 120  # Secondi totali concessi a una richiesta, attese comprese
+        self.LLM_RETRY_BASE_DELAY: float = 1  # Attesa minima (secondi) tra due tentativi
+        self.LLM_RETRY_MAX_DELAY: float = 30  # Attesa massima (secondi) tra due tentativi, salvo Retry-After
+        self.LLM_CIRCUIT_FAILURE_THRESHOLD: int = 5  # Errori consecutivi del servizio prima di fallire subito
+        self.LLM_CIRCUIT_RESET_TIMEOUT: float = 30  # Secondi prima di riprovare con un circuito aperto
+        self.LLM_BASE_URL: str = None  # Endpoint compatibile OpenAI alternativo (proxy, gateway); None: API ufficiale
+        self.LLM_HTTP_MAX_CONNECTIONS: int = 20  # Connessioni HTTP massime per endpoint condivise dai client del modello
+        self.LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 10  # Connessioni tenute aperte tra una richiesta e l'altra
+        self.LLM_HTTP_KEEPALIVE_EXPIRY: float = 60  # Secondi di inattivita' prima di chiudere una connessione
+        self.LLM_HTTP_TIMEOUT: float = 60  # Timeout (secondi) di ogni richiesta HTTP al modello
+        self.STRUCTURED_GENERATION: bool = False  # Tutte le sezioni in un'unica risposta JSON, ripiego per sezione se non valida
+        self.LLM_CALL_LOG_MAX_BYTES: int = 10 * 1024 * 1024  # Dimensione oltre la quale open_ai_calls.jsonl viene ruotato
+        self.LLM_CALL_LOG_ROTATE_INTERVAL: float = 24 * 3600  # Secondi dopo i quali il log delle chiamate viene ruotato comunque
+        self.LLM_CALL_LOG_BACKUP_COUNT: int = 5  # File ruotati da conservare (open_ai_calls.jsonl.1, .2, ...)
+        self.LLM_CALL_LOG_FLUSH_INTERVAL: float = 1  # Secondi massimi tra due scritture su disco del log delle chiamate
+        self.TRACING_EXPORTER: str = None  # None (nessuna traccia), "memory", "jsonl" oppure "otel"
+        self.TRACING_JSONL_PATH: Path = None  # File degli span per l'exporter "jsonl" (default: spans.jsonl nella cartella di log)
+        # Listino in dollari per milione di token; il modello si sceglie per prefisso piu' lungo ("gpt-4o-mini-2024-07-18")
+        self.LLM_PRICES: dict = {
+            "gpt-4o-mini": {"input": 0.15, "cached_input": 0.075, "output": 0.60},
+            "gpt-4o": {"input": 2.50, "cached_input": 1.25, "output": 10.00},
+            "gpt-4.1-nano": {"input": 0.10, "cached_input": 0.025, "output": 0.40},
+            "gpt-4.1-mini": {"input": 0.40, "cached_input": 0.10, "output": 1.60},
+            "gpt-4.1": {"input": 2.00, "cached_input": 0.50, "output": 8.00},
+        }
         self.html_template = """
                             <!DOCTYPE html>
                             <html lang="en">
@@ -17,7 +71,6 @@ class GlobalConfig:
                                 <meta name="viewport" content="width=device-width, initial-scale=1.0">
                                 <title>Resume</title>
                                 <link href="https://fonts.googleapis.com/css2?family=Barlow:wght@400;600&display=swap" rel="stylesheet" />
-                                <link href="https://fonts.googleapis.com/css2?family=Barlow:wght@400;600&display=swap" rel="stylesheet" /> 
                                 <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/5.15.3/css/all.min.css" /> 
                                 <link rel="stylesheet" href="$style_path">
                             </head>
@@ -0,0 +1,97 @@
+import atexit
+import hashlib
+import re
+import threading
+import unicodedata
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from lib_resume_builder_AIHawk.config import global_config
+from lib_resume_builder_AIHawk.sqlite_cache import SQLiteCache
+
+# Parametri di tracciamento che non cambiano la pagina dell'annuncio
+TRACKING_PARAMS_RE = re.compile(r'^(utm_\w+|ref|refid|trk|trkinfo|trackingid|gclid|fbclid|mc_[ce]id|src|source)$', re.IGNORECASE)
+# Righe ricorrenti nelle pagine degli annunci che non fanno parte della job description
+BOILERPLATE_LINE_RE = re.compile(
+    r'^\s*(apply( now)?|easy apply|save( job)?|share( this job)?|sign in|log in|report this job|'
+    r'show (more|less)|see more|.*\bcookies?\b.*|.*\ball rights reserved\b.*|©.*)\s*$',
+    re.IGNORECASE,
+)
+
+
+def normalize_job_description_text(text: str) -> str:
+    text = unicodedata.normalize("NFKC", text).casefold()
+    lines = (line for line in text.splitlines() if not BOILERPLATE_LINE_RE.match(line))
+    return " ".join(" ".join(lines).split())
+
+
+def normalize_job_description_url(url: str) -> str:
+    parts = urlsplit(url.strip())
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if not TRACKING_PARAMS_RE.match(k))
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, urlencode(query), ""))
+
+
+def _digest(*parts: str) -> str:
+    sha = hashlib.sha256()
+    for part in parts:
+        sha.update(part.encode("utf-8"))
+        sha.update(b"\0")
+    return sha.hexdigest()
+
+
+class JobDescriptionCache:
+    """Stores job description summaries by URL and by normalized posting text.
+
+    `fingerprint` identifies the prompts and model that produced a summary, so
+    changing either of them never serves a summary written for the old ones.
+    """
+
+    def __init__(self, cache: SQLiteCache):
+        self.cache = cache
+
+    @staticmethod
+    def url_key(url: str, fingerprint: str) -> str:
+        return "url:" + _digest(normalize_job_description_url(url), fingerprint)
+
+    @staticmethod
+    def text_key(text: str, fingerprint: str) -> str:
+        return "text:" + _digest(normalize_job_description_text(text), fingerprint)
+
+    def get_by_url(self, url: str, fingerprint: str) -> str:
+        return self.cache.get(self.url_key(url, fingerprint))
+
+    def get_by_text(self, text: str, fingerprint: str) -> str:
+        return self.cache.get(self.text_key(text, fingerprint))
+
+    def set(self, summary: str, fingerprint: str, url: str = None, text: str = None):
+        if url is not None:
+            self.cache.set(self.url_key(url, fingerprint), summary)
+        if text is not None:
+            self.cache.set(self.text_key(text, fingerprint), summary)
+
+    def invalidate_url(self, url: str, fingerprint: str):
+        self.cache.delete(self.url_key(url, fingerprint))
+
+    def stats(self) -> dict:
+        return self.cache.stats()
+
+
+_job_description_cache = None
+_job_description_cache_lock = threading.Lock()
+
+
+def get_job_description_cache() -> JobDescriptionCache:
+    # None se la cache e' disattivata da configurazione
+    global _job_description_cache
+    if not global_config.JOB_DESCRIPTION_CACHE_ENABLED:
+        return None
+    with _job_description_cache_lock:
+        if _job_description_cache is None:
+            cache = SQLiteCache(
+                global_config.LLM_CACHE_PATH,
+                ttl=global_config.JOB_DESCRIPTION_CACHE_TTL,
+                max_entries=global_config.LLM_CACHE_MAX_ENTRIES,
+                table="job_descriptions",
+            )
+            atexit.register(cache.close)
+            _job_description_cache = JobDescriptionCache(cache)
+        return _job_description_cache
@@ -0,0 +1,92 @@
+import asyncio
+import html as html_lib
+import logging
+import re
+import urllib.error
+import urllib.request
+from lib_resume_builder_AIHawk.config import global_config
+from lib_resume_builder_AIHawk.renderer import Renderer, get_renderer
+
+logger = logging.getLogger(__name__)
+
+FETCH_USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+FETCH_TIMEOUT = 15
+MAX_RESPONSE_BYTES = 5 * 1024 * 1024
+
+BODY_RE = re.compile(r'<body\b.*?</body\s*>', re.DOTALL | re.IGNORECASE)
+INVISIBLE_RE = re.compile(r'<(script|style|noscript|template)\b.*?</\1\s*>', re.DOTALL | re.IGNORECASE)
+TAG_RE = re.compile(r'<[^>]+>')
+
+
+def fetch_html_http(url: str) -> str:
+    request = urllib.request.Request(url, headers={
+        "User-Agent": FETCH_USER_AGENT,
+        "Accept": "text/html,application/xhtml+xml",
+    })
+    with urllib.request.urlopen(request, timeout=FETCH_TIMEOUT) as response:
+        charset = response.headers.get_content_charset() or "utf-8"
+        return response.read(MAX_RESPONSE_BYTES).decode(charset, errors="replace")
+
+
+def visible_text(html: str) -> str:
+    text = html_lib.unescape(TAG_RE.sub(" ", INVISIBLE_RE.sub(" ", html)))
+    return " ".join(text.split())
+
+
+def needs_javascript(html: str) -> bool:
+    # Le pagine renderizzate lato client arrivano via HTTP quasi senza testo visibile
+    return len(visible_text(html)) < global_config.JOB_DESCRIPTION_MIN_TEXT_LENGTH
+
+
+def _http_body(url: str, html: str, mode: str) -> str:
+    # None quando la pagina va caricata nel browser
+    body = BODY_RE.search(html)
+    body = body.group(0) if body else html
+    if mode == "http" or not needs_javascript(body):
+        return body
+    logger.debug(f"{url} looks JavaScript-rendered, loading it in the browser")
+    return None
+
+
+def _check_mode(mode: str) -> str:
+    mode = mode or global_config.JOB_DESCRIPTION_FETCH_MODE
+    if mode not in ("auto", "http", "browser"):
+        raise ValueError(f"Unknown job description fetch mode: {mode}")
+    return mode
+
+
+def fetch_job_description_html(url: str, renderer: Renderer = None, mode: str = None) -> str:
+    """Returns the <body> HTML of a job posting.
+
+    In "auto" mode a plain HTTP request is tried first and the browser is only
+    used when the response looks JS-rendered or the request fails; "http" and
+    "browser" force one of the two paths.
+    """
+    mode = _check_mode(mode)
+    if mode in ("auto", "http"):
+        try:
+            body = _http_body(url, fetch_html_http(url), mode)
+            if body is not None:
+                return body
+        except (urllib.error.URLError, OSError, ValueError) as e:
+            if mode == "http":
+                raise
+            logger.debug(f"HTTP fetch of {url} failed, falling back to the browser: {e}")
+    renderer = renderer if renderer is not None else get_renderer()
+    return renderer.fetch_html(url, quiet_ms=global_config.JOB_DESCRIPTION_QUIET_MS)
+
+
+async def afetch_job_description_html(url: str, renderer: Renderer = None, mode: str = None) -> str:
+    mode = _check_mode(mode)
+    if mode in ("auto", "http"):
+        try:
+            # La richiesta HTTP e' breve e limitata da FETCH_TIMEOUT: basta l'executor di default
+            body = _http_body(url, await asyncio.to_thread(fetch_html_http, url), mode)
+            if body is not None:
+                return body
+        except (urllib.error.URLError, OSError, ValueError) as e:
+            if mode == "http":
+                raise
+            logger.debug(f"HTTP fetch of {url} failed, falling back to the browser: {e}")
+    renderer = renderer if renderer is not None else get_renderer()
+    return await renderer.afetch_html(url, quiet_ms=global_config.JOB_DESCRIPTION_QUIET_MS)
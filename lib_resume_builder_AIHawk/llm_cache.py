@@ -0,0 +1,91 @@
+import atexit
+import hashlib
+import json
+import logging
+import threading
+from typing import TYPE_CHECKING
+from lib_resume_builder_AIHawk.config import global_config
+from lib_resume_builder_AIHawk.sqlite_cache import SQLiteCache
+
+if TYPE_CHECKING:
+    from langchain_core.messages.ai import AIMessage
+
+logger = logging.getLogger(__name__)
+
+# Da incrementare quando cambia il formato delle voci salvate
+LLM_CACHE_KEY_VERSION = 1
+
+
+def rendered_messages(messages) -> list:
+    if hasattr(messages, "to_messages"):
+        messages = messages.to_messages()
+    elif isinstance(messages, str):
+        return [["human", messages]]
+    return [[message.type, message.content] for message in messages]
+
+
+def model_parameters(llm) -> dict:
+    # Tutto cio' che cambia la risposta: modello, temperatura, max_tokens, top_p, ...
+    params = getattr(llm, "_identifying_params", None)
+    if params is None:
+        params = {"model_name": getattr(llm, "model_name", type(llm).__name__)}
+    params = dict(params)
+    # Modello ottenuto con .bind(): contano anche gli argomenti fissati (es. response_format)
+    bound_kwargs = getattr(llm, "kwargs", None)
+    if isinstance(bound_kwargs, dict):
+        params.update(bound_kwargs)
+    return params
+
+
+def llm_cache_key(messages, llm) -> str:
+    payload = json.dumps(
+        {
+            "version": LLM_CACHE_KEY_VERSION,
+            "messages": rendered_messages(messages),
+            "params": model_parameters(llm),
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def serialize_reply(reply: "AIMessage") -> dict:
+    return {
+        "content": reply.content,
+        "response_metadata": reply.response_metadata,
+        "id": reply.id,
+        "usage_metadata": dict(reply.usage_metadata or {}),
+    }
+
+
+def deserialize_reply(data: dict) -> "AIMessage":
+    from langchain_core.messages.ai import AIMessage
+    return AIMessage(
+        content=data["content"],
+        response_metadata=data.get("response_metadata") or {},
+        id=data.get("id"),
+        usage_metadata=data.get("usage_metadata") or None,
+    )
+
+
+_llm_cache = None
+_llm_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> SQLiteCache:
+    # None se la cache e' disattivata da configurazione
+    global _llm_cache
+    if not global_config.LLM_CACHE_ENABLED:
+        return None
+    with _llm_cache_lock:
+        if _llm_cache is None:
+            _llm_cache = SQLiteCache(
+                global_config.LLM_CACHE_PATH,
+                ttl=global_config.LLM_CACHE_TTL,
+                max_entries=global_config.LLM_CACHE_MAX_ENTRIES,
+                table="llm_responses",
+            )
+            atexit.register(_llm_cache.close)
+        return _llm_cache
@@ -0,0 +1,312 @@
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Dict, List
+from langchain_core.messages.ai import AIMessage
+from langchain_core.prompt_values import StringPromptValue
+from langchain_core.runnables import RunnableLambda
+from langchain_openai import ChatOpenAI
+from lib_resume_builder_AIHawk.call_log import current_llm_section, get_call_log_writer
+from lib_resume_builder_AIHawk.config import global_config
+from lib_resume_builder_AIHawk.llm_cache import deserialize_reply, get_llm_cache, llm_cache_key, rendered_messages, serialize_reply
+from lib_resume_builder_AIHawk.prompt_serializer import count_tokens
+from lib_resume_builder_AIHawk.rate_limiter import estimate_prompt_tokens, get_llm_rate_limiter
+from lib_resume_builder_AIHawk.retry_policy import EmptyResponseError, get_llm_retry_policy
+from lib_resume_builder_AIHawk.sqlite_cache import SQLiteCache
+from lib_resume_builder_AIHawk.tracing import NOOP_SPAN, span
+from lib_resume_builder_AIHawk.usage_accounting import record_llm_usage
+
+logger = logging.getLogger(__name__)
+
+
+class LLMLogger:
+    
+    def __init__(self, llm: ChatOpenAI):
+        self.llm = llm
+
+    @staticmethod
+    def log_request(prompts, parsed_reply: Dict[str, Dict], latency: float = None):
+        # Extract token usage details from the response
+        token_usage = parsed_reply["usage_metadata"]
+        output_tokens = token_usage["output_tokens"]
+        input_tokens = token_usage["input_tokens"]
+        total_tokens = token_usage["total_tokens"]
+        cached_input_tokens = token_usage.get("cached_input_tokens", 0)
+
+        # Extract model details from the response
+        model_name = parsed_reply["response_metadata"]["model_name"]
+        section = current_llm_section.get()
+
+        # Costo dal listino in configurazione, sommato ai contatori di processo e della generazione in corso
+        total_cost = record_llm_usage(model_name, token_usage, section=section)
+
+        # Il record va in coda al writer in background: nessun I/O su disco nel thread della richiesta
+        call_log_writer = get_call_log_writer()
+        if call_log_writer is None:
+            return
+        if isinstance(prompts, StringPromptValue):
+            prompts = prompts.text
+        elif isinstance(prompts, Dict):
+            # Convert prompts to a dictionary if they are not in the expected format
+            prompts = {
+                f"prompt_{i+1}": prompt.content
+                for i, prompt in enumerate(prompts.messages)
+            }
+        else:
+            prompts = {
+                f"prompt_{i+1}": prompt.content
+                for i, prompt in enumerate(prompts.messages)
+            }
+
+        current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+        # Create a log entry with all relevant information
+        log_entry = {
+            "model": model_name,
+            "time": current_time,
+            "prompts": prompts,
+            "replies": parsed_reply["content"],  # Response content
+            "total_tokens": total_tokens,
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "cached_input_tokens": cached_input_tokens,
+            "total_cost": total_cost,
+            "latency": round(latency, 3) if latency is not None else None,
+            "section": section,
+        }
+        call_log_writer.write(log_entry)
+
+
+class LoggerChatModel:
+
+    def __init__(self, llm: ChatOpenAI, cache: SQLiteCache = None):
+        self.llm = llm
+        self.cache = cache if cache is not None else get_llm_cache()
+
+    def as_runnable(self) -> RunnableLambda:
+        # Con una variante asincrona nativa: chain.ainvoke non occupa un thread per chiamata
+        return RunnableLambda(self.__call__, afunc=self.acall, name="LoggerChatModel")
+
+    def __call__(self, messages: List[Dict[str, str]]) -> str:
+        # Stesso prompt con gli stessi parametri del modello: nessuna nuova chiamata API
+        with span("llm.call", section=current_llm_section.get()) as call_span:
+            self._set_prompt_tokens(call_span, messages)
+            cache_key = llm_cache_key(messages, self.llm) if self.cache is not None else None
+            if cache_key is not None:
+                cached = self.cache.get(cache_key)
+                call_span.set_attribute("cached", cached is not None)
+                if cached is not None:
+                    self._record_cache_hit(cached)
+                    logger.debug(f"LLM cache hit {cache_key[:12]}")
+                    return deserialize_reply(cached)
+            reply = self._call_llm(messages)
+            if cache_key is not None:
+                self.cache.set(cache_key, serialize_reply(reply))
+            return reply
+
+    async def acall(self, messages: List[Dict[str, str]]) -> AIMessage:
+        with span("llm.call", section=current_llm_section.get()) as call_span:
+            self._set_prompt_tokens(call_span, messages)
+            cache_key = llm_cache_key(messages, self.llm) if self.cache is not None else None
+            if cache_key is not None:
+                # SQLite e' bloccante: letture e scritture della cache fuori dall'event loop
+                cached = await asyncio.to_thread(self.cache.get, cache_key)
+                call_span.set_attribute("cached", cached is not None)
+                if cached is not None:
+                    self._record_cache_hit(cached)
+                    logger.debug(f"LLM cache hit {cache_key[:12]}")
+                    return deserialize_reply(cached)
+            reply = await self._acall_llm(messages)
+            if cache_key is not None:
+                await asyncio.to_thread(self.cache.set, cache_key, serialize_reply(reply))
+            return reply
+
+    def _call_llm(self, messages: List[Dict[str, str]]) -> AIMessage:
+        # Richieste in coda sul budget RPM/TPM condiviso; i 429 mettono in pausa tutto il processo
+        rate_limiter = get_llm_rate_limiter()
+        estimated_tokens = estimate_prompt_tokens(messages) + global_config.LLM_COMPLETION_TOKENS_ESTIMATE
+
+        def attempt():
+            # Uno span per tentativo: l'attesa nel rate limiter resta fuori da latency
+            with span("llm.request", estimated_tokens=estimated_tokens) as request_span, \
+                    rate_limiter.reserve(estimated_tokens) as reservation:
+                started = time.monotonic()
+                reply = self.llm.invoke(messages)
+                latency = time.monotonic() - started
+                parsed_reply = self.parse_llmresult(reply)
+                reservation.used_tokens = parsed_reply["usage_metadata"]["total_tokens"]
+                request_span.set_attributes(**parsed_reply["usage_metadata"])
+            LLMLogger.log_request(prompts=messages, parsed_reply=parsed_reply, latency=latency)
+            return reply
+
+        return get_llm_retry_policy().call(attempt, on_rate_limit=rate_limiter.pause)
+
+    async def _acall_llm(self, messages: List[Dict[str, str]]) -> AIMessage:
+        rate_limiter = get_llm_rate_limiter()
+        estimated_tokens = estimate_prompt_tokens(messages) + global_config.LLM_COMPLETION_TOKENS_ESTIMATE
+
+        async def attempt():
+            with span("llm.request", estimated_tokens=estimated_tokens) as request_span:
+                async with rate_limiter.areserve(estimated_tokens) as reservation:
+                    started = time.monotonic()
+                    reply = await self.llm.ainvoke(messages)
+                    latency = time.monotonic() - started
+                    parsed_reply = self.parse_llmresult(reply)
+                    reservation.used_tokens = parsed_reply["usage_metadata"]["total_tokens"]
+                    request_span.set_attributes(**parsed_reply["usage_metadata"])
+            LLMLogger.log_request(prompts=messages, parsed_reply=parsed_reply, latency=latency)
+            return reply
+
+        return await get_llm_retry_policy().acall(attempt, on_rate_limit=rate_limiter.pause)
+
+    @staticmethod
+    def _set_prompt_tokens(call_span, messages):
+        # Token del prompt contati con tiktoken (stima finche' la codifica non e' caricata); solo se si traccia
+        if call_span is not NOOP_SPAN:
+            call_span.set_attribute("prompt_tokens", sum(count_tokens(str(content)) for _, content in rendered_messages(messages)))
+
+    @staticmethod
+    def _streamed_reply(message, messages) -> AIMessage:
+        # Somma dei chunk ricevuti; l'uso dei token arriva nell'ultimo chunk (stream_usage).
+        # Se manca (stream interrotto prima della fine) lo si stima da prompt e testo ricevuto
+        usage_metadata = message.usage_metadata
+        if not usage_metadata:
+            input_tokens = estimate_prompt_tokens(messages)
+            output_tokens = count_tokens(str(message.content))
+            usage_metadata = {"input_tokens": input_tokens, "output_tokens": output_tokens,
+                              "total_tokens": input_tokens + output_tokens}
+        return AIMessage(
+            content=message.content,
+            response_metadata=message.response_metadata,
+            id=message.id,
+            usage_metadata=usage_metadata,
+        )
+
+    @staticmethod
+    def _record_cache_hit(cached: dict):
+        # Risposta dalla cache: nessun costo, conta come chiamata risparmiata
+        model_name = (cached.get("response_metadata") or {}).get("model_name", "")
+        record_llm_usage(model_name, cached.get("usage_metadata") or {}, section=current_llm_section.get(), cache_hit=True)
+
+    def stream(self, messages: List[Dict[str, str]]):
+        # Genera il testo a pezzi; si riprova solo finche' non e' arrivato il primo chunk
+        cache_key = llm_cache_key(messages, self.llm) if self.cache is not None else None
+        cached = self.cache.get(cache_key) if cache_key is not None else None
+        if cached is not None:
+            self._record_cache_hit(cached)
+            yield cached["content"]
+            return
+        rate_limiter = get_llm_rate_limiter()
+        estimated_tokens = estimate_prompt_tokens(messages) + global_config.LLM_COMPLETION_TOKENS_ESTIMATE
+
+        started = time.monotonic()
+
+        def first_chunk():
+            reservation = rate_limiter.acquire(estimated_tokens)
+            chunks = self.llm.stream(messages)
+            try:
+                message = next(chunks, None)
+                if message is None:
+                    raise EmptyResponseError("The model closed the stream without sending any chunk.")
+                return reservation, chunks, message
+            except BaseException:
+                chunks.close()
+                rate_limiter.release(reservation)
+                raise
+
+        reservation, chunks, message = get_llm_retry_policy().call(first_chunk, on_rate_limit=rate_limiter.pause)
+        completed = False
+        try:
+            if message.content:
+                yield message.content
+            for chunk in chunks:
+                message += chunk
+                if chunk.content:
+                    yield chunk.content
+            completed = True
+        finally:
+            chunks.close()
+            # Anche uno stream finito a meta' ha consumato token: finisce nei costi e nel log delle chiamate
+            reply = self._streamed_reply(message, messages)
+            parsed_reply = self.parse_llmresult(reply)
+            reservation.used_tokens = parsed_reply["usage_metadata"]["total_tokens"]
+            rate_limiter.release(reservation)
+            if not completed:
+                logger.warning(f"LLM stream ended early after {len(str(message.content))} characters")
+            LLMLogger.log_request(prompts=messages, parsed_reply=parsed_reply, latency=time.monotonic() - started)
+        if cache_key is not None:
+            self.cache.set(cache_key, serialize_reply(reply))
+
+    async def astream(self, messages: List[Dict[str, str]]):
+        cache_key = llm_cache_key(messages, self.llm) if self.cache is not None else None
+        cached = await asyncio.to_thread(self.cache.get, cache_key) if cache_key is not None else None
+        if cached is not None:
+            self._record_cache_hit(cached)
+            yield cached["content"]
+            return
+        rate_limiter = get_llm_rate_limiter()
+        estimated_tokens = estimate_prompt_tokens(messages) + global_config.LLM_COMPLETION_TOKENS_ESTIMATE
+
+        started = time.monotonic()
+
+        async def first_chunk():
+            reservation = await rate_limiter.aacquire(estimated_tokens)
+            chunks = self.llm.astream(messages)
+            try:
+                message = await anext(chunks, None)
+                if message is None:
+                    raise EmptyResponseError("The model closed the stream without sending any chunk.")
+                return reservation, chunks, message
+            except BaseException:
+                await chunks.aclose()
+                rate_limiter.release(reservation)
+                raise
+
+        reservation, chunks, message = await get_llm_retry_policy().acall(first_chunk, on_rate_limit=rate_limiter.pause)
+        completed = False
+        try:
+            if message.content:
+                yield message.content
+            async for chunk in chunks:
+                message += chunk
+                if chunk.content:
+                    yield chunk.content
+            completed = True
+        finally:
+            await chunks.aclose()
+            reply = self._streamed_reply(message, messages)
+            parsed_reply = self.parse_llmresult(reply)
+            reservation.used_tokens = parsed_reply["usage_metadata"]["total_tokens"]
+            rate_limiter.release(reservation)
+            if not completed:
+                logger.warning(f"LLM stream ended early after {len(str(message.content))} characters")
+            LLMLogger.log_request(prompts=messages, parsed_reply=parsed_reply, latency=time.monotonic() - started)
+        if cache_key is not None:
+            await asyncio.to_thread(self.cache.set, cache_key, serialize_reply(reply))
+
+    def parse_llmresult(self, llmresult: AIMessage) -> Dict[str, Dict]:
+        # Parse the LLM result into a structured format.
+        content = llmresult.content
+        response_metadata = llmresult.response_metadata
+        id_ = llmresult.id
+        usage_metadata = llmresult.usage_metadata
+
+        parsed_result = {
+            "content": content,
+            "response_metadata": {
+                "model_name": response_metadata.get("model_name", ""),
+                "system_fingerprint": response_metadata.get("system_fingerprint", ""),
+                "finish_reason": response_metadata.get("finish_reason", ""),
+                "logprobs": response_metadata.get("logprobs", None),
+            },
+            "id": id_,
+            "usage_metadata": {
+                "input_tokens": usage_metadata.get("input_tokens", 0),
+                "output_tokens": usage_metadata.get("output_tokens", 0),
+                "total_tokens": usage_metadata.get("total_tokens", 0),
+                # Token del prompt letti dalla cache di OpenAI, fatturati a prezzo ridotto
+                "cached_input_tokens": (usage_metadata.get("input_token_details") or {}).get("cache_read", 0) or 0,
+            },
+        }
+        return parsed_result
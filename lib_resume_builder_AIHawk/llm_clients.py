@@ -0,0 +1,184 @@
+import asyncio
+import atexit
+import logging
+import threading
+import weakref
+import httpx
+import openai
+from langchain_community.embeddings import OpenAIEmbeddings
+from langchain_openai import ChatOpenAI
+from lib_resume_builder_AIHawk.config import global_config
+
+logger = logging.getLogger(__name__)
+
+
+class LoopBoundAsyncClient(httpx.AsyncClient):
+    """httpx.AsyncClient that sends every request through a connection pool
+    owned by the running event loop.
+
+    ChatOpenAI keeps the async client it was built with for its whole life,
+    but an asyncio connection only works on the loop that opened it. This
+    client only builds requests: `send()` goes to a pool created for the
+    current loop, so a later `asyncio.run()` never reuses connections of a
+    loop that is already closed.
+    """
+
+    def __init__(self, **client_options):
+        super().__init__(**client_options)
+        self._client_options = client_options
+        self._loop_clients = weakref.WeakKeyDictionary()
+        self._loop_clients_lock = threading.Lock()
+
+    def _loop_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        with self._loop_clients_lock:
+            client = self._loop_clients.get(loop)
+            if client is None:
+                # I pool dei loop chiusi non servono piu' e tengono in vita il loop
+                for closed_loop in [other for other in self._loop_clients if other.is_closed()]:
+                    del self._loop_clients[closed_loop]
+                client = httpx.AsyncClient(**self._client_options)
+                self._loop_clients[loop] = client
+        return client
+
+    @property
+    def loop_clients(self) -> dict:
+        with self._loop_clients_lock:
+            return dict(self._loop_clients)
+
+    async def send(self, request: httpx.Request, **kwargs) -> httpx.Response:
+        return await self._loop_client().send(request, **kwargs)
+
+    async def aclose(self):
+        with self._loop_clients_lock:
+            client = self._loop_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+        self.close()
+
+    def close(self):
+        with self._loop_clients_lock:
+            loop_clients = list(self._loop_clients.items())
+            self._loop_clients.clear()
+        for loop, client in loop_clients:
+            try:
+                if loop.is_closed():
+                    # Le connessioni di un loop chiuso non si possono piu' chiudere: restano al GC
+                    continue
+                if loop.is_running():
+                    asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+                else:
+                    loop.run_until_complete(client.aclose())
+            except Exception as e:
+                logger.debug(f"Error while closing async HTTP client: {e}")
+
+
+class LLMClientRegistry:
+    """Long-lived chat and embedding clients shared by every generation.
+
+    Clients are keyed on (API key, model, base URL) and all clients for the
+    same base URL share one keep-alive httpx connection pool (one sync, one
+    async), so TLS handshakes are paid once per connection instead of once per
+    resume. The async client keeps a separate pool for every event loop.
+    """
+
+    def __init__(self, max_connections: int = None, max_keepalive_connections: int = None,
+                 keepalive_expiry: float = None, timeout: float = None):
+        self.limits = httpx.Limits(
+            max_connections=max_connections or global_config.LLM_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=max_keepalive_connections or global_config.LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=keepalive_expiry or global_config.LLM_HTTP_KEEPALIVE_EXPIRY,
+        )
+        self.timeout = timeout or global_config.LLM_HTTP_TIMEOUT
+        self._lock = threading.Lock()
+        self._http_clients = {}
+        self._async_http_clients = {}
+        self._chat_models = {}
+        self._embeddings = {}
+
+    def http_client(self, base_url: str = None) -> httpx.Client:
+        with self._lock:
+            if base_url not in self._http_clients:
+                self._http_clients[base_url] = httpx.Client(limits=self.limits, timeout=self.timeout)
+            return self._http_clients[base_url]
+
+    def async_http_client(self, base_url: str = None) -> LoopBoundAsyncClient:
+        with self._lock:
+            if base_url not in self._async_http_clients:
+                self._async_http_clients[base_url] = LoopBoundAsyncClient(limits=self.limits, timeout=self.timeout)
+            return self._async_http_clients[base_url]
+
+    def chat_model(self, api_key: str, model_name: str = "gpt-4o-mini", temperature: float = 0.4, base_url: str = None) -> ChatOpenAI:
+        base_url = base_url or global_config.LLM_BASE_URL
+        key = (api_key, model_name, base_url, temperature)
+        with self._lock:
+            chat_model = self._chat_models.get(key)
+        if chat_model is None:
+            chat_model = ChatOpenAI(
+                model_name=model_name,
+                openai_api_key=api_key,
+                openai_api_base=base_url,
+                temperature=temperature,
+                # I tentativi li gestisce retry_policy, non il client
+                max_retries=0,
+                # In streaming l'uso dei token arriva nell'ultimo chunk: serve per limiter e log
+                stream_usage=True,
+                http_client=self.http_client(base_url),
+                http_async_client=self.async_http_client(base_url),
+            )
+            with self._lock:
+                chat_model = self._chat_models.setdefault(key, chat_model)
+        return chat_model
+
+    def embeddings(self, api_key: str, model: str = "text-embedding-ada-002", base_url: str = None) -> OpenAIEmbeddings:
+        base_url = base_url or global_config.LLM_BASE_URL
+        key = (api_key, model, base_url)
+        with self._lock:
+            embeddings = self._embeddings.get(key)
+        if embeddings is None:
+            # OpenAIEmbeddings accetta solo il client HTTP sincrono: i client OpenAI li costruiamo noi
+            client_params = {"api_key": api_key, "base_url": base_url, "timeout": self.timeout}
+            embeddings = OpenAIEmbeddings(
+                openai_api_key=api_key,
+                openai_api_base=base_url,
+                model=model,
+                client=openai.OpenAI(http_client=self.http_client(base_url), **client_params).embeddings,
+                async_client=openai.AsyncOpenAI(http_client=self.async_http_client(base_url), **client_params).embeddings,
+            )
+            with self._lock:
+                embeddings = self._embeddings.setdefault(key, embeddings)
+        return embeddings
+
+    def close(self):
+        with self._lock:
+            http_clients = list(self._http_clients.values()) + list(self._async_http_clients.values())
+            self._http_clients.clear()
+            self._async_http_clients.clear()
+            self._chat_models.clear()
+            self._embeddings.clear()
+        for client in http_clients:
+            try:
+                client.close()
+            except Exception as e:
+                logger.debug(f"Error while closing HTTP client: {e}")
+
+    async def aclose(self):
+        with self._lock:
+            async_http_clients = list(self._async_http_clients.values())
+        # Chiude i pool del loop corrente con await, quelli degli altri loop li chiude close()
+        for client in async_http_clients:
+            await client.aclose()
+        self.close()
+
+
+_llm_client_registry = None
+_llm_client_registry_lock = threading.Lock()
+
+
+def get_llm_client_registry() -> LLMClientRegistry:
+    global _llm_client_registry
+    with _llm_client_registry_lock:
+        if _llm_client_registry is None:
+            _llm_client_registry = LLMClientRegistry()
+            atexit.register(_llm_client_registry.close)
+        return _llm_client_registry
@@ -1,14 +1,18 @@
+import asyncio
 import base64
+import io
 import os
 from pathlib import Path
-import tempfile
-import inquirer
 from lib_resume_builder_AIHawk.config import global_config
-from lib_resume_builder_AIHawk.utils import HTML_to_PDF
+from lib_resume_builder_AIHawk.renderer import Renderer, get_renderer
+from lib_resume_builder_AIHawk.section_cache import get_section_cache
+from lib_resume_builder_AIHawk.tracing import configure_tracing, span
+from lib_resume_builder_AIHawk.usage_accounting import Base64PDF, get_process_usage, track_usage
+from lib_resume_builder_AIHawk.utils import stylesheet_data_uri
 import webbrowser
 
 class FacadeManager:
-    def __init__(self, api_key, style_manager, resume_generator, resume_object, log_path):
+    def __init__(self, api_key, style_manager, resume_generator, resume_object, log_path, renderer: Renderer = None):
         # Ottieni il percorso assoluto della directory della libreria
         lib_directory = Path(__file__).resolve().parent
         global_config.STRINGS_MODULE_RESUME_PATH = lib_directory / "resume_prompt/strings_feder-cr.py"
@@ -22,20 +26,27 @@ class FacadeManager:
         self.resume_generator = resume_generator
         self.resume_generator.set_resume_object(resume_object)
         self.selected_style = None  # Proprietà per memorizzare lo stile selezionato
+        self.last_usage = None  # Token e costo dell'ultima generazione
+        self.renderer = renderer if renderer is not None else get_renderer()
+        self.resume_generator.set_renderer(self.renderer)
+        configure_tracing()
 
     def prompt_user(self, choices: list[str], message: str) -> str:
+        import inquirer
         questions = [
             inquirer.List('selection', message=message, choices=choices),
         ]
         return inquirer.prompt(questions)['selection']
 
     def prompt_for_url(self, message: str) -> str:
+        import inquirer
         questions = [
             inquirer.Text('url', message=message),
         ]
         return inquirer.prompt(questions)['url']
 
     def prompt_for_text(self, message: str) -> str:
+        import inquirer
         questions = [
             inquirer.Text('text', message=message),
         ]
@@ -59,7 +70,7 @@ class FacadeManager:
             self.selected_style = selected_choice.split(' (')[0]
 
 
-    def pdf_base64(self, job_description_url=None, job_description_text=None):
+    def _selected_style_uri(self, job_description_url=None, job_description_text=None) -> str:
         if (job_description_url is not None and job_description_text is not None):
             raise ValueError("Esattamente uno tra 'job_description_url' o 'job_description_text' deve essere fornito.")
         
@@ -67,17 +78,114 @@ class FacadeManager:
             raise ValueError("Devi scegliere uno stile prima di generare il PDF.")
         
         style_path = self.style_manager.get_style_path(self.selected_style)
+        # Il CSS viene incorporato come data URI: l'HTML va al browser senza file temporanei
+        return stylesheet_data_uri(style_path)
+
+    def _generate_html(self, job_description_url=None, job_description_text=None):
+        style_uri = self._selected_style_uri(job_description_url, job_description_text)
+
+        if job_description_url is None and job_description_text is None:
+            return self.resume_generator.create_resume(style_uri)
+        elif job_description_url is not None and job_description_text is None:
+            return self.resume_generator.create_resume_job_description_url(style_uri, job_description_url)
+        elif job_description_url is None and job_description_text is not None:
+            return self.resume_generator.create_resume_job_description_text(style_uri, job_description_text)
+        else:
+            return None
+
+    def stream_html(self, job_description_url=None, job_description_text=None):
+        # Anteprima progressiva: token man mano che arrivano, poi l'HTML parziale a ogni sezione completata
+        style_uri = self._selected_style_uri(job_description_url, job_description_text)
+        return self.resume_generator.stream_resume(style_uri, job_description_url, job_description_text)
+
+    def section_cache_stats(self) -> dict:
+        section_cache = get_section_cache()
+        return section_cache.stats() if section_cache is not None else {}
+
+    def invalidate_section_cache(self, section: str = None) -> int:
+        # Forza la rigenerazione di una sezione (o di tutte) al prossimo PDF
+        section_cache = get_section_cache()
+        return section_cache.invalidate(section) if section_cache is not None else 0
+
+    def usage_totals(self) -> dict:
+        # Token e costo di tutte le chiamate al modello fatte dal processo
+        return get_process_usage()
+
+    def pdf_base64(self, job_description_url=None, job_description_text=None):
+        # Il risultato porta in .usage token e costo delle chiamate fatte per questo resume
+        with span("facade.pdf_base64", style=self.selected_style), track_usage() as usage:
+            html = self._generate_html(job_description_url, job_description_text)
+            if html is None:
+                return None
+            pdf = self.renderer.pdf_base64(html)
+        self.last_usage = usage.summary()
+        return Base64PDF(pdf, self.last_usage)
 
-        with tempfile.NamedTemporaryFile(delete=False, mode='w', suffix='.html', encoding='utf-8') as temp_html_file:
-            temp_html_path = temp_html_file.name
-            if job_description_url is None and job_description_text is None:
-                self.resume_generator.create_resume(style_path, temp_html_path)
-            elif job_description_url is not None and job_description_text is None:
-                self.resume_generator.create_resume_job_description_url(style_path, job_description_url, temp_html_path)
-            elif job_description_url is None and job_description_text is not None:
-                self.resume_generator.create_resume_job_description_text(style_path, job_description_text, temp_html_path)
-            else:
+    def pdf_bytes(self, job_description_url=None, job_description_text=None) -> bytes:
+        buffer = io.BytesIO()
+        if self.write_pdf(buffer, job_description_url, job_description_text) is None:
+            return None
+        return buffer.getvalue()
+
+    def write_pdf(self, path_or_fileobj, job_description_url=None, job_description_text=None) -> int:
+        # Scrive il PDF a blocchi su un percorso o su un file binario aperto; restituisce i byte scritti
+        with span("facade.write_pdf", style=self.selected_style), track_usage() as usage:
+            html = self._generate_html(job_description_url, job_description_text)
+            self.last_usage = usage.summary()
+            if html is None:
                 return None
-        pdf_base64 = HTML_to_PDF(temp_html_path)
-        os.remove(temp_html_path)
-        return pdf_base64
+            if isinstance(path_or_fileobj, (str, os.PathLike)):
+                with open(path_or_fileobj, "wb") as f:
+                    return self.renderer.write_pdf(html, f)
+            return self.renderer.write_pdf(html, path_or_fileobj)
+
+
+class AsyncFacadeManager(FacadeManager):
+    """FacadeManager for asyncio applications.
+
+    Job description fetching, section generation and rendering all run on the
+    caller's event loop, so many resumes can be generated concurrently without
+    a thread per request.
+    """
+
+    async def _agenerate_html(self, job_description_url=None, job_description_text=None):
+        # Il CSS dello stile si legge da disco: fuori dall'event loop
+        style_uri = await asyncio.to_thread(self._selected_style_uri, job_description_url, job_description_text)
+
+        if job_description_url is None and job_description_text is None:
+            return await self.resume_generator.acreate_resume(style_uri)
+        elif job_description_url is not None:
+            return await self.resume_generator.acreate_resume_job_description_url(style_uri, job_description_url)
+        else:
+            return await self.resume_generator.acreate_resume_job_description_text(style_uri, job_description_text)
+
+    async def astream_html(self, job_description_url=None, job_description_text=None):
+        style_uri = await asyncio.to_thread(self._selected_style_uri, job_description_url, job_description_text)
+        async for event in self.resume_generator.astream_resume(style_uri, job_description_url, job_description_text):
+            yield event
+
+    async def pdf_base64(self, job_description_url=None, job_description_text=None):
+        with span("facade.pdf_base64", style=self.selected_style), track_usage() as usage:
+            html = await self._agenerate_html(job_description_url, job_description_text)
+            pdf = await self.renderer.apdf_base64(html)
+        # Con piu' resume in parallelo last_usage e' dell'ultimo finito: fa fede pdf.usage
+        self.last_usage = usage.summary()
+        return Base64PDF(pdf, self.last_usage)
+
+    async def pdf_bytes(self, job_description_url=None, job_description_text=None) -> bytes:
+        with span("facade.pdf_bytes", style=self.selected_style), track_usage() as usage:
+            html = await self._agenerate_html(job_description_url, job_description_text)
+            self.last_usage = usage.summary()
+            return await self.renderer.apdf_bytes(html)
+
+    async def write_pdf(self, path_or_fileobj, job_description_url=None, job_description_text=None) -> int:
+        with span("facade.write_pdf", style=self.selected_style), track_usage() as usage:
+            html = await self._agenerate_html(job_description_url, job_description_text)
+            self.last_usage = usage.summary()
+            if isinstance(path_or_fileobj, (str, os.PathLike)):
+                f = await asyncio.to_thread(open, path_or_fileobj, "wb")
+                try:
+                    return await self.renderer.awrite_pdf(html, f)
+                finally:
+                    await asyncio.to_thread(f.close)
+            return await self.renderer.awrite_pdf(html, path_or_fileobj)
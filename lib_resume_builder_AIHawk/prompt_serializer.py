@@ -0,0 +1,104 @@
+import logging
+import threading
+from typing import Any, Dict
+import yaml
+from pydantic import BaseModel
+from lib_resume_builder_AIHawk.rate_limiter import CHARS_PER_TOKEN
+
+logger = logging.getLogger(__name__)
+
+# Liste di dizionari con un'unica voce di cui conta solo il valore ({"responsibility_1": "..."})
+VALUE_ONLY_FIELDS = {"key_responsibilities"}
+EMPTY_VALUE = "None"
+
+
+class _PromptDumper(yaml.SafeDumper):
+    pass
+
+
+def _represent_list(dumper, data):
+    # Liste di valori semplici su una riga, tutto il resto a blocchi
+    flow_style = all(not isinstance(item, (dict, list)) for item in data)
+    return dumper.represent_sequence("tag:yaml.org,2002:seq", data, flow_style=flow_style)
+
+
+_PromptDumper.add_representer(list, _represent_list)
+
+
+def compact_value(value: Any, field: str = None) -> Any:
+    # Dati semplici al posto dei modelli pydantic, senza campi vuoti
+    if isinstance(value, BaseModel):
+        value = value.model_dump(mode="json", exclude_none=True)
+    if isinstance(value, dict):
+        compact = {}
+        for key, item in value.items():
+            item = compact_value(item, key)
+            if item not in (None, "", [], {}):
+                compact[str(key)] = item
+        return compact
+    if isinstance(value, (list, tuple, set, frozenset)):
+        items = sorted(value, key=str) if isinstance(value, (set, frozenset)) else value
+        if field in VALUE_ONLY_FIELDS:
+            items = [item for entry in items for item in (entry.values() if isinstance(entry, dict) else [entry])]
+        compact = [compact_value(item) for item in items]
+        return [item for item in compact if item not in (None, "", [], {})]
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+def serialize_for_prompt(value: Any) -> str:
+    """Terse YAML rendering of resume data for prompts: no class names, no
+    empty fields, URLs as plain strings, short lists inline."""
+    if isinstance(value, str):
+        return value
+    compact = compact_value(value)
+    if compact in (None, "", [], {}):
+        # I prompt chiedono di omettere le parti "None"
+        return EMPTY_VALUE
+    if not isinstance(compact, (dict, list)):
+        return str(compact)
+    return yaml.dump(compact, Dumper=_PromptDumper, sort_keys=False, allow_unicode=True, default_flow_style=False, width=10 ** 6).strip()
+
+
+def compact_prompt_inputs(inputs: Dict[str, Any]) -> Dict[str, str]:
+    return {name: serialize_for_prompt(value) for name, value in inputs.items()}
+
+
+_encoding = None
+_encoding_loader = None
+_encoding_lock = threading.Lock()
+
+
+def _load_encoding():
+    # False se tiktoken non puo' caricare la codifica (es. offline): si ripiega sulla stima
+    global _encoding
+    try:
+        import tiktoken
+        encoding = tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        logger.debug(f"tiktoken encoding unavailable, estimating token counts: {e}")
+        encoding = False
+    with _encoding_lock:
+        _encoding = encoding
+
+
+def preload_encoding() -> threading.Thread:
+    # Il primo uso puo' scaricare la codifica: la si carica in background, mai dentro una richiesta
+    global _encoding_loader
+    with _encoding_lock:
+        if _encoding_loader is None:
+            _encoding_loader = threading.Thread(target=_load_encoding, name="tiktoken-preload", daemon=True)
+            _encoding_loader.start()
+        return _encoding_loader
+
+
+def count_tokens(text: str, wait: bool = False) -> int:
+    # Finche' la codifica non e' pronta si usa la stima; wait=True aspetta il caricamento
+    if _encoding is None:
+        loader = preload_encoding()
+        if wait:
+            loader.join()
+    if not _encoding:
+        return len(text) // CHARS_PER_TOKEN
+    return len(_encoding.encode(text, disallowed_special=()))
@@ -0,0 +1,255 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from lib_resume_builder_AIHawk.config import global_config
+from lib_resume_builder_AIHawk.llm_cache import rendered_messages
+
+# Stima grossolana per l'inglese: ~4 caratteri per token, piu' qualche token di servizio per messaggio
+CHARS_PER_TOKEN = 4
+TOKENS_PER_MESSAGE = 4
+
+
+def estimate_prompt_tokens(messages) -> int:
+    rendered = rendered_messages(messages)
+    return sum(len(str(content)) // CHARS_PER_TOKEN + TOKENS_PER_MESSAGE for _, content in rendered)
+
+
+class TokenBucket:
+    def __init__(self, capacity: float, refill_per_second: float, clock=time.monotonic):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.clock = clock
+        self.tokens = capacity
+        self.updated_at = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.refill_per_second)
+        self.updated_at = now
+
+    def wait_time(self, amount: float) -> float:
+        self._refill()
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.refill_per_second
+
+    def consume(self, amount: float):
+        self._refill()
+        self.tokens -= amount
+
+    def adjust(self, delta: float):
+        # delta > 0: consumati piu' token del previsto (il saldo puo' andare in negativo)
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens - delta)
+
+
+class LLMReservation:
+    def __init__(self, tokens: int):
+        self.tokens = tokens
+        self.used_tokens = None
+        self.granted = False
+        # Chi aspetta: threading.Event per i thread, (loop, future) per le coroutine
+        self._event = None
+        self._future = None
+
+    def _wake(self):
+        if self._event is not None:
+            self._event.set()
+        elif self._future is not None:
+            loop, future = self._future
+            try:
+                loop.call_soon_threadsafe(_resolve_future, future)
+            except RuntimeError:
+                # Loop gia' chiuso: il chiamante non c'e' piu'
+                pass
+
+
+def _resolve_future(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class LLMRateLimiter:
+    """Process-wide scheduler for chat completion requests.
+
+    Callers queue in FIFO order and are let through only when the
+    requests-per-minute and tokens-per-minute buckets both have room and fewer
+    than `max_concurrency` requests are in flight. Tokens are reserved from the
+    prompt estimate and settled against the real `usage_metadata` once the
+    reply arrives. After a 429 `pause()` holds back every caller, not just the
+    one that was rejected.
+
+    Waiters never poll: only the head of the queue is woken, when a grant,
+    a release or a pause changes what it is waiting for, and a timer wakes it
+    when all it needs is for the buckets to refill or a pause to end.
+    """
+
+    def __init__(self, requests_per_minute: int = None, tokens_per_minute: int = None,
+                 max_concurrency: int = None, clock=time.monotonic):
+        self.clock = clock
+        self.max_concurrency = max_concurrency
+        self._requests = TokenBucket(requests_per_minute, requests_per_minute / 60, clock) if requests_per_minute else None
+        self._tokens = TokenBucket(tokens_per_minute, tokens_per_minute / 60, clock) if tokens_per_minute else None
+        self._lock = threading.Lock()
+        self._queue = deque()
+        self._in_flight = 0
+        self._paused_until = 0.0
+        self._timer = None
+        self._timer_due = None
+        self.granted = 0
+        self.pauses = 0
+        self.waited_seconds = 0.0
+
+    def _grant_wait(self, reservation: LLMReservation):
+        # Con il lock preso: None se la richiesta puo' partire, 0 se aspetta un posto libero,
+        # altrimenti i secondi che mancano alla fine della pausa o alla ricarica dei bucket
+        now = self.clock()
+        if now < self._paused_until:
+            return self._paused_until - now
+        if self.max_concurrency and self._in_flight >= self.max_concurrency:
+            return 0
+        tokens = min(reservation.tokens, self._tokens.capacity) if self._tokens else 0
+        wait = max(
+            self._requests.wait_time(1) if self._requests else 0.0,
+            self._tokens.wait_time(tokens) if self._tokens else 0.0,
+        )
+        return wait if wait > 0 else None
+
+    def _dispatch(self):
+        # Con il lock preso: fa partire le richieste in testa alla coda finche' possibile
+        while self._queue:
+            reservation = self._queue[0]
+            wait = self._grant_wait(reservation)
+            if wait is not None:
+                if wait > 0:
+                    self._schedule(wait)
+                return
+            if self._requests:
+                self._requests.consume(1)
+            if self._tokens:
+                self._tokens.consume(min(reservation.tokens, self._tokens.capacity))
+            self._in_flight += 1
+            self._queue.popleft()
+            reservation.granted = True
+            self.granted += 1
+            reservation._wake()
+
+    def _schedule(self, delay: float):
+        due = self.clock() + delay
+        if self._timer is not None and self._timer_due <= due:
+            return
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = threading.Timer(max(delay, 0.001), self._on_timer)
+        self._timer.daemon = True
+        self._timer_due = due
+        self._timer.start()
+
+    def _on_timer(self):
+        with self._lock:
+            self._timer = None
+            self._timer_due = None
+            self._dispatch()
+
+    def _enqueue(self, reservation: LLMReservation):
+        with self._lock:
+            self._queue.append(reservation)
+            self._dispatch()
+
+    def _abandon(self, reservation: LLMReservation):
+        # Il chiamante ha smesso di aspettare: esce dalla coda, oppure restituisce il posto appena ottenuto
+        with self._lock:
+            granted = reservation.granted
+            if not granted and reservation in self._queue:
+                self._queue.remove(reservation)
+                self._dispatch()
+        if granted:
+            self.release(reservation)
+
+    def acquire(self, estimated_tokens: int) -> LLMReservation:
+        reservation = LLMReservation(estimated_tokens)
+        reservation._event = threading.Event()
+        started = self.clock()
+        self._enqueue(reservation)
+        try:
+            reservation._event.wait()
+        except BaseException:
+            self._abandon(reservation)
+            raise
+        with self._lock:
+            self.waited_seconds += self.clock() - started
+        return reservation
+
+    async def aacquire(self, estimated_tokens: int) -> LLMReservation:
+        # Stessa coda dei thread; l'attesa e' un future risolto dal thread che libera il posto
+        loop = asyncio.get_running_loop()
+        reservation = LLMReservation(estimated_tokens)
+        future = loop.create_future()
+        reservation._future = (loop, future)
+        started = self.clock()
+        self._enqueue(reservation)
+        try:
+            await future
+        except BaseException:
+            self._abandon(reservation)
+            raise
+        with self._lock:
+            self.waited_seconds += self.clock() - started
+        return reservation
+
+    def release(self, reservation: LLMReservation):
+        with self._lock:
+            self._in_flight -= 1
+            if self._tokens and reservation.used_tokens is not None:
+                self._tokens.adjust(reservation.used_tokens - min(reservation.tokens, self._tokens.capacity))
+            self._dispatch()
+
+    @contextmanager
+    def reserve(self, estimated_tokens: int):
+        reservation = self.acquire(estimated_tokens)
+        try:
+            yield reservation
+        finally:
+            self.release(reservation)
+
+    @asynccontextmanager
+    async def areserve(self, estimated_tokens: int):
+        reservation = await self.aacquire(estimated_tokens)
+        try:
+            yield reservation
+        finally:
+            self.release(reservation)
+
+    def pause(self, seconds: float):
+        with self._lock:
+            self._paused_until = max(self._paused_until, self.clock() + seconds)
+            self.pauses += 1
+            self._dispatch()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "granted": self.granted,
+                "queued": len(self._queue),
+                "in_flight": self._in_flight,
+                "pauses": self.pauses,
+                "waited_seconds": round(self.waited_seconds, 3),
+            }
+
+
+_llm_rate_limiter = None
+_llm_rate_limiter_lock = threading.Lock()
+
+
+def get_llm_rate_limiter() -> LLMRateLimiter:
+    global _llm_rate_limiter
+    with _llm_rate_limiter_lock:
+        if _llm_rate_limiter is None:
+            _llm_rate_limiter = LLMRateLimiter(
+                requests_per_minute=global_config.LLM_REQUESTS_PER_MINUTE,
+                tokens_per_minute=global_config.LLM_TOKENS_PER_MINUTE,
+                max_concurrency=global_config.LLM_MAX_CONCURRENT_REQUESTS,
+            )
+        return _llm_rate_limiter
@@ -0,0 +1,122 @@
+import asyncio
+import atexit
+import io
+import logging
+import threading
+from abc import ABC, abstractmethod
+from typing import List
+from lib_resume_builder_AIHawk.config import global_config
+
+logger = logging.getLogger(__name__)
+
+
+class Renderer(ABC):
+    """Turns a complete HTML document into a PDF.
+
+    Backends only have to implement the synchronous methods; the async variants
+    default to running them in a worker thread and can be overridden by
+    backends that are natively asynchronous.
+    """
+
+    @abstractmethod
+    def pdf_base64(self, html: str) -> str:
+        pass
+
+    @abstractmethod
+    def write_pdf(self, html: str, fileobj) -> int:
+        pass
+
+    @abstractmethod
+    def pdf_base64_batch(self, html_documents: List[str], print_options: dict = None, concurrency: int = None) -> List[str]:
+        pass
+
+    @abstractmethod
+    def fetch_html(self, url: str, quiet_ms: int = 0) -> str:
+        # Carica un URL con il browser del renderer e restituisce l'outerHTML del body
+        pass
+
+    def pdf_bytes(self, html: str) -> bytes:
+        buffer = io.BytesIO()
+        self.write_pdf(html, buffer)
+        return buffer.getvalue()
+
+    def browser_pids(self) -> List[int]:
+        # PID dei processi browser attivi (usato dai benchmark per misurare la memoria)
+        return []
+
+    def close(self):
+        pass
+
+    async def apdf_base64(self, html: str) -> str:
+        return await asyncio.to_thread(self.pdf_base64, html)
+
+    async def awrite_pdf(self, html: str, fileobj) -> int:
+        return await asyncio.to_thread(self.write_pdf, html, fileobj)
+
+    async def apdf_bytes(self, html: str) -> bytes:
+        buffer = io.BytesIO()
+        await self.awrite_pdf(html, buffer)
+        return buffer.getvalue()
+
+    async def apdf_base64_batch(self, html_documents: List[str], print_options: dict = None, concurrency: int = None) -> List[str]:
+        return await asyncio.to_thread(self.pdf_base64_batch, html_documents, print_options, concurrency)
+
+    async def afetch_html(self, url: str, quiet_ms: int = 0) -> str:
+        return await asyncio.to_thread(self.fetch_html, url, quiet_ms)
+
+
+class SeleniumRenderer(Renderer):
+    """Renders through the pooled Selenium/chromedriver sessions in `renderer_pool`."""
+
+    def pdf_base64(self, html: str) -> str:
+        from lib_resume_builder_AIHawk.utils import HTML_string_to_PDF
+        return HTML_string_to_PDF(html)
+
+    def write_pdf(self, html: str, fileobj) -> int:
+        from lib_resume_builder_AIHawk.utils import HTML_string_to_PDF_stream
+        return HTML_string_to_PDF_stream(html, fileobj)
+
+    def pdf_base64_batch(self, html_documents: List[str], print_options: dict = None, concurrency: int = None) -> List[str]:
+        from lib_resume_builder_AIHawk.utils import HTML_strings_to_PDF_batch
+        return HTML_strings_to_PDF_batch(html_documents, print_options, concurrency)
+
+    def fetch_html(self, url: str, quiet_ms: int = 0) -> str:
+        from lib_resume_builder_AIHawk.utils import URL_to_HTML
+        return URL_to_HTML(url, quiet_ms)
+
+    def browser_pids(self) -> List[int]:
+        from lib_resume_builder_AIHawk.renderer_pool import get_renderer_pool
+        return get_renderer_pool().browser_pids()
+
+    def close(self):
+        from lib_resume_builder_AIHawk.renderer_pool import close_renderer_pool
+        close_renderer_pool()
+
+
+def create_renderer(backend: str = None) -> Renderer:
+    # "auto" prova il backend CDP e ripiega su Selenium se Chrome o websockets non sono disponibili
+    backend = backend or global_config.RENDERER_BACKEND
+    if backend in ("auto", "cdp"):
+        try:
+            from lib_resume_builder_AIHawk.cdp_renderer import CDPRenderer
+            return CDPRenderer()
+        except (ImportError, FileNotFoundError) as e:
+            if backend == "cdp":
+                raise
+            logger.info(f"CDP renderer unavailable ({e}), falling back to Selenium.")
+    if backend in ("auto", "selenium"):
+        return SeleniumRenderer()
+    raise ValueError(f"Unknown renderer backend: {backend}")
+
+
+_renderer = None
+_renderer_lock = threading.Lock()
+
+
+def get_renderer() -> Renderer:
+    global _renderer
+    with _renderer_lock:
+        if _renderer is None:
+            _renderer = create_renderer()
+            atexit.register(_renderer.close)
+        return _renderer
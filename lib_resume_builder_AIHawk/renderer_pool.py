@@ -0,0 +1,147 @@
+import atexit
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from lib_resume_builder_AIHawk.config import global_config
+from lib_resume_builder_AIHawk.tracing import span
+from lib_resume_builder_AIHawk.utils import create_driver_selenium
+
+logger = logging.getLogger(__name__)
+
+
+class PooledBrowser:
+    def __init__(self, driver):
+        self.driver = driver
+        self.renders = 0
+        self.broken = False
+
+
+class RendererPool:
+    """Keeps a bounded set of warm Chrome sessions that are checked out one job at a time.
+
+    Sessions are reset to a blank page when they come back to the pool and are
+    recycled after `max_renders` jobs or as soon as a job fails on them.
+    """
+
+    def __init__(self, size: int = None, max_renders: int = None, driver_factory=None):
+        self.size = size or global_config.RENDERER_POOL_SIZE
+        self.max_renders = max_renders or global_config.RENDERER_MAX_RENDERS
+        self.driver_factory = driver_factory or create_driver_selenium
+        self._idle = []  # LIFO: si riusa il browser usato per ultimo, con la cache piu' calda
+        self._lock = threading.Lock()
+        # Svegliata quando un browser torna libero o uno scartato libera un posto
+        self._available = threading.Condition(self._lock)
+        self._created = 0
+        self._browsers = set()
+        self._closed = False
+
+    @contextmanager
+    def checkout(self, timeout: float = None):
+        with span("renderer.checkout"):
+            browser = self._acquire(timeout)
+        try:
+            yield browser.driver
+        except Exception:
+            # Dopo un errore lo stato della sessione non e' affidabile: la scartiamo
+            browser.broken = True
+            raise
+        finally:
+            browser.renders += 1
+            self._release(browser)
+
+    def _acquire(self, timeout: float = None) -> PooledBrowser:
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self._available:
+            while True:
+                if self._closed:
+                    raise RuntimeError("The renderer pool has been closed.")
+                if self._idle:
+                    return self._idle.pop()
+                if self._created < self.size:
+                    self._created += 1
+                    break
+                remaining = deadline - time.monotonic() if deadline is not None else None
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError(f"No browser became available in the renderer pool within {timeout} seconds.")
+                self._available.wait(remaining)
+        # Il browser si avvia fuori dal lock: gli altri thread continuano a prendere quelli liberi
+        try:
+            with span("renderer.browser_launch", backend="selenium"):
+                browser = PooledBrowser(self.driver_factory())
+        except BaseException:
+            with self._available:
+                self._created -= 1
+                self._available.notify()
+            raise
+        with self._lock:
+            self._browsers.add(browser)
+        return browser
+
+    def _release(self, browser: PooledBrowser):
+        if self._closed or browser.broken or browser.renders >= self.max_renders:
+            self._discard(browser)
+            return
+        try:
+            self._reset(browser.driver)
+        except Exception as e:
+            logger.warning(f"Failed to reset pooled browser, recycling it: {e}")
+            self._discard(browser)
+            return
+        with self._available:
+            self._idle.append(browser)
+            self._available.notify()
+
+    @staticmethod
+    def _reset(driver):
+        handles = driver.window_handles
+        for handle in handles[1:]:
+            driver.switch_to.window(handle)
+            driver.close()
+        driver.switch_to.window(handles[0])
+        driver.get("about:blank")
+
+    def _discard(self, browser: PooledBrowser):
+        with self._available:
+            self._created -= 1
+            self._browsers.discard(browser)
+            self._available.notify()
+        try:
+            browser.driver.quit()
+        except Exception as e:
+            logger.debug(f"Error while quitting pooled browser: {e}")
+
+    def browser_pids(self):
+        # PID dei processi chromedriver delle sessioni vive; Chrome gira come loro figlio
+        with self._lock:
+            browsers = list(self._browsers)
+        return [browser.driver.service.process.pid for browser in browsers if browser.driver.service.process]
+
+    def close(self):
+        with self._available:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._available.notify_all()
+        for browser in idle:
+            self._discard(browser)
+
+
+_renderer_pool = None
+_renderer_pool_lock = threading.Lock()
+
+
+def get_renderer_pool() -> RendererPool:
+    global _renderer_pool
+    with _renderer_pool_lock:
+        if _renderer_pool is None:
+            _renderer_pool = RendererPool()
+            atexit.register(_renderer_pool.close)
+        return _renderer_pool
+
+
+def close_renderer_pool():
+    global _renderer_pool
+    with _renderer_pool_lock:
+        if _renderer_pool is not None:
+            _renderer_pool.close()
+            _renderer_pool = None
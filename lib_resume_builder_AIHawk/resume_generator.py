@@ -1,38 +1,117 @@
+import asyncio
+from dataclasses import replace
 from typing import Any
 from string import Template
 from typing import Any
-from lib_resume_builder_AIHawk.gpt_resume import LLMResumer
-from lib_resume_builder_AIHawk.gpt_resume_job_description import LLMResumeJobDescription
+from lib_resume_builder_AIHawk.asset_bundle import get_asset_bundle
 from lib_resume_builder_AIHawk.module_loader import load_module
 from lib_resume_builder_AIHawk.config import global_config
+from lib_resume_builder_AIHawk.tracing import span
 
 class ResumeGenerator:
     def __init__(self):
-        pass
+        self.renderer = None
     
     def set_resume_object(self, resume_object):
          self.resume_object = resume_object
 
-    def _create_resume(self, gpt_answerer: Any, style_path, temp_html_path):
+    def set_renderer(self, renderer):
+        # Browser condiviso anche per leggere le job description da URL
+        self.renderer = renderer
+
+    def _render_template(self, body: str, style_path, temp_html_path=None) -> str:
+        with span("resume_generator.render_template", assets_mode=global_config.ASSETS_MODE):
+            template = Template(global_config.html_template)
+            message = template.substitute(markdown=body, style_path=style_path)
+            if global_config.ASSETS_MODE == "bundle":
+                message = get_asset_bundle().inline(message)
+        # Senza percorso l'HTML resta solo in memoria
+        if temp_html_path is not None:
+            with open(temp_html_path, 'w', encoding='utf-8') as temp_file:
+                temp_file.write(message)
+        return message
+
+    def _create_resume(self, gpt_answerer: Any, style_path, temp_html_path=None) -> str:
+        gpt_answerer.set_resume(self.resume_object)
+        with span("resume_generator.create_resume", generator=type(gpt_answerer).__name__):
+            return self._render_template(gpt_answerer.generate_html_resume(), style_path, temp_html_path)
+
+    async def _acreate_resume(self, gpt_answerer: Any, style_path, temp_html_path=None) -> str:
         gpt_answerer.set_resume(self.resume_object)
-        template = Template(global_config.html_template)
-        message = template.substitute(markdown=gpt_answerer.generate_html_resume(), style_path=style_path)
-        with open(temp_html_path, 'w', encoding='utf-8') as temp_file:
-            temp_file.write(message)
+        with span("resume_generator.create_resume", generator=type(gpt_answerer).__name__):
+            body = await gpt_answerer.agenerate_html_resume()
+            # Il bundle puo' scaricare CSS mancanti: fuori dall'event loop
+            return await asyncio.to_thread(self._render_template, body, style_path, temp_html_path)
 
-    def create_resume(self, style_path, temp_html_file):
+    @staticmethod
+    def _resumer():
+        # I moduli del modello (langchain, openai, FAISS) si caricano alla prima generazione
+        from lib_resume_builder_AIHawk.gpt_resume import LLMResumer
         strings = load_module(global_config.STRINGS_MODULE_RESUME_PATH, global_config.STRINGS_MODULE_NAME)
-        gpt_answerer = LLMResumer(global_config.API_KEY, strings)
-        self._create_resume(gpt_answerer, style_path, temp_html_file)
+        return LLMResumer(global_config.API_KEY, strings)
 
-    def create_resume_job_description_url(self, style_path: str, url_job_description: str, temp_html_path):
+    @staticmethod
+    def _job_description_resumer():
+        from lib_resume_builder_AIHawk.gpt_resume_job_description import LLMResumeJobDescription
         strings = load_module(global_config.STRINGS_MODULE_RESUME_JOB_DESCRIPTION_PATH, global_config.STRINGS_MODULE_NAME)
-        gpt_answerer = LLMResumeJobDescription(global_config.API_KEY, strings)
-        gpt_answerer.set_job_description_from_url(url_job_description)
-        self._create_resume(gpt_answerer, style_path, temp_html_path)
+        return LLMResumeJobDescription(global_config.API_KEY, strings)
 
-    def create_resume_job_description_text(self, style_path: str, job_description_text: str, temp_html_path):
-        strings = load_module(global_config.STRINGS_MODULE_RESUME_JOB_DESCRIPTION_PATH, global_config.STRINGS_MODULE_NAME)
-        gpt_answerer = LLMResumeJobDescription(global_config.API_KEY, strings)
+    def _stream_answerer(self, job_description_url=None, job_description_text=None):
+        if job_description_url is None and job_description_text is None:
+            gpt_answerer = self._resumer()
+        else:
+            gpt_answerer = self._job_description_resumer()
+        gpt_answerer.set_resume(self.resume_object)
+        return gpt_answerer
+
+    def stream_resume(self, style_path, job_description_url=None, job_description_text=None):
+        # Eventi di resume_stream; negli eventi section/done l'HTML e' gia' il documento completo
+        gpt_answerer = self._stream_answerer(job_description_url, job_description_text)
+        if job_description_url is not None:
+            gpt_answerer.set_job_description_from_url(job_description_url, self.renderer)
+        elif job_description_text is not None:
+            gpt_answerer.set_job_description_from_text(job_description_text)
+        for event in gpt_answerer.stream_html_resume():
+            if event.html is not None:
+                event = replace(event, html=self._render_template(event.html, style_path))
+            yield event
+
+    async def astream_resume(self, style_path, job_description_url=None, job_description_text=None):
+        # load_module legge ed esegue il file dei prompt: fuori dall'event loop
+        gpt_answerer = await asyncio.to_thread(self._stream_answerer, job_description_url, job_description_text)
+        if job_description_url is not None:
+            await gpt_answerer.aset_job_description_from_url(job_description_url, self.renderer)
+        elif job_description_text is not None:
+            await gpt_answerer.aset_job_description_from_text(job_description_text)
+        async for event in gpt_answerer.astream_html_resume():
+            if event.html is not None:
+                event = replace(event, html=await asyncio.to_thread(self._render_template, event.html, style_path))
+            yield event
+
+    def create_resume(self, style_path, temp_html_file=None) -> str:
+        gpt_answerer = self._resumer()
+        return self._create_resume(gpt_answerer, style_path, temp_html_file)
+
+    def create_resume_job_description_url(self, style_path: str, url_job_description: str, temp_html_path=None) -> str:
+        gpt_answerer = self._job_description_resumer()
+        gpt_answerer.set_job_description_from_url(url_job_description, self.renderer)
+        return self._create_resume(gpt_answerer, style_path, temp_html_path)
+
+    def create_resume_job_description_text(self, style_path: str, job_description_text: str, temp_html_path=None) -> str:
+        gpt_answerer = self._job_description_resumer()
         gpt_answerer.set_job_description_from_text(job_description_text)
-        self._create_resume(gpt_answerer, style_path, temp_html_path)
+        return self._create_resume(gpt_answerer, style_path, temp_html_path)
+
+    async def acreate_resume(self, style_path, temp_html_file=None) -> str:
+        gpt_answerer = await asyncio.to_thread(self._resumer)
+        return await self._acreate_resume(gpt_answerer, style_path, temp_html_file)
+
+    async def acreate_resume_job_description_url(self, style_path: str, url_job_description: str, temp_html_path=None) -> str:
+        gpt_answerer = await asyncio.to_thread(self._job_description_resumer)
+        await gpt_answerer.aset_job_description_from_url(url_job_description, self.renderer)
+        return await self._acreate_resume(gpt_answerer, style_path, temp_html_path)
+
+    async def acreate_resume_job_description_text(self, style_path: str, job_description_text: str, temp_html_path=None) -> str:
+        gpt_answerer = await asyncio.to_thread(self._job_description_resumer)
+        await gpt_answerer.aset_job_description_from_text(job_description_text)
+        return await self._acreate_resume(gpt_answerer, style_path, temp_html_path)
@@ -0,0 +1,127 @@
+import asyncio
+import contextvars
+import logging
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, Iterator, List
+
+logger = logging.getLogger(__name__)
+
+TOKEN = "token"
+SECTION = "section"
+DONE = "done"
+
+
+@dataclass
+class ResumeStreamEvent:
+    type: str  # "token", "section" oppure "done"
+    section: str = None
+    text: str = ""  # Pezzo di testo generato (token) oppure l'HTML completo della sezione (section)
+    html: str = None  # HTML parziale con le sezioni emesse finora (section, done)
+
+
+class _SectionOrder:
+    # Rilascia le sezioni finite nell'ordine del documento: una sezione pronta aspetta le precedenti
+    def __init__(self, generator, sections: List[str]):
+        self.generator = generator
+        self.sections = sections
+        self.results: Dict[str, str] = {}
+        self._finished: Dict[str, str] = {}
+        self._next = 0
+
+    def finish(self, section: str, output: str) -> List[ResumeStreamEvent]:
+        self._finished[section] = output
+        events = []
+        while self._next < len(self.sections) and self.sections[self._next] in self._finished:
+            ready = self.sections[self._next]
+            self._next += 1
+            output = self._finished.pop(ready)
+            if output:
+                self.results[ready] = output
+            events.append(ResumeStreamEvent(SECTION, ready, output, self.html()))
+        return events
+
+    def html(self) -> str:
+        return self.generator._assemble_html_resume(self.results)
+
+
+def stream_html_resume(generator) -> Iterator[ResumeStreamEvent]:
+    """Yields token events as sections are generated in parallel threads, a
+    section event (with the partial HTML) each time the next section in
+    document order is complete, and a final done event with the whole body."""
+    sections = generator._planned_sections()
+    order = _SectionOrder(generator, sections)
+    events = queue.Queue()
+    stopped = threading.Event()
+
+    def run(section):
+        output = ""
+        tokens = generator._stream_section(section)
+        try:
+            for token in tokens:
+                if stopped.is_set():
+                    return
+                output += token
+                events.put((TOKEN, section, token))
+        except Exception:
+            logger.exception(f"Generation of the {section} section failed")
+            output = ""
+        finally:
+            tokens.close()
+        events.put((SECTION, section, output))
+
+    executor = ThreadPoolExecutor(max_workers=max(len(sections), 1))
+    try:
+        for section in sections:
+            executor.submit(contextvars.copy_context().run, run, section)
+        remaining = len(sections)
+        while remaining:
+            kind, section, text = events.get()
+            if kind == TOKEN:
+                yield ResumeStreamEvent(TOKEN, section, text)
+            else:
+                remaining -= 1
+                yield from order.finish(section, text)
+    finally:
+        # Il chiamante puo' smettere di leggere a meta': chiudere lo stream non aspetta i thread,
+        # che si fermano al token successivo
+        stopped.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+    yield ResumeStreamEvent(DONE, html=order.html())
+
+
+async def astream_html_resume(generator) -> AsyncIterator[ResumeStreamEvent]:
+    # Come stream_html_resume, ma con un task per sezione sull'event loop corrente
+    sections = generator._planned_sections()
+    order = _SectionOrder(generator, sections)
+    events = asyncio.Queue()
+
+    async def run(section):
+        output = ""
+        try:
+            async for token in generator._astream_section(section):
+                output += token
+                events.put_nowait((TOKEN, section, token))
+        except Exception:
+            logger.exception(f"Generation of the {section} section failed")
+            output = ""
+        events.put_nowait((SECTION, section, output))
+
+    tasks = [asyncio.create_task(run(section)) for section in sections]
+    try:
+        remaining = len(sections)
+        while remaining:
+            kind, section, text = await events.get()
+            if kind == TOKEN:
+                yield ResumeStreamEvent(TOKEN, section, text)
+            else:
+                remaining -= 1
+                for event in order.finish(section, text):
+                    yield event
+    finally:
+        # Il chiamante puo' smettere di leggere a meta': le sezioni ancora in corso vanno fermate
+        for task in tasks:
+            task.cancel()
+    yield ResumeStreamEvent(DONE, html=order.html())
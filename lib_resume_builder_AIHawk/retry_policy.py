@@ -0,0 +1,305 @@
+import asyncio
+import logging
+import random
+import re
+import threading
+import time
+from email.utils import parsedate_to_datetime
+import openai
+from requests.exceptions import HTTPError as HTTPStatusError
+from lib_resume_builder_AIHawk.config import global_config
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE = "retryable"
+RATE_LIMITED = "rate_limited"
+FATAL = "fatal"
+
+RETRYABLE_STATUS_CODES = {408, 409, 500, 502, 503, 504}
+# Durate nel formato degli header x-ratelimit-reset-* di OpenAI: "1s", "6m0s", "20ms", "1h2m3.5s"
+DURATION_RE = re.compile(r'(\d+(?:\.\d+)?)(ms|h|m|s|d)')
+DURATION_SECONDS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600, "d": 86400}
+RETRY_IN_RE = re.compile(r'(?:try again|retry) in ((?:\d+(?:\.\d+)?(?:ms|h|m|s|d))+)', re.IGNORECASE)
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+class RetryError(RuntimeError):
+    pass
+
+
+class EmptyResponseError(RuntimeError):
+    # Il modello ha chiuso lo stream senza inviare nulla: si riprova come un errore di rete
+    pass
+
+
+def parse_duration(value: str):
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = DURATION_RE.findall(value)
+    if not parts or "".join(number + unit for number, unit in parts) != value:
+        return None
+    return sum(float(number) * DURATION_SECONDS[unit] for number, unit in parts)
+
+
+def _status_code(error):
+    status = getattr(error, "status_code", None)
+    if status is None and getattr(error, "response", None) is not None:
+        status = getattr(error.response, "status_code", None)
+    return status
+
+
+def _headers(error) -> dict:
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    return {str(k).lower(): str(v) for k, v in headers.items()}
+
+
+def retry_after_seconds(error):
+    # Attesa suggerita dal server: header Retry-After / x-ratelimit-reset, altrimenti il testo dell'errore
+    headers = _headers(error)
+    if "retry-after-ms" in headers:
+        seconds = parse_duration(headers["retry-after-ms"])
+        if seconds is not None:
+            return seconds / 1000
+    if "retry-after" in headers:
+        seconds = parse_duration(headers["retry-after"])
+        if seconds is None:
+            try:
+                seconds = parsedate_to_datetime(headers["retry-after"]).timestamp() - time.time()
+            except (TypeError, ValueError):
+                seconds = None
+        if seconds is not None:
+            return max(0.0, seconds)
+    resets = [parse_duration(headers[name]) for name in ("x-ratelimit-reset-requests", "x-ratelimit-reset-tokens") if name in headers]
+    resets = [seconds for seconds in resets if seconds is not None]
+    if resets:
+        return max(resets)
+    if "x-ratelimit-reset" in headers:
+        seconds = parse_duration(headers["x-ratelimit-reset"])
+        if seconds is not None:
+            # Alcuni proxy mandano un timestamp epoch invece di una durata
+            return max(0.0, seconds - time.time()) if seconds > 10 ** 9 else seconds
+    match = RETRY_IN_RE.search(str(error))
+    if match:
+        return parse_duration(match.group(1))
+    return None
+
+
+def classify_error(error) -> str:
+    if isinstance(error, CircuitOpenError):
+        return FATAL
+    if isinstance(error, openai.RateLimitError):
+        # Credito esaurito: riprovare non serve
+        if getattr(error, "code", None) == "insufficient_quota":
+            return FATAL
+        return RATE_LIMITED
+    if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError, openai.InternalServerError,
+                          ConnectionError, TimeoutError, asyncio.TimeoutError, EmptyResponseError)):
+        return RETRYABLE
+    if isinstance(error, (openai.APIStatusError, HTTPStatusError)):
+        status = _status_code(error)
+        if status == 429:
+            return RATE_LIMITED
+        if status in RETRYABLE_STATUS_CODES or (status is not None and status >= 500):
+            return RETRYABLE
+        return FATAL
+    return FATAL
+
+
+class CircuitBreaker:
+    """Stops calling an upstream that keeps failing.
+
+    After `failure_threshold` consecutive upstream failures the circuit opens
+    and calls fail immediately with CircuitOpenError. Once `reset_timeout`
+    seconds have passed a single trial call is let through; its outcome
+    closes the circuit again or re-opens it.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_progress = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if self.clock() - self._opened_at >= self.reset_timeout:
+                return "half-open"
+            return "open"
+
+    def before_call(self):
+        with self._lock:
+            if self._opened_at is None:
+                return
+            retry_in = self.reset_timeout - (self.clock() - self._opened_at)
+            if retry_in > 0 or self._trial_in_progress:
+                raise CircuitOpenError(f"LLM upstream circuit is open after {self._failures} consecutive failures; retry in {max(retry_in, 0):.0f}s.")
+            self._trial_in_progress = True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_progress = False
+
+    def release_trial(self):
+        # Tentativo finito senza dire nulla sul servizio (cancellato o limitato): un'altra chiamata puo' riprovare
+        with self._lock:
+            self._trial_in_progress = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_progress = False
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    logger.error(f"Opening LLM circuit after {self._failures} consecutive failures")
+                self._opened_at = self.clock()
+
+
+class RetryPolicy:
+    """Retries a call within a total deadline using decorrelated jitter.
+
+    Fatal errors are raised at once. Retryable ones wait
+    min(max_delay, uniform(base_delay, 3 * previous_delay)), or the server's
+    Retry-After hint when there is one. Rate-limit waits are handed to
+    `on_rate_limit` (the shared limiter) so every caller backs off together.
+    A wait that would overrun the deadline ends the retries immediately.
+
+    The deadline also bounds the attempts themselves: async attempts are
+    cancelled when it expires, and since a sync attempt cannot be
+    interrupted, one is only started while `attempt_timeout` (the HTTP
+    timeout) still fits in the remaining time.
+    """
+
+    def __init__(self, max_attempts: int, deadline: float, base_delay: float, max_delay: float,
+                 circuit_breaker: CircuitBreaker = None, clock=time.monotonic, sleep=time.sleep,
+                 attempt_timeout: float = 0):
+        self.max_attempts = max_attempts
+        self.deadline = deadline
+        self.attempt_timeout = attempt_timeout
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.circuit_breaker = circuit_breaker
+        self.clock = clock
+        self.sleep = sleep
+
+    def _next_delay(self, previous_delay: float) -> float:
+        return min(self.max_delay, random.uniform(self.base_delay, max(self.base_delay, previous_delay * 3)))
+
+    def _before_attempt(self):
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.before_call()
+
+    def _remaining(self, started: float) -> float:
+        return self.deadline - (self.clock() - started) if self.deadline else float("inf")
+
+    def _after_error(self, error, attempt: int, started: float, previous_delay: float, attempt_timeout: float = 0):
+        # Restituisce (attesa, tipo di errore) oppure solleva se non si deve riprovare;
+        # attempt_timeout e' la durata che il tentativo successivo deve poter avere prima della scadenza
+        kind = classify_error(error)
+        if self.circuit_breaker is not None:
+            # Un errore 4xx vuol dire che il servizio risponde: non conta per il circuito.
+            # Un 429 si smaltisce aspettando, senza aprire il circuito
+            if kind == FATAL:
+                self.circuit_breaker.record_success()
+            elif kind == RATE_LIMITED:
+                self.circuit_breaker.release_trial()
+            else:
+                self.circuit_breaker.record_failure()
+        if kind == FATAL:
+            raise error
+        delay = self._next_delay(previous_delay)
+        hinted = retry_after_seconds(error)
+        if hinted is not None:
+            delay = max(delay, hinted) if kind == RATE_LIMITED else min(self.max_delay, max(delay, hinted))
+        if attempt + 1 >= self.max_attempts or delay + attempt_timeout >= self._remaining(started):
+            raise RetryError(f"LLM request failed after {attempt + 1} attempts in {self.clock() - started:.1f}s: {error}") from error
+        logger.warning(f"LLM request failed ({kind}: {error}); retrying in {delay:.1f}s (attempt {attempt + 1}/{self.max_attempts})")
+        return delay, kind
+
+    def _abandon_attempt(self):
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.release_trial()
+
+    def _after_success(self):
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.record_success()
+
+    def call(self, fn, on_rate_limit=None):
+        started = self.clock()
+        delay = self.base_delay
+        for attempt in range(self.max_attempts):
+            self._before_attempt()
+            try:
+                result = fn()
+            except Exception as error:
+                # Un tentativo sincrono non si interrompe: parte solo se il timeout HTTP sta nel tempo rimasto
+                delay, kind = self._after_error(error, attempt, started, delay, self.attempt_timeout)
+                if kind == RATE_LIMITED and on_rate_limit is not None:
+                    on_rate_limit(delay)
+                else:
+                    self.sleep(delay)
+                continue
+            except BaseException:
+                # Cancellazione o interruzione: la prova del circuito semiaperto non deve restare appesa
+                self._abandon_attempt()
+                raise
+            self._after_success()
+            return result
+
+    async def acall(self, coroutine_fn, on_rate_limit=None):
+        started = self.clock()
+        delay = self.base_delay
+        for attempt in range(self.max_attempts):
+            self._before_attempt()
+            try:
+                # Il tentativo viene annullato alla scadenza del tempo totale
+                result = await asyncio.wait_for(coroutine_fn(), self._remaining(started) if self.deadline else None)
+            except Exception as error:
+                delay, kind = self._after_error(error, attempt, started, delay)
+                if kind == RATE_LIMITED and on_rate_limit is not None:
+                    on_rate_limit(delay)
+                else:
+                    await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                # Cancellazione o interruzione: la prova del circuito semiaperto non deve restare appesa
+                self._abandon_attempt()
+                raise
+            self._after_success()
+            return result
+
+
+_llm_retry_policy = None
+_llm_retry_policy_lock = threading.Lock()
+
+
+def get_llm_retry_policy() -> RetryPolicy:
+    global _llm_retry_policy
+    with _llm_retry_policy_lock:
+        if _llm_retry_policy is None:
+            _llm_retry_policy = RetryPolicy(
+                max_attempts=global_config.LLM_RETRY_MAX_ATTEMPTS,
+                deadline=global_config.LLM_RETRY_DEADLINE,
+                base_delay=global_config.LLM_RETRY_BASE_DELAY,
+                max_delay=global_config.LLM_RETRY_MAX_DELAY,
+                circuit_breaker=CircuitBreaker(
+                    global_config.LLM_CIRCUIT_FAILURE_THRESHOLD,
+                    global_config.LLM_CIRCUIT_RESET_TIMEOUT,
+                ),
+                attempt_timeout=global_config.LLM_HTTP_TIMEOUT,
+            )
+        return _llm_retry_policy
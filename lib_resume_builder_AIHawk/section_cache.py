@@ -0,0 +1,91 @@
+import atexit
+import hashlib
+import json
+import threading
+from collections import defaultdict
+from lib_resume_builder_AIHawk.config import global_config
+from lib_resume_builder_AIHawk.llm_cache import model_parameters
+from lib_resume_builder_AIHawk.sqlite_cache import SQLiteCache
+
+
+def _stable_value(value):
+    # Forma canonica degli input: modelli pydantic, insiemi e dizionari in ordine stabile
+    if hasattr(value, "model_dump"):
+        return _stable_value(value.model_dump(mode="json"))
+    if isinstance(value, dict):
+        return {str(k): _stable_value(v) for k, v in sorted(value.items(), key=lambda item: str(item[0]))}
+    if isinstance(value, (set, frozenset)):
+        return sorted((_stable_value(v) for v in value), key=lambda v: json.dumps(v, sort_keys=True, default=str))
+    if isinstance(value, (list, tuple)):
+        return [_stable_value(v) for v in value]
+    return value
+
+
+def stable_hash(value) -> str:
+    payload = json.dumps(_stable_value(value), sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SectionFragmentCache:
+    """Caches the HTML fragment of each resume section keyed on exactly its inputs.
+
+    The key covers the section's prompt template, the resume sub-models it
+    reads (plus the job description summary in tailored mode) and the model
+    parameters, so editing one part of the resume only invalidates the
+    sections that read it.
+    """
+
+    def __init__(self, cache: SQLiteCache):
+        self.cache = cache
+        self._lock = threading.Lock()
+        self._section_stats = defaultdict(lambda: {"hits": 0, "misses": 0})
+
+    @staticmethod
+    def key(section: str, template: str, inputs: dict, llm) -> str:
+        digest = stable_hash({"template": template, "inputs": inputs, "params": model_parameters(llm)})
+        return f"{section}:{digest}"
+
+    def get(self, section: str, key: str):
+        fragment = self.cache.get(key)
+        with self._lock:
+            self._section_stats[section]["hits" if fragment is not None else "misses"] += 1
+        return fragment
+
+    def set(self, key: str, fragment: str):
+        self.cache.set(key, fragment)
+
+    def invalidate(self, section: str = None) -> int:
+        # Senza sezione svuota tutta la cache; restituisce le voci rimosse
+        if section is None:
+            removed = len(self.cache)
+            self.cache.clear()
+            return removed
+        return self.cache.delete_prefix(f"{section}:")
+
+    def stats(self) -> dict:
+        stats = self.cache.stats()
+        with self._lock:
+            stats["sections"] = {section: dict(counts) for section, counts in self._section_stats.items()}
+        return stats
+
+
+_section_cache = None
+_section_cache_lock = threading.Lock()
+
+
+def get_section_cache() -> SectionFragmentCache:
+    # None se la cache e' disattivata da configurazione
+    global _section_cache
+    if not global_config.SECTION_CACHE_ENABLED:
+        return None
+    with _section_cache_lock:
+        if _section_cache is None:
+            cache = SQLiteCache(
+                global_config.LLM_CACHE_PATH,
+                ttl=global_config.LLM_CACHE_TTL,
+                max_entries=global_config.LLM_CACHE_MAX_ENTRIES,
+                table="section_fragments",
+            )
+            atexit.register(cache.close)
+            _section_cache = SectionFragmentCache(cache)
+        return _section_cache
@@ -0,0 +1,225 @@
+import asyncio
+import contextvars
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import AsyncIterator, Dict, Iterator, List
+from langchain_core.prompts import PromptTemplate
+from lib_resume_builder_AIHawk.call_log import llm_section
+from lib_resume_builder_AIHawk.config import global_config
+from lib_resume_builder_AIHawk.llm_chat_model import LoggerChatModel
+from lib_resume_builder_AIHawk.llm_clients import get_llm_client_registry
+from lib_resume_builder_AIHawk.prompt_serializer import compact_prompt_inputs, count_tokens, preload_encoding
+from lib_resume_builder_AIHawk.resume_stream import ResumeStreamEvent, astream_html_resume, stream_html_resume
+from lib_resume_builder_AIHawk.section_cache import SectionFragmentCache, get_section_cache
+from lib_resume_builder_AIHawk.section_registry import PromptPack, assemble_html_resume, get_prompt_pack, planned_sections
+from lib_resume_builder_AIHawk.structured_resume import astructured_sections, structured_response_format, structured_sections
+from lib_resume_builder_AIHawk.tracing import span
+
+logger = logging.getLogger(__name__)
+
+
+class SectionGenerator:
+    """Generates the HTML sections of a resume with the prompts of one strings module.
+
+    Holds everything the two generators share: the chat model, the section
+    cache, the sync/async/streamed section drivers and the assembly of the
+    body. Subclasses only add the way they get their inputs (for instance the
+    job description).
+    """
+
+    def __init__(self, openai_api_key, strings, section_cache: SectionFragmentCache = None):
+        # Client condivisi dal registro: connessioni HTTP riusate tra un resume e l'altro
+        self.llm_cheap = LoggerChatModel(
+            get_llm_client_registry().chat_model(openai_api_key, "gpt-4o-mini", temperature=0.4)
+        )
+        self.strings = strings
+        self.section_cache = section_cache if section_cache is not None else get_section_cache()
+        # Conteggio dei token sugli span llm.call: la codifica si carica ora, fuori dalle richieste
+        preload_encoding()
+
+    @property
+    def prompt_pack(self) -> PromptPack:
+        # Template e catene compilati una volta per prompt pack, condivisi tra resume e thread
+        return get_prompt_pack(self.strings)
+
+    def _section_request(self, section: str):
+        template = self.prompt_pack.sections[section].template
+        # Solo le variabili usate dal template, come YAML compatto: niente repr pydantic con campi None e nomi di classe
+        inputs = compact_prompt_inputs(self.prompt_pack.section_inputs(section, self))
+        key = None
+        if self.section_cache is not None:
+            key = self.section_cache.key(section, template, inputs, self.llm_cheap.llm)
+        return template, inputs, key
+
+    @staticmethod
+    def _prompt_tokens(template: str, inputs: dict) -> int:
+        return count_tokens(PromptTemplate.from_template(template).format(**inputs), wait=True)
+
+    def prompt_token_counts(self) -> Dict[str, int]:
+        # Token di input di ogni sezione prima dell'invio (cache delle sezioni esclusa)
+        counts = {}
+        for section in self._planned_sections():
+            template, inputs, _ = self._section_request(section)
+            counts[section] = self._prompt_tokens(template, inputs)
+        return counts
+
+    def _structured_model(self, sections: List[str]) -> LoggerChatModel:
+        # Stesso modello e stessa cache, con la risposta vincolata allo schema JSON delle sezioni
+        return LoggerChatModel(self.llm_cheap.llm.bind(response_format=structured_response_format(sections)), cache=self.llm_cheap.cache)
+
+    def _cached_section(self, section: str, key: str):
+        if key is None:
+            return None
+        fragment = self.section_cache.get(section, key)
+        if fragment is not None:
+            logger.debug(f"Section cache hit for {section}")
+        return fragment
+
+    def _generate_section(self, section: str) -> str:
+        # L'HTML della sezione si rigenera solo se cambiano template, input o parametri del modello
+        with span("llm.section", section=section) as section_span:
+            template, inputs, key = self._section_request(section)
+            output = self._cached_section(section, key)
+            section_span.set_attribute("cached", output is not None)
+            if output is None:
+                with llm_section(section):
+                    output = self.prompt_pack.chain(section, self.llm_cheap).invoke(inputs)
+                if key is not None:
+                    self.section_cache.set(key, output)
+            return output
+
+    async def _agenerate_section(self, section: str) -> str:
+        with span("llm.section", section=section) as section_span:
+            template, inputs, key = self._section_request(section)
+            # La cache delle sezioni e' su SQLite: fuori dall'event loop
+            output = await asyncio.to_thread(self._cached_section, section, key)
+            section_span.set_attribute("cached", output is not None)
+            if output is None:
+                with llm_section(section):
+                    output = await self.prompt_pack.chain(section, self.llm_cheap).ainvoke(inputs)
+                if key is not None:
+                    await asyncio.to_thread(self.section_cache.set, key, output)
+            return output
+
+    def _stream_section(self, section: str):
+        template, inputs, key = self._section_request(section)
+        fragment = self._cached_section(section, key)
+        if fragment is not None:
+            yield fragment
+            return
+        messages = self.prompt_pack.sections[section].prompt.invoke(inputs)
+        output = ""
+        with llm_section(section):
+            for token in self.llm_cheap.stream(messages):
+                output += token
+                yield token
+        if key is not None:
+            self.section_cache.set(key, output)
+
+    async def _astream_section(self, section: str):
+        template, inputs, key = self._section_request(section)
+        fragment = await asyncio.to_thread(self._cached_section, section, key)
+        if fragment is not None:
+            yield fragment
+            return
+        messages = await self.prompt_pack.sections[section].prompt.ainvoke(inputs)
+        output = ""
+        with llm_section(section):
+            async for token in self.llm_cheap.astream(messages):
+                output += token
+                yield token
+        if key is not None:
+            await asyncio.to_thread(self.section_cache.set, key, output)
+
+    def section_cache_stats(self) -> dict:
+        return self.section_cache.stats() if self.section_cache is not None else {}
+
+    def invalidate_sections(self, *sections: str) -> int:
+        # Nessuna sezione indicata: invalida tutto
+        if self.section_cache is None:
+            return 0
+        if not sections:
+            return self.section_cache.invalidate()
+        return sum(self.section_cache.invalidate(section) for section in sections)
+
+    def set_resume(self, resume):
+        self.resume = resume
+
+    def generate_header(self) -> str:
+        return self._generate_section("header")
+
+    def generate_education_section(self) -> str:
+        return self._generate_section("education")
+
+    def generate_work_experience_section(self) -> str:
+        return self._generate_section("work_experience")
+
+    def generate_side_projects_section(self) -> str:
+        return self._generate_section("side_projects")
+
+    def generate_achievements_section(self) -> str:
+        logging.debug("Starting achievements section generation")
+        output = self._generate_section("achievements")
+        logging.debug(f"Chain invocation result: {output}")
+        logging.debug("Achievements section generation completed")
+        return output
+
+    def generate_certifications_section(self) -> str:
+        logging.debug("Starting Certifications section generation")
+        output = self._generate_section("certifications")
+        logging.debug(f"Chain invocation result: {output}")
+        logging.debug("Certifications section generation completed")
+        return output
+
+    def generate_additional_skills_section(self) -> str:
+        return self._generate_section("additional_skills")
+
+    def _planned_sections(self) -> List[str]:
+        # Sezioni con dati nel resume: la job description serve solo ai prompt che la usano
+        return planned_sections(self.resume)
+
+    @staticmethod
+    def _assemble_html_resume(results: Dict[str, str]) -> str:
+        return assemble_html_resume(results)
+
+    def generate_html_resume(self) -> str:
+        # Use ThreadPoolExecutor to run the sections in parallel
+        sections = self._planned_sections()
+        with span("llm.generate_html_resume", sections=len(sections), structured=global_config.STRUCTURED_GENERATION):
+            # In modalita' strutturata restano da generare solo le sezioni non valide nella risposta unica
+            results = structured_sections(self, sections) if global_config.STRUCTURED_GENERATION else {}
+            with ThreadPoolExecutor() as executor:
+                # Ogni thread parte da una copia del contesto: gli span delle sezioni restano figli di questo
+                future_to_section = {
+                    executor.submit(contextvars.copy_context().run, self._generate_section, section): section
+                    for section in sections if section not in results
+                }
+                for future in as_completed(future_to_section):
+                    section = future_to_section[future]
+                    try:
+                        result = future.result()
+                        if result:
+                            results[section] = result
+                    except Exception as exc:
+                        logger.error(f"Generation of the {section} section failed: {exc}", exc_info=exc)
+            return self._assemble_html_resume(results)
+
+    def stream_html_resume(self) -> Iterator[ResumeStreamEvent]:
+        return stream_html_resume(self)
+
+    def astream_html_resume(self) -> AsyncIterator[ResumeStreamEvent]:
+        return astream_html_resume(self)
+
+    async def agenerate_html_resume(self) -> str:
+        # Tutte le sezioni sullo stesso event loop, senza thread
+        sections = self._planned_sections()
+        with span("llm.generate_html_resume", sections=len(sections), structured=global_config.STRUCTURED_GENERATION):
+            results = await astructured_sections(self, sections) if global_config.STRUCTURED_GENERATION else {}
+            sections = [section for section in sections if section not in results]
+            outputs = await asyncio.gather(*(self._agenerate_section(section) for section in sections), return_exceptions=True)
+            for section, output in zip(sections, outputs):
+                if isinstance(output, Exception):
+                    logger.error(f"Generation of the {section} section failed: {output}", exc_info=output)
+                elif output:
+                    results[section] = output
+            return self._assemble_html_resume(results)
@@ -0,0 +1,156 @@
+import textwrap
+import threading
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Tuple
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+
+# Nome del prompt di riassunto della job description nel prompt pack
+SUMMARIZE_PROMPT = "summarize"
+# Oltre questo numero di catene (prompt x modello) la cache di un pack riparte da zero
+MAX_CACHED_CHAINS = 256
+
+
+@dataclass(frozen=True)
+class SectionSpec:
+    name: str
+    prompt: str  # Attributo del modulo strings con il template della sezione
+    available: Callable  # resume -> bool: la sezione si genera solo se c'e' qualcosa da scrivere
+    main: bool = True  # Dentro <main>; l'header sta fuori
+
+
+def resume_skills(resume) -> set:
+    # Competenze dalle esperienze e dagli esami dei corsi di studio
+    skills = set()
+    for exp in resume.experience_details or []:
+        if exp.skills_acquired:
+            skills.update(exp.skills_acquired)
+    for edu in resume.education_details or []:
+        if edu.exam:
+            for exam in edu.exam:
+                skills.update(exam.keys())
+    return skills
+
+
+# Le sezioni del resume, nell'ordine del documento
+SECTIONS: Tuple[SectionSpec, ...] = (
+    SectionSpec("header", "prompt_header", lambda resume: resume.personal_information, main=False),
+    SectionSpec("education", "prompt_education", lambda resume: resume.education_details),
+    SectionSpec("work_experience", "prompt_working_experience", lambda resume: resume.experience_details),
+    SectionSpec("side_projects", "prompt_side_projects", lambda resume: resume.projects),
+    SectionSpec("achievements", "prompt_achievements", lambda resume: resume.achievements),
+    SectionSpec("certifications", "prompt_certifications", lambda resume: resume.certifications),
+    SectionSpec("additional_skills", "prompt_additional_skills",
+                lambda resume: (resume.experience_details or resume.education_details or
+                                resume.languages or resume.interests)),
+)
+
+# Variabili che un template di sezione puo' usare: ogni sezione riceve solo quelle del proprio template
+PROMPT_INPUTS: Dict[str, Callable] = {
+    "personal_information": lambda generator: generator.resume.personal_information,
+    "education_details": lambda generator: generator.resume.education_details,
+    "experience_details": lambda generator: generator.resume.experience_details,
+    "projects": lambda generator: generator.resume.projects,
+    "achievements": lambda generator: generator.resume.achievements,
+    "certifications": lambda generator: generator.resume.certifications,
+    "languages": lambda generator: generator.resume.languages,
+    "interests": lambda generator: generator.resume.interests,
+    "skills": lambda generator: resume_skills(generator.resume),
+    # Il generatore senza job description la lascia vuota nei prompt che la citano
+    "job_description": lambda generator: getattr(generator, "job_description", None),
+}
+
+
+@dataclass(frozen=True)
+class CompiledPrompt:
+    name: str
+    template: str  # Testo gia' senza indentazione, usato anche per le chiavi della cache delle sezioni
+    prompt: ChatPromptTemplate
+
+    @property
+    def input_variables(self) -> List[str]:
+        return self.prompt.input_variables
+
+    @classmethod
+    def compile(cls, name: str, template: str) -> "CompiledPrompt":
+        template = textwrap.dedent(template)
+        return cls(name, template, ChatPromptTemplate.from_template(template))
+
+
+class PromptPack:
+    """The prompts of one strings module, dedented and parsed once.
+
+    `chain()` builds the `prompt | model | StrOutputParser()` runnable the
+    first time a prompt is used with a model and then hands the same runnable
+    to every generator and thread using this pack.
+    """
+
+    def __init__(self, strings):
+        self.sections: Dict[str, CompiledPrompt] = {}
+        for spec in SECTIONS:
+            compiled = CompiledPrompt.compile(spec.name, getattr(strings, spec.prompt))
+            unknown = [name for name in compiled.input_variables if name not in PROMPT_INPUTS]
+            if unknown:
+                raise ValueError(f"Prompt {spec.prompt} uses unknown inputs: {', '.join(unknown)}")
+            self.sections[spec.name] = compiled
+        summarize = getattr(strings, "summarize_prompt_template", None)
+        self.summarize = CompiledPrompt.compile(SUMMARIZE_PROMPT, summarize) if summarize is not None else None
+        self._chains = {}
+        self._lock = threading.Lock()
+
+    def prompt(self, name: str) -> CompiledPrompt:
+        if name == SUMMARIZE_PROMPT and self.summarize is not None:
+            return self.summarize
+        return self.sections[name]
+
+    def section_inputs(self, section: str, generator) -> dict:
+        return {name: PROMPT_INPUTS[name](generator) for name in self.sections[section].input_variables}
+
+    def chain(self, name: str, model):
+        # La catena dipende solo da prompt, modello e cache: LoggerChatModel diversi sugli stessi client la condividono
+        key = (name, id(model.llm), id(model.cache))
+        entry = self._chains.get(key)
+        if entry is not None and entry[0] is model.llm and entry[1] is model.cache:
+            return entry[2]
+        with self._lock:
+            if len(self._chains) >= MAX_CACHED_CHAINS:
+                self._chains.clear()
+            chain = self.prompt(name).prompt | model.as_runnable() | StrOutputParser()
+            self._chains[key] = (model.llm, model.cache, chain)
+        return chain
+
+
+_prompt_packs = {}
+_prompt_packs_lock = threading.Lock()
+
+
+def _prompt_pack_key(strings) -> tuple:
+    # Stessi testi, stesso pack: load_module restituisce un modulo nuovo a ogni resume
+    return tuple(getattr(strings, spec.prompt, None) for spec in SECTIONS) + (
+        getattr(strings, "summarize_prompt_template", None),
+    )
+
+
+def get_prompt_pack(strings) -> PromptPack:
+    key = _prompt_pack_key(strings)
+    prompt_pack = _prompt_packs.get(key)
+    if prompt_pack is None:
+        with _prompt_packs_lock:
+            prompt_pack = _prompt_packs.get(key)
+            if prompt_pack is None:
+                prompt_pack = PromptPack(strings)
+                _prompt_packs[key] = prompt_pack
+    return prompt_pack
+
+
+def planned_sections(resume) -> List[str]:
+    return [spec.name for spec in SECTIONS if spec.available(resume)]
+
+
+def assemble_html_resume(results: Dict[str, str]) -> str:
+    lines = ["<body>"]
+    lines += [f"  {results.get(spec.name, '')}" for spec in SECTIONS if not spec.main]
+    lines.append("  <main>")
+    lines += [f"    {results.get(spec.name, '')}" for spec in SECTIONS if spec.main]
+    lines += ["  </main>", "</body>"]
+    return "\n".join(lines)
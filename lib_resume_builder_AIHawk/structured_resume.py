@@ -0,0 +1,128 @@
+import asyncio
+import json
+import logging
+from typing import Dict, List
+from langchain_core.messages import HumanMessage
+from langchain_core.prompt_values import ChatPromptValue
+from langchain_core.prompts import PromptTemplate
+from lib_resume_builder_AIHawk.call_log import llm_section
+from lib_resume_builder_AIHawk.tracing import span
+
+logger = logging.getLogger(__name__)
+
+STRUCTURED_PREAMBLE = """
+You are writing several sections of the same resume in a single answer. Each section below comes with its own instructions and HTML template; follow them exactly as if it were a separate request.
+
+Reply with a single JSON object that has one key per section name listed below. The value of each key is the complete HTML fragment for that section, exactly what that section's instructions ask you to return, without Markdown code fences.
+"""
+
+# Nome di sezione nel log delle chiamate per la richiesta unica
+STRUCTURED_SECTION = "structured"
+JOB_DESCRIPTION_REFERENCE = "(see the Job Description at the top of this request)"
+
+
+def structured_response_format(sections: List[str]) -> dict:
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": "resume_sections",
+            "strict": True,
+            "schema": {
+                "type": "object",
+                "properties": {section: {"type": "string"} for section in sections},
+                "required": list(sections),
+                "additionalProperties": False,
+            },
+        },
+    }
+
+
+def structured_messages(requests: Dict[str, tuple]) -> ChatPromptValue:
+    # La job description compare una volta sola in testa invece che in ogni sezione
+    job_description = None
+    parts = [STRUCTURED_PREAMBLE.strip()]
+    rendered = []
+    for section, (template, inputs, _) in requests.items():
+        if "job_description" in inputs:
+            job_description = inputs["job_description"]
+            inputs = dict(inputs, job_description=JOB_DESCRIPTION_REFERENCE)
+        prompt = PromptTemplate.from_template(template).format(**inputs)
+        rendered.append(f"## Section: {section}\n{prompt.strip()}")
+    if job_description is not None:
+        parts.append(f"## Job Description\n{job_description}")
+    parts.extend(rendered)
+    return ChatPromptValue(messages=[HumanMessage(content="\n\n".join(parts))])
+
+
+def parse_structured_sections(content: str, sections: List[str]) -> Dict[str, str]:
+    # Solo le sezioni valide: le altre si rigenerano una per una
+    try:
+        data = json.loads(content)
+    except (TypeError, ValueError) as e:
+        logger.warning(f"Structured resume reply is not valid JSON: {e}")
+        return {}
+    if not isinstance(data, dict):
+        logger.warning("Structured resume reply is not a JSON object")
+        return {}
+    fragments = {}
+    for section in sections:
+        fragment = data.get(section)
+        if isinstance(fragment, str) and "<" in fragment and fragment.strip():
+            fragments[section] = fragment.strip()
+        else:
+            logger.warning(f"Structured resume reply has no usable '{section}' section")
+    return fragments
+
+
+def _structured_plan(generator, sections: List[str]):
+    requests = {}
+    results = {}
+    for section in sections:
+        template, inputs, key = generator._section_request(section)
+        fragment = generator._cached_section(section, key)
+        if fragment is not None:
+            results[section] = fragment
+        else:
+            requests[section] = (template, inputs, key)
+    return requests, results
+
+
+def _store_structured(generator, requests: Dict[str, tuple], content: str, results: Dict[str, str]) -> Dict[str, str]:
+    for section, fragment in parse_structured_sections(content, list(requests)).items():
+        key = requests[section][2]
+        if key is not None:
+            generator.section_cache.set(key, fragment)
+        results[section] = fragment
+    return results
+
+
+def structured_sections(generator, sections: List[str]) -> Dict[str, str]:
+    """Generates every section that is not cached with one JSON-schema
+    constrained request. Returns only the fragments that validated; the caller
+    generates the missing ones section by section."""
+    requests, results = _structured_plan(generator, sections)
+    # Con una sola sezione mancante la richiesta normale costa uguale
+    if len(requests) < 2:
+        return results
+    try:
+        with span("llm.structured_sections", sections=len(requests)), llm_section(STRUCTURED_SECTION):
+            content = generator._structured_model(list(requests))(structured_messages(requests)).content
+    except Exception as e:
+        logger.warning(f"Structured resume generation failed, falling back to one request per section: {e}")
+        return results
+    return _store_structured(generator, requests, content, results)
+
+
+async def astructured_sections(generator, sections: List[str]) -> Dict[str, str]:
+    # Letture e scritture della cache delle sezioni (SQLite) fuori dall'event loop
+    requests, results = await asyncio.to_thread(_structured_plan, generator, sections)
+    if len(requests) < 2:
+        return results
+    try:
+        with span("llm.structured_sections", sections=len(requests)), llm_section(STRUCTURED_SECTION):
+            reply = await generator._structured_model(list(requests)).acall(structured_messages(requests))
+        content = reply.content
+    except Exception as e:
+        logger.warning(f"Structured resume generation failed, falling back to one request per section: {e}")
+        return results
+    return await asyncio.to_thread(_store_structured, generator, requests, content, results)
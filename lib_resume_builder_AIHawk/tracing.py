@@ -0,0 +1,240 @@
+import atexit
+import logging
+import os
+import threading
+import time
+from contextvars import ContextVar
+from pathlib import Path
+from typing import List
+from lib_resume_builder_AIHawk.config import global_config
+
+logger = logging.getLogger(__name__)
+
+_current_span: ContextVar = ContextVar("current_span", default=None)
+_exporter = None
+_exporter_lock = threading.Lock()
+
+
+class _NoopSpan:
+    # Restituito quando il tracing e' spento: nessuna allocazione, nessun orologio
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set_attribute(self, key: str, value):
+        pass
+
+    def set_attributes(self, **attributes):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Span:
+    """A timed stage. Used as a context manager; spans opened inside it (also
+    from asyncio tasks, and from threads started with a copied context) become
+    its children."""
+
+    def __init__(self, name: str, attributes: dict, exporter):
+        self.name = name
+        self.attributes = attributes
+        self.exporter = exporter
+        self.parent = None
+        self.trace_id = None
+        self.span_id = os.urandom(8).hex()
+        self.start_time = None
+        self.start_ns = None
+        self.end_ns = None
+        self.error = None
+        self.exporter_state = None
+        self._token = None
+
+    @property
+    def duration_ms(self) -> float:
+        if self.end_ns is None:
+            return None
+        return (self.end_ns - self.start_ns) / 1e6
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+
+    def set_attributes(self, **attributes):
+        self.attributes.update(attributes)
+
+    def __enter__(self):
+        self.parent = _current_span.get()
+        self.trace_id = self.parent.trace_id if self.parent is not None else os.urandom(16).hex()
+        self.start_time = time.time()
+        self.start_ns = time.perf_counter_ns()
+        self._token = _current_span.set(self)
+        try:
+            self.exporter.on_start(self)
+        except Exception as e:
+            logger.debug(f"Span exporter failed on start of {self.name}: {e}")
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end_ns = time.perf_counter_ns()
+        if exc is not None:
+            self.error = f"{exc_type.__name__}: {exc}"
+        try:
+            _current_span.reset(self._token)
+        except ValueError:
+            # Chiuso in un contesto diverso da quello di apertura (es. generatori)
+            _current_span.set(self.parent)
+        try:
+            self.exporter.on_end(self)
+        except Exception as e:
+            logger.debug(f"Span exporter failed on end of {self.name}: {e}")
+        return False
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent.span_id if self.parent is not None else None,
+            "start_time": self.start_time,
+            "duration_ms": round(self.duration_ms, 3) if self.end_ns is not None else None,
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class SpanExporter:
+    def on_start(self, span: Span):
+        pass
+
+    def on_end(self, span: Span):
+        pass
+
+    def shutdown(self):
+        pass
+
+
+class InMemorySpanExporter(SpanExporter):
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._spans = []
+
+    def on_end(self, span: Span):
+        with self._lock:
+            self._spans.append(span)
+
+    @property
+    def spans(self) -> List[Span]:
+        with self._lock:
+            return list(self._spans)
+
+    def clear(self):
+        with self._lock:
+            self._spans.clear()
+
+
+class JSONLSpanExporter(SpanExporter):
+    # Una riga per span chiuso, scritta in background con la stessa rotazione del log delle chiamate
+    def __init__(self, path: Path):
+        from lib_resume_builder_AIHawk.call_log import CallLogWriter
+        self.writer = CallLogWriter(
+            path,
+            max_bytes=global_config.LLM_CALL_LOG_MAX_BYTES,
+            rotate_interval=global_config.LLM_CALL_LOG_ROTATE_INTERVAL,
+            backup_count=global_config.LLM_CALL_LOG_BACKUP_COUNT,
+            flush_interval=global_config.LLM_CALL_LOG_FLUSH_INTERVAL,
+        )
+        atexit.register(self.writer.close)
+
+    def on_end(self, span: Span):
+        self.writer.write(span.to_dict())
+
+    def flush(self, timeout: float = None):
+        return self.writer.flush(timeout)
+
+    def shutdown(self):
+        self.writer.close()
+
+
+class OpenTelemetrySpanExporter(SpanExporter):
+    """Mirrors spans into OpenTelemetry (requires the opentelemetry-api
+    package; the SDK and exporters are configured by the application)."""
+
+    def __init__(self, tracer=None):
+        try:
+            from opentelemetry import trace
+            from opentelemetry.trace import Status, StatusCode
+        except ImportError as e:
+            raise RuntimeError("OpenTelemetry tracing requires the opentelemetry-api package.") from e
+        self._trace = trace
+        self._error_status = lambda description: Status(StatusCode.ERROR, description)
+        self.tracer = tracer or trace.get_tracer("lib_resume_builder_AIHawk")
+
+    @staticmethod
+    def _otel_attributes(attributes: dict) -> dict:
+        return {key: value if isinstance(value, (str, bool, int, float)) else str(value)
+                for key, value in attributes.items() if value is not None}
+
+    def on_start(self, span: Span):
+        parent = span.parent.exporter_state if span.parent is not None else None
+        # Senza span padre nostro si aggancia allo span OpenTelemetry corrente dell'applicazione
+        context = self._trace.set_span_in_context(parent) if parent is not None else None
+        span.exporter_state = self.tracer.start_span(
+            span.name, context=context, attributes=self._otel_attributes(span.attributes), start_time=time.time_ns()
+        )
+
+    def on_end(self, span: Span):
+        otel_span = span.exporter_state
+        if otel_span is None:
+            return
+        otel_span.set_attributes(self._otel_attributes(span.attributes))
+        if span.error is not None:
+            otel_span.set_status(self._error_status(span.error))
+        otel_span.end()
+
+
+def span(name: str, **attributes):
+    exporter = _exporter
+    if exporter is None:
+        return NOOP_SPAN
+    return Span(name, attributes, exporter)
+
+
+def current_span():
+    return _current_span.get()
+
+
+def get_span_exporter() -> SpanExporter:
+    return _exporter
+
+
+def set_span_exporter(exporter: SpanExporter) -> SpanExporter:
+    # None spegne il tracing; restituisce l'exporter precedente (gia' chiuso)
+    global _exporter
+    with _exporter_lock:
+        previous, _exporter = _exporter, exporter
+    if previous is not None and previous is not exporter:
+        previous.shutdown()
+    return previous
+
+
+def create_span_exporter(kind: str) -> SpanExporter:
+    if kind == "memory":
+        return InMemorySpanExporter()
+    if kind == "jsonl":
+        path = global_config.TRACING_JSONL_PATH
+        if path is None:
+            if global_config.LOG_OUTPUT_FILE_PATH is None:
+                raise ValueError("Set global_config.TRACING_JSONL_PATH or LOG_OUTPUT_FILE_PATH for JSONL tracing.")
+            path = Path(global_config.LOG_OUTPUT_FILE_PATH) / "spans.jsonl"
+        return JSONLSpanExporter(path)
+    if kind == "otel":
+        return OpenTelemetrySpanExporter()
+    raise ValueError(f"Unknown tracing exporter: {kind}")
+
+
+def configure_tracing():
+    # Exporter da configurazione, se non ne e' gia' stato impostato uno a mano
+    if global_config.TRACING_EXPORTER and _exporter is None:
+        set_span_exporter(create_span_exporter(global_config.TRACING_EXPORTER))
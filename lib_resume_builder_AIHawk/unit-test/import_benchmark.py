@@ -0,0 +1,96 @@
+"""Import-time benchmark for the public entry points of the package.
+
+Every import runs in a fresh interpreter, started in an empty temporary
+directory, so the module cache never carries over between samples. For each
+statement the benchmark reports p50/max wall time, the heavy dependencies it
+pulled in, and whether importing left anything behind in the working
+directory (the package must not create files or directories on import):
+
+    python import_benchmark.py --iterations 10 --output results.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+
+PACKAGE_ROOT = Path(__file__).resolve().parent.parent.parent
+
+IMPORT_STATEMENTS = [
+    "import lib_resume_builder_AIHawk",
+    "from lib_resume_builder_AIHawk import StyleManager",
+    "from lib_resume_builder_AIHawk import Resume",
+    "from lib_resume_builder_AIHawk import FacadeManager, ResumeGenerator",
+    "from lib_resume_builder_AIHawk.gpt_resume_job_description import LLMResumeJobDescription",
+]
+
+# Dipendenze che un import leggero non dovrebbe mai caricare
+HEAVY_MODULES = ["langchain_core", "langchain_community", "langchain_openai", "openai", "faiss", "selenium",
+                 "webdriver_manager", "fontTools", "inquirer", "websockets"]
+
+SAMPLE_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - started
+print(json.dumps({{"seconds": elapsed, "modules": [name for name in {heavy!r} if name in sys.modules]}}))
+"""
+
+
+def sample(statement: str) -> dict:
+    with tempfile.TemporaryDirectory() as workdir:
+        environment = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [str(PACKAGE_ROOT), os.environ.get("PYTHONPATH")])))
+        completed = subprocess.run(
+            [sys.executable, "-c", SAMPLE_SCRIPT.format(statement=statement, heavy=HEAVY_MODULES)],
+            cwd=workdir, env=environment, capture_output=True, text=True, check=True,
+        )
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+        result["side_effects"] = sorted(os.listdir(workdir))
+    return result
+
+
+def benchmark(statement: str, iterations: int) -> dict:
+    samples = [sample(statement) for _ in range(iterations)]
+    timings = [entry["seconds"] * 1000 for entry in samples]
+    return {
+        "statement": statement,
+        "iterations": iterations,
+        "p50_ms": round(statistics.median(timings), 2),
+        "max_ms": round(max(timings), 2),
+        "heavy_modules": samples[-1]["modules"],
+        "side_effects": samples[-1]["side_effects"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=5, help="fresh interpreters per import statement")
+    parser.add_argument("--output", type=Path, help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    results = []
+    for statement in IMPORT_STATEMENTS:
+        result = benchmark(statement, args.iterations)
+        results.append(result)
+        print(f"{result['p50_ms']:>9.1f} ms  {statement}  {result['heavy_modules'] or ''}", file=sys.stderr)
+
+    report = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(output + "\n", encoding="utf-8")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""Render benchmark for every stylesheet in resume_style/.
+
+Renders the fixed sample in html_example/resume_body.html with each style and
+reports cold-start vs warm latency, p50/p95, the peak RSS of the browser
+process tree and the PDF size. Results are written as JSON so runs can be
+compared across releases:
+
+    python render_benchmark.py --iterations 20 --output results.json
+
+No network access is needed: fonts and icons come from the local asset bundle
+when one has been prepared, and remote stylesheets are dropped otherwise.
+Memory sampling reads /proc, so peak RSS is only reported on Linux.
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import statistics
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from string import Template
+from lib_resume_builder_AIHawk import StyleManager, __version__
+from lib_resume_builder_AIHawk.asset_bundle import font_subsetting_available, get_asset_bundle
+from lib_resume_builder_AIHawk.config import global_config
+from lib_resume_builder_AIHawk.renderer import create_renderer
+from lib_resume_builder_AIHawk.utils import stylesheet_data_uri
+
+BENCHMARK_DIRECTORY = Path(__file__).resolve().parent
+SAMPLE_BODY_PATH = BENCHMARK_DIRECTORY / "html_example" / "resume_body.html"
+STYLES_DIRECTORY = BENCHMARK_DIRECTORY.parent / "resume_style"
+
+
+def _children_by_parent():
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "r") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    return children
+
+
+def process_tree_rss(root_pids) -> int:
+    # RSS totale (byte) dei processi indicati e di tutti i loro discendenti
+    children = _children_by_parent()
+    pending = list(root_pids)
+    total = 0
+    while pending:
+        pid = pending.pop()
+        pending.extend(children.get(pid, []))
+        try:
+            with open(f"/proc/{pid}/status", "r") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1]) * 1024
+                        break
+        except OSError:
+            continue
+    return total
+
+
+class BrowserMemorySampler:
+    def __init__(self, renderer, interval: float = 0.05):
+        self.renderer = renderer
+        self.interval = interval
+        self.peak_rss = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self.supported = os.path.isdir("/proc")
+
+    def _run(self):
+        while not self._stop.is_set():
+            pids = self.renderer.browser_pids()
+            if pids:
+                self.peak_rss = max(self.peak_rss, process_tree_rss(pids))
+            self._stop.wait(self.interval)
+
+    def start(self):
+        if self.supported:
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self.supported:
+            self._thread.join()
+
+
+def percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+def build_document(style_path: Path, body: str) -> str:
+    html = Template(global_config.html_template).substitute(markdown=body, style_path=stylesheet_data_uri(style_path))
+    if global_config.ASSETS_MODE == "bundle":
+        html = get_asset_bundle().inline(html)
+    return html
+
+
+def benchmark_style(style_name: str, style_file: str, body: str, backend: str, iterations: int) -> dict:
+    html = build_document(STYLES_DIRECTORY / style_file, body)
+    renderer = create_renderer(backend)
+    sampler = BrowserMemorySampler(renderer)
+    sampler.start()
+    try:
+        start = time.perf_counter()
+        pdf = renderer.pdf_bytes(html)
+        cold_start_ms = (time.perf_counter() - start) * 1000
+        warm_ms = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            pdf = renderer.pdf_bytes(html)
+            warm_ms.append((time.perf_counter() - start) * 1000)
+    finally:
+        sampler.stop()
+        renderer.close()
+    return {
+        "style": style_name,
+        "file": style_file,
+        "renderer": type(renderer).__name__,
+        "iterations": iterations,
+        "cold_start_ms": round(cold_start_ms, 2),
+        "warm_ms": {
+            "p50": round(percentile(warm_ms, 0.50), 2),
+            "p95": round(percentile(warm_ms, 0.95), 2),
+            "mean": round(statistics.fmean(warm_ms), 2),
+            "min": round(min(warm_ms), 2),
+            "max": round(max(warm_ms), 2),
+        },
+        "peak_browser_rss_bytes": sampler.peak_rss if sampler.supported else None,
+        "html_size_bytes": len(html.encode("utf-8")),
+        "pdf_size_bytes": len(pdf),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark PDF rendering for every bundled resume style.")
+    parser.add_argument("--backend", default="auto", choices=["auto", "cdp", "selenium"])
+    parser.add_argument("--iterations", type=int, default=10, help="Warm renders per style after the cold start")
+    parser.add_argument("--styles", nargs="*", help="Only benchmark these style names")
+    parser.add_argument("--output", type=Path, help="Write the JSON results here instead of stdout")
+    parser.add_argument("--allow-network", action="store_true", help="Let the asset bundle download missing stylesheets")
+    args = parser.parse_args(argv)
+    if args.iterations < 1:
+        parser.error("--iterations must be at least 1")
+
+    global_config.STYLES_DIRECTORY = STYLES_DIRECTORY
+    global_config.ASSETS_DOWNLOAD_MISSING = args.allow_network
+    body = SAMPLE_BODY_PATH.read_text(encoding="utf-8")
+    style_manager = StyleManager()
+    style_manager.set_styles_directory(STYLES_DIRECTORY)
+    styles = style_manager.get_styles()
+    if args.styles:
+        styles = {name: value for name, value in styles.items() if name in args.styles}
+
+    results = []
+    for style_name, (style_file, _) in sorted(styles.items()):
+        result = benchmark_style(style_name, style_file, body, args.backend, args.iterations)
+        results.append(result)
+        print(
+            f"{style_name:<40} cold {result['cold_start_ms']:>9.1f} ms  "
+            f"p50 {result['warm_ms']['p50']:>8.1f} ms  p95 {result['warm_ms']['p95']:>8.1f} ms  "
+            f"rss {(result['peak_browser_rss_bytes'] or 0) / 2**20:>7.1f} MiB  pdf {result['pdf_size_bytes'] / 1024:>7.1f} KiB",
+            file=sys.stderr,
+        )
+
+    report = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "package_version": __version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "backend": args.backend,
+        "assets_mode": global_config.ASSETS_MODE,
+        "font_subsetting": font_subsetting_available(),
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(output + "\n", encoding="utf-8")
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from lib_resume_builder_AIHawk.config import global_config
+
+logger = logging.getLogger(__name__)
+
+TOKENS_PER_PRICE_UNIT = 1_000_000
+
+_current_tracker: ContextVar = ContextVar("current_usage_tracker", default=None)
+
+
+def model_prices(model_name: str) -> dict:
+    # "gpt-4o-mini-2024-07-18" usa la voce "gpt-4o-mini": vince il prefisso piu' lungo
+    prices = global_config.LLM_PRICES or {}
+    model_name = model_name or ""
+    matches = [name for name in prices if model_name.startswith(name)]
+    if not matches:
+        return None
+    return prices[max(matches, key=len)]
+
+
+def call_cost(model_name: str, input_tokens: int, output_tokens: int, cached_input_tokens: int = 0) -> float:
+    prices = model_prices(model_name)
+    if prices is None:
+        logger.debug(f"No price configured for model {model_name!r}, counting it as free")
+        return 0.0
+    cached_price = prices.get("cached_input", prices.get("input", 0))
+    return (
+        (input_tokens - cached_input_tokens) * prices.get("input", 0)
+        + cached_input_tokens * cached_price
+        + output_tokens * prices.get("output", 0)
+    ) / TOKENS_PER_PRICE_UNIT
+
+
+def _empty_totals() -> dict:
+    return {
+        "calls": 0,
+        "cache_hits": 0,
+        "input_tokens": 0,
+        "cached_input_tokens": 0,
+        "output_tokens": 0,
+        "total_tokens": 0,
+        "cost": 0.0,
+        "saved_cost": 0.0,
+    }
+
+
+class UsageTracker:
+    """Token and cost totals, overall and per model and section.
+
+    API calls add their usage and cost. Replies served by the LLM cache only
+    count as cache hits; the cost they originally had goes to saved_cost.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._totals = _empty_totals()
+            self._by_model = {}
+            self._by_section = {}
+
+    def record(self, model_name: str, input_tokens: int, output_tokens: int, cached_input_tokens: int = 0,
+               cost: float = 0.0, section: str = None, cache_hit: bool = False):
+        with self._lock:
+            groups = [self._totals, self._by_model.setdefault(model_name or "unknown", _empty_totals())]
+            if section is not None:
+                groups.append(self._by_section.setdefault(section, _empty_totals()))
+            for totals in groups:
+                if cache_hit:
+                    totals["cache_hits"] += 1
+                    totals["saved_cost"] += cost
+                    continue
+                totals["calls"] += 1
+                totals["input_tokens"] += input_tokens
+                totals["cached_input_tokens"] += cached_input_tokens
+                totals["output_tokens"] += output_tokens
+                totals["total_tokens"] += input_tokens + output_tokens
+                totals["cost"] += cost
+
+    def summary(self) -> dict:
+        with self._lock:
+            summary = dict(self._totals)
+            summary["by_model"] = {name: dict(totals) for name, totals in self._by_model.items()}
+            summary["by_section"] = {name: dict(totals) for name, totals in self._by_section.items()}
+        return summary
+
+
+_process_tracker = UsageTracker()
+
+
+def record_llm_usage(model_name: str, usage_metadata: dict, section: str = None, cache_hit: bool = False) -> float:
+    # Registra la chiamata nel totale del processo e nella generazione in corso; restituisce il costo
+    input_tokens = usage_metadata.get("input_tokens", 0) or 0
+    output_tokens = usage_metadata.get("output_tokens", 0) or 0
+    cached_input_tokens = usage_metadata.get("cached_input_tokens")
+    if cached_input_tokens is None:
+        cached_input_tokens = (usage_metadata.get("input_token_details") or {}).get("cache_read", 0) or 0
+    cost = call_cost(model_name, input_tokens, output_tokens, cached_input_tokens)
+    for tracker in (_process_tracker, _current_tracker.get()):
+        if tracker is not None:
+            tracker.record(model_name, input_tokens, output_tokens, cached_input_tokens, cost, section, cache_hit)
+    return cost
+
+
+@contextmanager
+def track_usage():
+    # Tutte le chiamate fatte dentro il blocco (anche da task e thread con contesto copiato)
+    tracker = UsageTracker()
+    token = _current_tracker.set(tracker)
+    try:
+        yield tracker
+    finally:
+        _current_tracker.reset(token)
+
+
+def get_process_usage() -> dict:
+    return _process_tracker.summary()
+
+
+def reset_process_usage():
+    _process_tracker.reset()
+
+
+class Base64PDF(str):
+    """The base64 PDF returned by pdf_base64, with the generation's token and
+    cost totals in `usage`."""
+
+    def __new__(cls, value: str, usage: dict = None):
+        pdf = super().__new__(cls, value)
+        pdf.usage = usage
+        return pdf
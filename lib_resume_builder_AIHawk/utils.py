@@ -1,56 +1,312 @@
+import base64
+import json
+import logging
 import platform
 import os
-import time
-from selenium.common.exceptions import WebDriverException
-from selenium.webdriver.chrome.service import Service as ChromeService
-from selenium import webdriver
-import time
-from webdriver_manager.chrome import ChromeDriverManager
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import List
+from lib_resume_builder_AIHawk.config import global_config
+from lib_resume_builder_AIHawk.tracing import span
 
-def create_driver_selenium():
-    options = get_chrome_browser_options()  # Use the method to get Chrome options
+logger = logging.getLogger(__name__)
+
+# Funzione JS che risolve quando il documento, i fogli di stile e i font sono pronti.
+# quietMs: millisecondi senza mutazioni del DOM da attendere (0 per disattivare);
+# maxQuietMs: attesa massima del DOM quieto, superata la quale la funzione risolve comunque
+PAGE_READY_FUNCTION = """
+function (quietMs, maxQuietMs) {
+    function documentLoaded() {
+        if (document.readyState === 'complete') return Promise.resolve();
+        return new Promise(function (resolve) {
+            window.addEventListener('load', resolve, {once: true});
+        });
+    }
+    function stylesheetsLoaded() {
+        var links = Array.prototype.slice.call(document.querySelectorAll('link[rel="stylesheet"]'));
+        return Promise.all(links.map(function (link) {
+            if (link.sheet) return null;
+            return new Promise(function (resolve) {
+                link.addEventListener('load', resolve, {once: true});
+                link.addEventListener('error', resolve, {once: true});
+            });
+        }));
+    }
+    function fontsLoaded() {
+        return document.fonts ? document.fonts.ready : null;
+    }
+    function domQuiet() {
+        if (!quietMs) return null;
+        return new Promise(function (resolve) {
+            var timer = setTimeout(finish, quietMs);
+            // Pagine che non smettono mai di cambiare (timer, animazioni): si legge il DOM com'e'
+            var cap = setTimeout(finish, maxQuietMs);
+            var observer = new MutationObserver(function () {
+                clearTimeout(timer);
+                timer = setTimeout(finish, quietMs);
+            });
+            function finish() {
+                clearTimeout(timer);
+                clearTimeout(cap);
+                observer.disconnect();
+                resolve();
+            }
+            observer.observe(document, {childList: true, subtree: true, characterData: true});
+        });
+    }
+    return documentLoaded()
+        .then(stylesheetsLoaded)
+        .then(fontsLoaded)
+        .then(domQuiet)
+        .then(function () { return true; });
+}
+"""
+
+# Versione per execute_async_script di Selenium: arguments[0] e [1] sono quietMs e maxQuietMs, l'ultimo argomento la callback
+PAGE_READY_SCRIPT = """
+var done = arguments[arguments.length - 1];
+(""" + PAGE_READY_FUNCTION + """)(arguments[0], arguments[1]).then(function () { done(true); }, function () { done(false); });
+"""
+
+_chromedriver_path = None
+_chromedriver_lock = threading.Lock()
 
+@contextmanager
+def _exclusive_file_lock(lock_path: Path):
+    # Lock tra processi: evita che piu' worker scarichino chromedriver contemporaneamente
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(lock_path, "a+b") as lock_file:
+        if platform.system() == "Windows":
+            import msvcrt
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+def _install_chromedriver() -> str:
+    from webdriver_manager.chrome import ChromeDriverManager
     chrome_install = ChromeDriverManager().install()
     folder = os.path.dirname(chrome_install)
     if platform.system() == "Windows":
-        chromedriver_path = os.path.join(folder, "chromedriver.exe")
-    else:
-        chromedriver_path = os.path.join(folder, "chromedriver")
-    service = ChromeService(executable_path=chromedriver_path)
-    return webdriver.Chrome(service=service, options=options)
+        return os.path.join(folder, "chromedriver.exe")
+    return os.path.join(folder, "chromedriver")
+
+def _load_or_install_chromedriver(refresh: bool = False) -> str:
+    cache_file = Path(global_config.CHROMEDRIVER_CACHE_FILE)
+    with _exclusive_file_lock(cache_file.with_suffix(".lock")):
+        if not refresh:
+            try:
+                with open(cache_file, "r", encoding="utf-8") as f:
+                    cached_path = json.load(f).get("path")
+                if cached_path and os.path.isfile(cached_path):
+                    return cached_path
+            except (FileNotFoundError, ValueError):
+                pass
+        chromedriver_path = _install_chromedriver()
+        temp_cache_file = cache_file.with_suffix(f".{os.getpid()}.tmp")
+        with open(temp_cache_file, "w", encoding="utf-8") as f:
+            json.dump({"path": chromedriver_path}, f)
+        os.replace(temp_cache_file, cache_file)
+        return chromedriver_path
+
+def resolve_chromedriver_path(refresh: bool = False) -> str:
+    # Risolve il binario una sola volta per processo; un percorso fissato non tocca mai rete o cache
+    global _chromedriver_path
+    pinned_path = global_config.CHROMEDRIVER_PATH or os.environ.get("CHROMEDRIVER_PATH")
+    if pinned_path:
+        if not os.path.isfile(pinned_path):
+            raise FileNotFoundError(f"The pinned chromedriver does not exist: {pinned_path}")
+        return pinned_path
+    if _chromedriver_path is not None and not refresh:
+        return _chromedriver_path
+    with _chromedriver_lock:
+        if _chromedriver_path is None or refresh:
+            _chromedriver_path = _load_or_install_chromedriver(refresh)
+        return _chromedriver_path
+
+def create_driver_selenium():
+    # Selenium si importa solo quando serve davvero un browser
+    from selenium import webdriver
+    from selenium.common.exceptions import SessionNotCreatedException
+    from selenium.webdriver.chrome.service import Service as ChromeService
+    options = get_chrome_browser_options()  # Use the method to get Chrome options
+
+    service = ChromeService(executable_path=resolve_chromedriver_path())
+    try:
+        return webdriver.Chrome(service=service, options=options)
+    except SessionNotCreatedException:
+        # Il driver in cache non corrisponde piu' alla versione di Chrome installata
+        if global_config.CHROMEDRIVER_PATH or os.environ.get("CHROMEDRIVER_PATH"):
+            raise
+        service = ChromeService(executable_path=resolve_chromedriver_path(refresh=True))
+        return webdriver.Chrome(service=service, options=options)
+
+def page_quiet_timeout_ms() -> int:
+    return int(global_config.PAGE_QUIET_TIMEOUT * 1000)
+
+def wait_for_page_ready(driver, timeout: float = None, quiet_ms: int = 0) -> bool:
+    # Attende che la pagina sia pronta invece di dormire un tempo fisso; il timeout e' un limite massimo
+    from selenium.common.exceptions import TimeoutException
+    timeout = timeout or global_config.PAGE_READY_TIMEOUT
+    driver.set_script_timeout(timeout)
+    try:
+        return bool(driver.execute_async_script(PAGE_READY_SCRIPT, quiet_ms, page_quiet_timeout_ms()))
+    except TimeoutException:
+        logger.warning(f"Page was not ready after {timeout} seconds, continuing anyway.")
+        return False
+
+PDF_PRINT_OPTIONS = {
+    "printBackground": True,         # Include lo sfondo nella stampa
+    "landscape": False,              # Stampa in verticale (False per ritratto)
+    "paperWidth": 8.27,              # Larghezza del foglio in pollici (A4)
+    "paperHeight": 11.69,            # Altezza del foglio in pollici (A4)
+    "marginTop": 0.8,                # Margine superiore in pollici (circa 2 cm)
+    "marginBottom": 0.8,             # Margine inferiore in pollici (circa 2 cm)
+    "marginLeft": 0.5,               # Margine sinistro in pollici (circa 2 cm)
+    "marginRight": 0.5,              # Margine destro in pollici (circa 2 cm)
+    "displayHeaderFooter": False,   # Non visualizzare intestazioni e piè di pagina
+    "preferCSSPageSize": True,       # Preferire le dimensioni della pagina CSS
+    "generateDocumentOutline": False, # Non generare un sommario del documento
+    "generateTaggedPDF": False,      # Non generare PDF taggato
+    "transferMode": "ReturnAsBase64" # Restituire il PDF come stringa base64
+}
+
+PDF_STREAM_CHUNK_SIZE = 256 * 1024  # Byte letti per ogni chiamata IO.read
+
+def set_document_content(driver, html: str):
+    # Carica l'HTML direttamente nel frame principale via CDP, senza passare dal disco
+    frame_tree = driver.execute_cdp_cmd("Page.getFrameTree", {})
+    driver.execute_cdp_cmd("Page.setDocumentContent", {
+        "frameId": frame_tree["frameTree"]["frame"]["id"],
+        "html": html,
+    })
+
+def stylesheet_data_uri(style_path) -> str:
+    # Un documento caricato in memoria non puo' leggere file:// locali, quindi il CSS viaggia inline
+    with open(style_path, "rb") as f:
+        encoded = base64.b64encode(f.read()).decode("ascii")
+    return f"data:text/css;base64,{encoded}"
 
 def HTML_to_PDF(FilePath):
+    from lib_resume_builder_AIHawk.renderer_pool import get_renderer_pool
+    from selenium.common.exceptions import WebDriverException
     # Validazione e preparazione del percorso del file
     if not os.path.isfile(FilePath):
         raise FileNotFoundError(f"The specified file does not exist: {FilePath}")
     FilePath = f"file:///{os.path.abspath(FilePath).replace(os.sep, '/')}"
-    driver = create_driver_selenium()
 
     try:
-        driver.get(FilePath)
-        time.sleep(2)
-        pdf_base64 = driver.execute_cdp_cmd("Page.printToPDF", {
-            "printBackground": True,         # Include lo sfondo nella stampa
-            "landscape": False,              # Stampa in verticale (False per ritratto)
-            "paperWidth": 8.27,              # Larghezza del foglio in pollici (A4)
-            "paperHeight": 11.69,            # Altezza del foglio in pollici (A4)
-            "marginTop": 0.8,                # Margine superiore in pollici (circa 2 cm)
-            "marginBottom": 0.8,             # Margine inferiore in pollici (circa 2 cm)
-            "marginLeft": 0.5,               # Margine sinistro in pollici (circa 2 cm)
-            "marginRight": 0.5,              # Margine destro in pollici (circa 2 cm)
-            "displayHeaderFooter": False,   # Non visualizzare intestazioni e piè di pagina
-            "preferCSSPageSize": True,       # Preferire le dimensioni della pagina CSS
-            "generateDocumentOutline": False, # Non generare un sommario del documento
-            "generateTaggedPDF": False,      # Non generare PDF taggato
-            "transferMode": "ReturnAsBase64" # Restituire il PDF come stringa base64
-        })
+        with span("renderer.pdf", backend="selenium"), get_renderer_pool().checkout() as driver:
+            with span("renderer.set_content"):
+                driver.get(FilePath)
+                wait_for_page_ready(driver)
+            with span("renderer.print_to_pdf"):
+                pdf_base64 = driver.execute_cdp_cmd("Page.printToPDF", PDF_PRINT_OPTIONS)
         return pdf_base64['data']
     except WebDriverException as e:
         raise RuntimeError(f"WebDriver exception occurred: {e}")
+
+def HTML_string_to_PDF(html: str):
+    from lib_resume_builder_AIHawk.renderer_pool import get_renderer_pool
+    from selenium.common.exceptions import WebDriverException
+    try:
+        with span("renderer.pdf", backend="selenium"), get_renderer_pool().checkout() as driver:
+            with span("renderer.set_content"):
+                set_document_content(driver, html)
+                wait_for_page_ready(driver)
+            with span("renderer.print_to_pdf"):
+                pdf_base64 = driver.execute_cdp_cmd("Page.printToPDF", PDF_PRINT_OPTIONS)
+        return pdf_base64['data']
+    except WebDriverException as e:
+        raise RuntimeError(f"WebDriver exception occurred: {e}")
+
+def print_to_pdf_stream(driver, fileobj, chunk_size: int = PDF_STREAM_CHUNK_SIZE) -> int:
+    # Stampa la pagina corrente come stream CDP e la copia a blocchi in fileobj
+    options = dict(PDF_PRINT_OPTIONS, transferMode="ReturnAsStream")
+    handle = driver.execute_cdp_cmd("Page.printToPDF", options)["stream"]
+    written = 0
+    try:
+        while True:
+            chunk = driver.execute_cdp_cmd("IO.read", {"handle": handle, "size": chunk_size})
+            data = chunk.get("data", "")
+            if data:
+                data = base64.b64decode(data) if chunk.get("base64Encoded") else data.encode("utf-8")
+                fileobj.write(data)
+                written += len(data)
+            if chunk.get("eof"):
+                break
     finally:
-        driver.quit()
+        driver.execute_cdp_cmd("IO.close", {"handle": handle})
+    return written
+
+def HTML_string_to_PDF_stream(html: str, fileobj) -> int:
+    from lib_resume_builder_AIHawk.renderer_pool import get_renderer_pool
+    from selenium.common.exceptions import WebDriverException
+    try:
+        with span("renderer.write_pdf", backend="selenium"), get_renderer_pool().checkout() as driver:
+            with span("renderer.set_content"):
+                set_document_content(driver, html)
+                wait_for_page_ready(driver)
+            with span("renderer.print_to_pdf"):
+                return print_to_pdf_stream(driver, fileobj)
+    except WebDriverException as e:
+        raise RuntimeError(f"WebDriver exception occurred: {e}")
+
+def HTML_strings_to_PDF_batch(html_documents: List[str], print_options: dict = None, concurrency: int = None) -> List[str]:
+    # Stampa molti documenti in schede diverse dello stesso browser; i risultati seguono l'ordine di input
+    from lib_resume_builder_AIHawk.renderer_pool import get_renderer_pool
+    from selenium.common.exceptions import WebDriverException
+    if not html_documents:
+        return []
+    options = dict(PDF_PRINT_OPTIONS, **(print_options or {}))
+    options["transferMode"] = "ReturnAsBase64"
+    concurrency = max(1, min(concurrency or global_config.RENDER_BATCH_CONCURRENCY, len(html_documents)))
+    results = [None] * len(html_documents)
+    try:
+        with span("renderer.pdf_batch", backend="selenium", documents=len(html_documents)), get_renderer_pool().checkout() as driver:
+            tabs = [driver.current_window_handle]
+            while len(tabs) < concurrency:
+                driver.switch_to.new_window("tab")
+                tabs.append(driver.current_window_handle)
+            for wave_start in range(0, len(html_documents), concurrency):
+                wave = list(enumerate(html_documents[wave_start:wave_start + concurrency], start=wave_start))
+                # Prima si caricano tutte le schede, cosi' risorse e layout procedono in parallelo nel browser
+                for tab, (_, html) in zip(tabs, wave):
+                    driver.switch_to.window(tab)
+                    set_document_content(driver, html)
+                for tab, (index, _) in zip(tabs, wave):
+                    driver.switch_to.window(tab)
+                    wait_for_page_ready(driver)
+                    results[index] = driver.execute_cdp_cmd("Page.printToPDF", options)["data"]
+        return results
+    except WebDriverException as e:
+        raise RuntimeError(f"WebDriver exception occurred: {e}")
+
+def URL_to_HTML(url: str, quiet_ms: int = 0) -> str:
+    # Usa un browser del pool invece di avviarne uno nuovo solo per leggere la pagina
+    from lib_resume_builder_AIHawk.renderer_pool import get_renderer_pool
+    from selenium.common.exceptions import WebDriverException
+    try:
+        with span("renderer.fetch_html", backend="selenium"), get_renderer_pool().checkout() as driver:
+            driver.get(url)
+            wait_for_page_ready(driver, quiet_ms=quiet_ms)
+            return driver.find_element("tag name", "body").get_attribute("outerHTML")
+    except WebDriverException as e:
+        raise RuntimeError(f"WebDriver exception occurred: {e}")
 
 def get_chrome_browser_options():
+    from selenium import webdriver
     options = webdriver.ChromeOptions()
     options.add_argument("--start-maximized")  # Avvia il browser a schermo intero
     options.add_argument("--no-sandbox")  # Disabilita la sandboxing per migliorare le prestazioni
@@ -61,6 +317,7 @@ def get_chrome_browser_options():
     options.add_argument("window-size=1200x800")  # Imposta la dimensione della finestra del browser
     options.add_argument("--disable-background-timer-throttling")  # Disabilita il throttling dei timer in background
     options.add_argument("--disable-backgrounding-occluded-windows")  # Disabilita la sospensione delle finestre occluse
+    options.add_argument("--disable-renderer-backgrounding")  # Le schede in background renderizzano a piena velocita' (batch)
     options.add_argument("--disable-translate")  # Disabilita il traduttore automatico
     options.add_argument("--disable-popup-blocking")  # Disabilita il blocco dei popup
     #options.add_argument("--disable-features=VizDisplayCompositor")  # Disabilita il compositore di visualizzazione
@@ -21,11 +21,22 @@ setup(
         'regex==2024.7.24',
         'selenium==4.9.1',
         'webdriver-manager==4.0.2',
+        'websockets',
         'inquirer',
         'faiss-cpu',
         'pydantic',
         'pydantic[email]',
+        'tiktoken',  # Conteggio dei token dei prompt
     ],
+    entry_points={
+        'console_scripts': [
+            # Scarica una volta font e icone: il rendering resta offline
+            'resume-builder-prefetch-assets=lib_resume_builder_AIHawk.asset_bundle:main',
+        ],
+    },
+    extras_require={
+        'fonts': ['fonttools', 'brotli'],  # Subsetting dei font nel bundle offline
+    },
     classifiers=[
         'Programming Language :: Python :: 3',
         'License :: OSI Approved :: MIT License',
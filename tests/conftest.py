@@ -0,0 +1,12 @@
+import pytest
+from lib_resume_builder_AIHawk.config import global_config
+
+
+@pytest.fixture(autouse=True)
+def isolated_config(tmp_path, monkeypatch):
+    # Nessun test scrive nella home o nella cartella di lavoro
+    monkeypatch.setattr(global_config, "LOG_OUTPUT_FILE_PATH", None)
+    monkeypatch.setattr(global_config, "LLM_CACHE_PATH", tmp_path / "llm_cache.sqlite3")
+    monkeypatch.setattr(global_config, "CHROMEDRIVER_CACHE_FILE", tmp_path / "chromedriver.json")
+    monkeypatch.setattr(global_config, "ASSETS_DIRECTORY", tmp_path / "assets")
+    yield
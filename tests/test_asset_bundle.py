@@ -0,0 +1,79 @@
+import pytest
+from lib_resume_builder_AIHawk import asset_bundle
+from lib_resume_builder_AIHawk.asset_bundle import AssetBundle
+from lib_resume_builder_AIHawk.config import global_config
+
+URL = "https://fonts.example.com/css?family=Test"
+
+
+@pytest.fixture
+def fetches(monkeypatch):
+    calls = []
+    responses = []
+
+    def fake_fetch(url):
+        calls.append(url)
+        response = responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    monkeypatch.setattr(asset_bundle, "_fetch", fake_fetch)
+    return calls, responses
+
+
+def test_missing_stylesheet_is_not_downloaded_by_default(fetches, caplog):
+    calls, _ = fetches
+    bundle = AssetBundle()
+    assert bundle.stylesheet(URL) is None
+    assert bundle.stylesheet(URL) is None
+    assert calls == []
+    warnings = [record for record in caplog.records if record.levelname == "WARNING"]
+    assert len(warnings) == 1 and URL in warnings[0].getMessage()
+
+
+def test_failed_download_is_retried_after_the_interval(fetches, monkeypatch, caplog):
+    calls, responses = fetches
+    clock = [1000.0]
+    monkeypatch.setattr(asset_bundle.time, "monotonic", lambda: clock[0])
+    monkeypatch.setattr(global_config, "ASSETS_DOWNLOAD_MISSING", True)
+    monkeypatch.setattr(global_config, "ASSETS_RETRY_INTERVAL", 60)
+    responses += [OSError("offline"), b"body { color: red; }"]
+    bundle = AssetBundle()
+
+    assert bundle.stylesheet(URL) is None
+    assert any(record.levelname == "WARNING" for record in caplog.records)
+    clock[0] += 30
+    assert bundle.stylesheet(URL) is None
+    assert len(calls) == 1
+
+    clock[0] += 31
+    assert "color: red" in bundle.stylesheet(URL)
+    assert len(calls) == 2
+    # Ora e' nel bundle: nessun altro download
+    assert "color: red" in AssetBundle().stylesheet(URL)
+    assert len(calls) == 2
+
+
+def test_inline_keeps_the_cdn_link_for_stylesheets_missing_from_the_bundle(fetches, caplog):
+    html = f'<head><link rel="stylesheet" href="{URL}"></head><body>Resume</body>'
+    bundle = AssetBundle()
+    assert bundle.inline(html) == html
+    assert bundle.inline(html) == html
+    warnings = [record for record in caplog.records if record.levelname == "WARNING"]
+    assert len(warnings) == 1 and "CDN" in warnings[0].getMessage()
+
+
+def test_strict_offline_drops_stylesheets_missing_from_the_bundle(fetches, monkeypatch):
+    monkeypatch.setattr(global_config, "ASSETS_STRICT_OFFLINE", True)
+    html = f'<head><link rel="stylesheet" href="{URL}"></head><body>Resume</body>'
+    assert AssetBundle().inline(html) == "<head></head><body>Resume</body>"
+
+
+def test_missing_imports_stay_at_the_top_of_the_inlined_style(fetches, tmp_path):
+    (tmp_path / "local.css").write_text("h1 { color: blue; }", encoding="utf-8")
+    (tmp_path / "style.css").write_text(f'@import "{tmp_path / "local.css"}";\n@import url("{URL}");\nbody {{ margin: 0; }}',
+                                        encoding="utf-8")
+    html = AssetBundle().inline(f'<link rel="stylesheet" href="{tmp_path / "style.css"}">')
+    assert html.startswith(f'<style>\n@import url("{URL}");')
+    assert "color: blue" in html and "margin: 0" in html
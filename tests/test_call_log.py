@@ -0,0 +1,89 @@
+import json
+import os
+import time
+import pytest
+from lib_resume_builder_AIHawk.call_log import CALL_LOG_FILE_NAME, CallLogWriter, get_call_log_writer
+from lib_resume_builder_AIHawk.config import global_config
+
+
+@pytest.fixture
+def make_writer(tmp_path):
+    writers = []
+
+    def make(**kwargs):
+        writer = CallLogWriter(tmp_path / "calls.jsonl", **kwargs)
+        writers.append(writer)
+        return writer
+
+    yield make
+    for writer in writers:
+        writer.close()
+
+
+def read_records(path):
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def entry(i: int) -> dict:
+    return {"i": i, "prompts": "x" * 50}
+
+
+def test_records_are_written_as_jsonl(make_writer, tmp_path):
+    writer = make_writer(flush_interval=60)
+    for i in range(3):
+        writer.write(entry(i))
+    assert writer.flush(timeout=5)
+    assert [record["i"] for record in read_records(tmp_path / "calls.jsonl")] == [0, 1, 2]
+    assert writer.written == 3 and writer.dropped == 0
+
+
+def test_rotates_by_size_and_keeps_backup_count_files(make_writer, tmp_path):
+    writer = make_writer(max_bytes=100, backup_count=2)
+    for i in range(8):
+        writer.write(entry(i))
+    assert writer.flush(timeout=5)
+    path = tmp_path / "calls.jsonl"
+    # Due record superano max_bytes: un file ogni due record, restano solo gli ultimi due backup
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["calls.jsonl", "calls.jsonl.1", "calls.jsonl.2"]
+    assert path.read_text(encoding="utf-8") == ""
+    assert [record["i"] for record in read_records(tmp_path / "calls.jsonl.1")] == [6, 7]
+    assert [record["i"] for record in read_records(tmp_path / "calls.jsonl.2")] == [4, 5]
+
+
+def test_rotation_without_backups_truncates(make_writer, tmp_path):
+    writer = make_writer(max_bytes=100, backup_count=0)
+    for i in range(3):
+        writer.write(entry(i))
+    assert writer.flush(timeout=5)
+    assert [p.name for p in tmp_path.iterdir()] == ["calls.jsonl"]
+
+
+def test_rotates_a_file_older_than_rotate_interval(make_writer, tmp_path):
+    path = tmp_path / "calls.jsonl"
+    path.write_text(json.dumps(entry(-1)) + "\n", encoding="utf-8")
+    two_hours_ago = time.time() - 7200
+    os.utime(path, (two_hours_ago, two_hours_ago))
+    writer = make_writer(rotate_interval=3600, backup_count=3)
+    writer.write(entry(0))
+    writer.write(entry(1))
+    assert writer.flush(timeout=5)
+    # Il vecchio file e il primo record nuovo finiscono nel backup, poi si riparte da un file nuovo
+    assert [record["i"] for record in read_records(tmp_path / "calls.jsonl.1")] == [-1, 0]
+    assert [record["i"] for record in read_records(path)] == [1]
+
+
+def test_close_flushes_and_ignores_later_writes(make_writer, tmp_path):
+    writer = make_writer(flush_interval=60)
+    writer.write(entry(0))
+    writer.close()
+    writer.write(entry(1))
+    assert [record["i"] for record in read_records(tmp_path / "calls.jsonl")] == [0]
+
+
+def test_get_call_log_writer_is_shared_per_folder(monkeypatch, tmp_path):
+    assert get_call_log_writer() is None
+    monkeypatch.setattr(global_config, "LOG_OUTPUT_FILE_PATH", tmp_path)
+    writer = get_call_log_writer()
+    assert writer is get_call_log_writer()
+    assert writer.path == tmp_path / CALL_LOG_FILE_NAME
+    assert writer.max_bytes == global_config.LLM_CALL_LOG_MAX_BYTES
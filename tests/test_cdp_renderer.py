@@ -0,0 +1,85 @@
+import asyncio
+import pytest
+from lib_resume_builder_AIHawk import cdp_renderer
+from lib_resume_builder_AIHawk.cdp_renderer import CDPRenderer
+
+
+class FakeConnection:
+    def __init__(self):
+        self.targets = 0
+
+    async def send(self, method, params=None, session_id=None):
+        if method == "Target.createTarget":
+            self.targets += 1
+            return {"targetId": f"target-{self.targets}"}
+        if method == "Target.attachToTarget":
+            return {"sessionId": f"session-{params['targetId']}"}
+        return {}
+
+
+class FakeChromeProcess:
+    launched = []
+
+    def __init__(self, binary):
+        self.connection = FakeConnection()
+        self.renders = 0
+        self.active_pages = 0
+        self.closed = False
+
+    @property
+    def alive(self):
+        return not self.closed
+
+    async def start(self):
+        FakeChromeProcess.launched.append(self)
+
+    async def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def renderer(monkeypatch):
+    FakeChromeProcess.launched = []
+    monkeypatch.setattr(cdp_renderer, "ChromeProcess", FakeChromeProcess)
+    return CDPRenderer(chrome_binary="chrome", max_renders=2)
+
+
+def test_browser_is_recycled_between_jobs(renderer):
+    async def run():
+        for _ in range(3):
+            async with renderer._page():
+                pass
+    asyncio.run(run())
+    first, second = FakeChromeProcess.launched
+    assert first.closed and not second.closed
+
+
+def test_browser_is_recycled_under_steady_load(renderer):
+    async def run():
+        release = asyncio.Event()
+        opened = []
+
+        async def job():
+            async with renderer._page():
+                opened.append(None)
+                await release.wait()
+
+        # Sempre qualche pagina aperta: il browser non e' mai inattivo
+        first_jobs = [asyncio.create_task(job()) for _ in range(2)]
+        while len(opened) < 2:
+            await asyncio.sleep(0)
+        first = FakeChromeProcess.launched[0]
+        late_job = asyncio.create_task(job())
+        while len(opened) < 3:
+            await asyncio.sleep(0)
+        # Le nuove pagine vanno su un browser nuovo, il vecchio finisce le sue
+        assert len(FakeChromeProcess.launched) == 2
+        assert not first.closed
+        release.set()
+        await asyncio.gather(*first_jobs, late_job)
+        return first
+
+    first = asyncio.run(run())
+    assert first.closed and first.active_pages == 0
+    assert not FakeChromeProcess.launched[1].closed
+    assert renderer._draining == set()
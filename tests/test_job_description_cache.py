@@ -0,0 +1,79 @@
+import pytest
+from lib_resume_builder_AIHawk.job_description_cache import (
+    JobDescriptionCache,
+    normalize_job_description_text,
+    normalize_job_description_url,
+)
+from lib_resume_builder_AIHawk.sqlite_cache import SQLiteCache
+
+URL = "https://jobs.example.com/view/12345"
+
+
+@pytest.fixture
+def job_description_cache(tmp_path):
+    cache = SQLiteCache(tmp_path / "cache.sqlite3", table="job_descriptions")
+    yield JobDescriptionCache(cache)
+    cache.close()
+
+
+@pytest.mark.parametrize("variant", [
+    "https://jobs.example.com/view/12345",
+    "https://jobs.example.com/view/12345/",
+    "HTTPS://Jobs.Example.com/view/12345",
+    "  https://jobs.example.com/view/12345  ",
+    "https://jobs.example.com/view/12345#apply",
+    "https://jobs.example.com/view/12345?utm_source=linkedin&utm_campaign=x",
+    "https://jobs.example.com/view/12345?trk=public_jobs&refId=abc&gclid=1&fbclid=2",
+])
+def test_url_variants_normalize_to_the_same_url(variant):
+    assert normalize_job_description_url(variant) == "https://jobs.example.com/view/12345"
+
+
+def test_url_normalization_keeps_meaningful_query_in_stable_order():
+    first = normalize_job_description_url("https://jobs.example.com/view?id=7&lang=en&utm_medium=mail")
+    second = normalize_job_description_url("https://jobs.example.com/view?lang=en&id=7")
+    assert first == second == "https://jobs.example.com/view?id=7&lang=en"
+    assert normalize_job_description_url("https://jobs.example.com/view?id=8") != first
+
+
+def test_url_path_stays_case_sensitive():
+    assert normalize_job_description_url("https://jobs.example.com/View/ABC") != normalize_job_description_url(URL)
+    assert normalize_job_description_url("https://jobs.example.com/View/ABC").endswith("/View/ABC")
+
+
+def test_text_normalization_drops_case_whitespace_and_boilerplate():
+    page = """
+        Senior Python Developer
+
+        We build   resume tools.
+        Apply now
+        Save job
+        We use cookies to improve your experience.
+        © 2024 Example Inc.
+    """
+    assert normalize_job_description_text(page) == "senior python developer we build resume tools."
+    # Forme Unicode equivalenti danno lo stesso testo
+    assert normalize_job_description_text("ﬁnance ｔｅａｍ") == normalize_job_description_text("finance team")
+
+
+def test_keys_depend_on_fingerprint_and_kind():
+    assert JobDescriptionCache.url_key(URL + "/?utm_source=x", "f1") == JobDescriptionCache.url_key(URL, "f1")
+    assert JobDescriptionCache.url_key(URL, "f1") != JobDescriptionCache.url_key(URL, "f2")
+    assert JobDescriptionCache.url_key(URL, "f1").startswith("url:")
+    assert JobDescriptionCache.text_key("Python developer", "f1").startswith("text:")
+    assert JobDescriptionCache.text_key("Python  Developer\nApply now", "f1") == JobDescriptionCache.text_key("python developer", "f1")
+
+
+def test_summary_is_found_by_url_or_text(job_description_cache):
+    job_description_cache.set("summary", "f1", url=URL, text="Python developer wanted")
+    assert job_description_cache.get_by_url(URL + "?utm_source=newsletter", "f1") == "summary"
+    assert job_description_cache.get_by_text("PYTHON developer   wanted", "f1") == "summary"
+    assert job_description_cache.get_by_url(URL, "f2") is None
+    assert job_description_cache.get_by_url("https://jobs.example.com/view/999", "f1") is None
+
+
+def test_invalidate_url_keeps_the_text_entry(job_description_cache):
+    job_description_cache.set("summary", "f1", url=URL, text="Python developer wanted")
+    job_description_cache.invalidate_url(URL, "f1")
+    assert job_description_cache.get_by_url(URL, "f1") is None
+    assert job_description_cache.get_by_text("Python developer wanted", "f1") == "summary"
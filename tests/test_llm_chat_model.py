@@ -0,0 +1,141 @@
+import asyncio
+import threading
+import pytest
+from langchain_core.messages import AIMessageChunk, HumanMessage
+from langchain_core.messages.ai import AIMessage
+from lib_resume_builder_AIHawk import llm_chat_model, prompt_serializer
+from lib_resume_builder_AIHawk.llm_chat_model import LoggerChatModel
+from lib_resume_builder_AIHawk.retry_policy import EmptyResponseError, RetryError, RetryPolicy
+from lib_resume_builder_AIHawk.usage_accounting import track_usage
+from lib_resume_builder_AIHawk.tracing import InMemorySpanExporter, set_span_exporter
+
+
+class FakeLLM:
+    model_name = "gpt-4o-mini"
+
+    def __init__(self):
+        self.calls = 0
+
+    async def ainvoke(self, messages):
+        self.calls += 1
+        return AIMessage(
+            content=f"reply {self.calls}",
+            response_metadata={"model_name": self.model_name},
+            usage_metadata={"input_tokens": 10, "output_tokens": 5, "total_tokens": 15},
+        )
+
+
+class ThreadRecordingCache:
+    def __init__(self):
+        self.data = {}
+        self.threads = []
+
+    def get(self, key):
+        self.threads.append(threading.get_ident())
+        return self.data.get(key)
+
+    def set(self, key, value):
+        self.threads.append(threading.get_ident())
+        self.data[key] = value
+
+
+def test_acall_uses_the_cache_off_the_event_loop():
+    llm = FakeLLM()
+    cache = ThreadRecordingCache()
+    model = LoggerChatModel(llm, cache=cache)
+    messages = [HumanMessage(content="hello")]
+
+    async def run():
+        loop_thread = threading.get_ident()
+        first = await model.acall(messages)
+        second = await model.acall(messages)
+        return loop_thread, first, second
+
+    loop_thread, first, second = asyncio.run(run())
+    assert first.content == second.content == "reply 1"
+    assert llm.calls == 1
+    # get, set, get: nessuno sul thread dell'event loop
+    assert len(cache.threads) == 3
+    assert loop_thread not in cache.threads
+
+
+def test_call_span_records_the_prompt_tokens(monkeypatch):
+    monkeypatch.setattr(prompt_serializer, "_encoding", False)
+    exporter = InMemorySpanExporter()
+    set_span_exporter(exporter)
+    try:
+        model = LoggerChatModel(FakeLLM(), cache=ThreadRecordingCache())
+        asyncio.run(model.acall([HumanMessage(content="x" * 400)]))
+    finally:
+        set_span_exporter(None)
+    (call_span,) = [span for span in exporter.spans if span.name == "llm.call"]
+    assert call_span.attributes["prompt_tokens"] == 100
+
+
+class StreamingLLM:
+    model_name = "gpt-4o-mini"
+
+    def __init__(self, *streams):
+        # Ogni stream e' una lista di chunk; un'eccezione nella lista viene sollevata a quel punto
+        self.streams = list(streams)
+
+    def _chunks(self):
+        for item in self.streams.pop(0):
+            if isinstance(item, Exception):
+                raise item
+            yield AIMessageChunk(content=item, response_metadata={"model_name": self.model_name})
+
+    def stream(self, messages):
+        return self._chunks()
+
+    async def astream(self, messages):
+        for chunk in self._chunks():
+            yield chunk
+
+
+@pytest.fixture
+def fast_retries(monkeypatch):
+    retry_policy = RetryPolicy(max_attempts=3, deadline=10, base_delay=0.01, max_delay=0.01)
+    monkeypatch.setattr(llm_chat_model, "get_llm_retry_policy", lambda: retry_policy)
+
+
+def test_empty_stream_is_retried(fast_retries):
+    model = LoggerChatModel(StreamingLLM([], ["Hello", " world"]), cache=ThreadRecordingCache())
+    assert "".join(model.stream([HumanMessage(content="hi")])) == "Hello world"
+
+
+def test_empty_async_stream_gives_up_with_a_clear_error(fast_retries):
+    model = LoggerChatModel(StreamingLLM([], [], []), cache=ThreadRecordingCache())
+
+    async def run():
+        return [token async for token in model.astream([HumanMessage(content="hi")])]
+    with pytest.raises(RetryError) as excinfo:
+        asyncio.run(run())
+    assert isinstance(excinfo.value.__cause__, EmptyResponseError)
+
+
+def test_stream_failing_midway_still_records_usage(fast_retries):
+    cache = ThreadRecordingCache()
+    model = LoggerChatModel(StreamingLLM(["Hello", ConnectionError("reset")]), cache=cache)
+    tokens = []
+    with track_usage() as tracker, pytest.raises(ConnectionError):
+        for token in model.stream([HumanMessage(content="x" * 400)]):
+            tokens.append(token)
+    assert tokens == ["Hello"]
+    summary = tracker.summary()
+    # Nessun dato di uso dal provider: stima da prompt e testo ricevuto
+    assert summary["calls"] == 1 and summary["input_tokens"] > 0
+    assert cache.data == {}
+
+
+def test_abandoned_async_stream_records_usage(fast_retries):
+    model = LoggerChatModel(StreamingLLM(["Hello", " world"]), cache=ThreadRecordingCache())
+
+    async def run():
+        stream = model.astream([HumanMessage(content="hi")])
+        first = await anext(stream)
+        await stream.aclose()
+        return first
+    with track_usage() as tracker:
+        assert asyncio.run(run()) == "Hello"
+    assert tracker.summary()["calls"] == 1
@@ -0,0 +1,88 @@
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import httpx
+import pytest
+from lib_resume_builder_AIHawk.llm_clients import LLMClientRegistry, LoopBoundAsyncClient
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = b"ok"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/"
+    server.shutdown()
+    server.server_close()
+
+
+def test_registry_returns_one_loop_bound_client_per_base_url():
+    registry = LLMClientRegistry()
+    client = registry.async_http_client("https://api.example.com/v1")
+    assert isinstance(client, LoopBoundAsyncClient)
+    assert isinstance(client, httpx.AsyncClient)
+    assert registry.async_http_client("https://api.example.com/v1") is client
+    assert registry.async_http_client("https://other.example.com/v1") is not client
+    registry.close()
+
+
+def test_client_survives_successive_event_loops(server_url):
+    registry = LLMClientRegistry()
+    client = registry.async_http_client()
+
+    async def fetch():
+        # Due richieste per loop: la seconda riusa la connessione keep-alive
+        first = await client.get(server_url)
+        second = await client.get(server_url)
+        return first.text + second.text, client.loop_clients[asyncio.get_running_loop()]
+
+    first_text, first_pool = asyncio.run(fetch())
+    second_text, second_pool = asyncio.run(fetch())
+
+    assert first_text == second_text == "okok"
+    assert first_pool is not second_pool
+    # Il pool del primo loop, ormai chiuso, e' stato scartato
+    assert list(client.loop_clients.values()) == [second_pool]
+    registry.close()
+
+
+def test_aclose_closes_the_pool_of_the_running_loop(server_url):
+    registry = LLMClientRegistry()
+    client = registry.async_http_client()
+
+    async def fetch_and_close():
+        await client.get(server_url)
+        pool = client.loop_clients[asyncio.get_running_loop()]
+        await registry.aclose()
+        return pool
+
+    pool = asyncio.run(fetch_and_close())
+    assert pool.is_closed
+    assert client.loop_clients == {}
+
+
+def test_close_closes_pools_of_loops_still_open(server_url):
+    client = LoopBoundAsyncClient()
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(client.get(server_url))
+        pool = client.loop_clients[loop]
+        client.close()
+        assert pool.is_closed
+        assert client.loop_clients == {}
+    finally:
+        loop.close()
@@ -0,0 +1,106 @@
+import threading
+from lib_resume_builder_AIHawk import prompt_serializer
+from lib_resume_builder_AIHawk.prompt_serializer import (
+    EMPTY_VALUE,
+    compact_prompt_inputs,
+    compact_value,
+    count_tokens,
+    serialize_for_prompt,
+)
+from lib_resume_builder_AIHawk.resume import ExperienceDetails, Project
+
+
+def experience(**overrides):
+    fields = dict(position="Backend Developer", company="Acme", employment_period="2020 - 2023",
+                  location=None, industry="", key_responsibilities=None, skills_acquired=None)
+    fields.update(overrides)
+    return ExperienceDetails(**fields)
+
+
+def test_compact_value_drops_empty_fields_from_models():
+    assert compact_value(experience()) == {
+        "position": "Backend Developer",
+        "company": "Acme",
+        "employment_period": "2020 - 2023",
+    }
+
+
+def test_compact_value_flattens_value_only_fields():
+    value = compact_value(experience(key_responsibilities=[{"responsibility_1": "Built APIs"},
+                                                           {"responsibility_2": "Ran on-call"}]))
+    assert value["key_responsibilities"] == ["Built APIs", "Ran on-call"]
+
+
+def test_compact_value_handles_urls_sets_and_nested_empties():
+    assert compact_value(Project(name="Site", description="", link="https://example.com/app")) == {
+        "name": "Site",
+        "link": "https://example.com/app",
+    }
+    assert compact_value({"python", "go", "c"}) == ["c", "go", "python"]
+    assert compact_value({"a": {"b": None, "c": []}, "d": [None, "", {}], "e": 0, "f": False}) == {"e": 0, "f": False}
+
+
+def test_serialize_for_prompt_is_terse_yaml():
+    text = serialize_for_prompt([experience(skills_acquired=["Python", "SQL"],
+                                            key_responsibilities=[{"responsibility_1": "Built APIs"}])])
+    assert text == (
+        "- position: Backend Developer\n"
+        "  company: Acme\n"
+        "  employment_period: 2020 - 2023\n"
+        "  key_responsibilities: [Built APIs]\n"
+        "  skills_acquired: [Python, SQL]"
+    )
+    assert "ExperienceDetails" not in text and "None" not in text
+
+
+def test_serialize_for_prompt_empty_values_and_scalars():
+    assert serialize_for_prompt(None) == EMPTY_VALUE
+    assert serialize_for_prompt([]) == EMPTY_VALUE
+    assert serialize_for_prompt([experience(position=None, company=None, employment_period=None)]) == EMPTY_VALUE
+    assert serialize_for_prompt("already text") == "already text"
+    assert serialize_for_prompt(42) == "42"
+
+
+def test_serialize_for_prompt_keeps_unicode_and_long_lines():
+    description = "Sviluppo di un'applicazione è " + "molto " * 100
+    text = serialize_for_prompt({"description": description})
+    assert "\n" not in text
+    assert "è" in text
+
+
+def test_compact_prompt_inputs_serializes_every_input():
+    inputs = compact_prompt_inputs({"experience_details": [experience()], "job_description": "Python role"})
+    assert inputs["job_description"] == "Python role"
+    assert inputs["experience_details"].startswith("- position: Backend Developer")
+
+
+def test_compact_form_is_shorter_than_the_model_repr():
+    experiences = [experience(skills_acquired=["Python", "SQL"]) for _ in range(3)]
+    assert count_tokens(serialize_for_prompt(experiences)) < count_tokens(str(experiences))
+
+
+class FakeEncoding:
+    def encode(self, text, disallowed_special=()):
+        return text.split()
+
+
+def test_count_tokens_estimates_until_the_encoding_is_loaded(monkeypatch):
+    release = threading.Event()
+
+    def slow_load():
+        release.wait(5)
+        prompt_serializer._encoding = FakeEncoding()
+
+    loader = threading.Thread(target=slow_load, daemon=True)
+    monkeypatch.setattr(prompt_serializer, "_encoding", None)
+    monkeypatch.setattr(prompt_serializer, "_encoding_loader", loader)
+    loader.start()
+    # La richiesta non aspetta il download della codifica
+    assert count_tokens("one two three " * 10) == len("one two three " * 10) // 4
+    release.set()
+    assert count_tokens("one two three", wait=True) == 3
+
+
+def test_count_tokens_falls_back_when_the_encoding_is_unavailable(monkeypatch):
+    monkeypatch.setattr(prompt_serializer, "_encoding", False)
+    assert count_tokens("x" * 40, wait=True) == 10
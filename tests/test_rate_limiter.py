@@ -0,0 +1,207 @@
+import asyncio
+import threading
+import time
+import pytest
+from langchain_core.messages import HumanMessage, SystemMessage
+from lib_resume_builder_AIHawk.rate_limiter import LLMRateLimiter, LLMReservation, TokenBucket, estimate_prompt_tokens
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def wait_until(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not reached")
+        time.sleep(0.005)
+
+
+def test_estimate_prompt_tokens_counts_characters_and_messages():
+    assert estimate_prompt_tokens("x" * 400) == 104
+    assert estimate_prompt_tokens([SystemMessage(content="x" * 40), HumanMessage(content="y" * 80)]) == 10 + 4 + 20 + 4
+
+
+def test_token_bucket_refills_up_to_capacity():
+    clock = FakeClock()
+    bucket = TokenBucket(capacity=60, refill_per_second=1, clock=clock)
+    bucket.consume(60)
+    assert bucket.wait_time(10) == 10
+    clock.now += 4
+    assert bucket.wait_time(10) == 6
+    clock.now += 1000
+    assert bucket.wait_time(60) == 0
+    assert bucket.tokens == 60
+
+
+def test_token_bucket_adjust_can_go_negative_but_not_above_capacity():
+    clock = FakeClock()
+    bucket = TokenBucket(capacity=60, refill_per_second=1, clock=clock)
+    bucket.adjust(100)
+    assert bucket.tokens == -40
+    assert bucket.wait_time(1) == 41
+    bucket.adjust(-1000)
+    assert bucket.tokens == 60
+
+
+def test_release_settles_tokens_against_real_usage():
+    clock = FakeClock()
+    limiter = LLMRateLimiter(tokens_per_minute=600, clock=clock)
+    reservation = limiter.acquire(100)
+    assert limiter._tokens.tokens == 500
+    reservation.used_tokens = 300
+    limiter.release(reservation)
+    # La stima era bassa: i 200 token in piu' vengono tolti dal bucket
+    assert limiter._tokens.tokens == 300
+
+    reservation = limiter.acquire(100)
+    reservation.used_tokens = 20
+    limiter.release(reservation)
+    # Stima alta: gli 80 token non usati tornano disponibili
+    assert limiter._tokens.tokens == 280
+
+
+def test_release_without_usage_keeps_the_estimate():
+    clock = FakeClock()
+    limiter = LLMRateLimiter(tokens_per_minute=600, clock=clock)
+    limiter.release(limiter.acquire(100))
+    assert limiter._tokens.tokens == 500
+    assert limiter.stats()["in_flight"] == 0
+
+
+def test_oversized_request_reserves_at_most_the_bucket_capacity():
+    clock = FakeClock()
+    limiter = LLMRateLimiter(tokens_per_minute=600, clock=clock)
+    reservation = limiter.acquire(5000)
+    assert limiter._tokens.tokens == 0
+    reservation.used_tokens = 5000
+    limiter.release(reservation)
+    assert limiter._tokens.tokens == -4400
+
+
+def test_waiters_are_granted_in_fifo_order():
+    limiter = LLMRateLimiter(max_concurrency=1)
+    holder = limiter.acquire(1)
+    granted = []
+
+    def worker(name):
+        reservation = limiter.acquire(1)
+        granted.append(name)
+        limiter.release(reservation)
+
+    threads = []
+    for name in "abcde":
+        thread = threading.Thread(target=worker, args=(name,), daemon=True)
+        thread.start()
+        threads.append(thread)
+        # Ogni thread entra in coda prima del successivo
+        wait_until(lambda: limiter.stats()["queued"] == len(threads))
+    limiter.release(holder)
+    for thread in threads:
+        thread.join(5)
+    assert granted == list("abcde")
+    assert limiter.stats()["granted"] == 6
+
+
+def test_async_waiters_are_granted_in_fifo_order():
+    limiter = LLMRateLimiter(max_concurrency=1)
+
+    async def run():
+        holder = await limiter.aacquire(1)
+        granted = []
+
+        async def worker(name):
+            reservation = await limiter.aacquire(1)
+            granted.append(name)
+            limiter.release(reservation)
+
+        tasks = []
+        for name in "abcd":
+            tasks.append(asyncio.create_task(worker(name)))
+            await asyncio.sleep(0)
+        limiter.release(holder)
+        await asyncio.wait_for(asyncio.gather(*tasks), 5)
+        return granted
+
+    assert asyncio.run(run()) == list("abcd")
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    limiter = LLMRateLimiter(max_concurrency=1)
+
+    async def run():
+        holder = await limiter.aacquire(1)
+        waiter = asyncio.create_task(limiter.aacquire(1))
+        await asyncio.sleep(0.01)
+        assert limiter.stats()["queued"] == 1
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert limiter.stats()["queued"] == 0
+        limiter.release(holder)
+        # Il prossimo chiamante non resta bloccato dietro la richiesta annullata
+        limiter.release(await asyncio.wait_for(limiter.aacquire(1), 1))
+
+    asyncio.run(run())
+
+
+def test_pause_holds_back_every_caller():
+    limiter = LLMRateLimiter()
+    limiter.pause(0.2)
+    started = time.monotonic()
+    limiter.release(limiter.acquire(1))
+    assert time.monotonic() - started >= 0.19
+    assert limiter.stats()["pauses"] == 1
+
+
+def test_refill_wakes_the_head_of_the_queue_without_polling():
+    limiter = LLMRateLimiter(tokens_per_minute=600)
+    limiter.release(limiter.acquire(600))
+    started = time.monotonic()
+    # 10 token al secondo: 5 token tornano disponibili in ~0.5 s
+    limiter.release(limiter.acquire(5))
+    assert 0.4 <= time.monotonic() - started < 2
+
+
+def test_each_grant_wakes_only_the_waiter_it_admits(monkeypatch):
+    wakes = []
+    original_wake = LLMReservation._wake
+    monkeypatch.setattr(LLMReservation, "_wake", lambda self: (wakes.append(self), original_wake(self)))
+    limiter = LLMRateLimiter(max_concurrency=1)
+
+    async def run():
+        holder = await limiter.aacquire(1)
+
+        async def worker():
+            reservation = await limiter.aacquire(1)
+            await asyncio.sleep(0.01)
+            limiter.release(reservation)
+
+        tasks = [asyncio.create_task(worker()) for _ in range(8)]
+        await asyncio.sleep(0.05)
+        # Finche' il posto e' occupato nessuno in coda viene svegliato
+        assert wakes == [holder]
+        limiter.release(holder)
+        await asyncio.wait_for(asyncio.gather(*tasks), 5)
+
+    asyncio.run(run())
+    assert len(wakes) == 9 and len(set(map(id, wakes))) == 9
+
+
+def test_pause_wakes_waiters_when_it_expires():
+    limiter = LLMRateLimiter(max_concurrency=2)
+
+    async def run():
+        limiter.pause(0.2)
+        started = time.monotonic()
+        reservations = await asyncio.wait_for(asyncio.gather(limiter.aacquire(1), limiter.aacquire(1)), 2)
+        for reservation in reservations:
+            limiter.release(reservation)
+        return time.monotonic() - started
+
+    assert 0.19 <= asyncio.run(run()) < 1
@@ -0,0 +1,142 @@
+import threading
+import time
+import pytest
+from lib_resume_builder_AIHawk.renderer_pool import RendererPool
+
+
+class FakeSwitchTo:
+    def window(self, handle):
+        pass
+
+
+class FakeDriver:
+    def __init__(self):
+        self.window_handles = ["main"]
+        self.switch_to = FakeSwitchTo()
+        self.quit_called = False
+
+    def get(self, url):
+        pass
+
+    def quit(self):
+        self.quit_called = True
+
+
+class DriverFactory:
+    def __init__(self):
+        self.drivers = []
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        driver = FakeDriver()
+        with self._lock:
+            self.drivers.append(driver)
+        return driver
+
+
+def run_threads(target, count):
+    threads = [threading.Thread(target=target, daemon=True) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    return [thread for thread in threads if thread.is_alive()]
+
+
+def test_idle_browser_is_reused():
+    factory = DriverFactory()
+    pool = RendererPool(size=2, max_renders=10, driver_factory=factory)
+    with pool.checkout() as first:
+        pass
+    with pool.checkout() as second:
+        pass
+    assert first is second
+    assert len(factory.drivers) == 1
+
+
+def test_browser_is_recycled_after_max_renders():
+    factory = DriverFactory()
+    pool = RendererPool(size=1, max_renders=2, driver_factory=factory)
+    for _ in range(3):
+        with pool.checkout():
+            pass
+    assert len(factory.drivers) == 2
+    assert factory.drivers[0].quit_called
+
+
+def test_failed_job_discards_the_browser():
+    factory = DriverFactory()
+    pool = RendererPool(size=1, max_renders=10, driver_factory=factory)
+    with pytest.raises(ValueError):
+        with pool.checkout():
+            raise ValueError("render failed")
+    assert factory.drivers[0].quit_called
+    with pool.checkout() as driver:
+        assert driver is factory.drivers[1]
+
+
+def test_waiter_is_woken_when_a_recycled_browser_frees_its_slot():
+    # size=1, max_renders=1: ogni browser viene scartato dopo un job e il secondo thread deve crearne uno nuovo
+    factory = DriverFactory()
+    pool = RendererPool(size=1, max_renders=1, driver_factory=factory)
+    renders = []
+
+    def render():
+        with pool.checkout() as driver:
+            # Il job dura abbastanza perche' l'altro thread resti in attesa
+            time.sleep(0.1)
+            renders.append(driver)
+    assert run_threads(render, 2) == []
+    assert len(renders) == 2
+    assert len(factory.drivers) == 2
+
+
+def test_waiter_is_woken_when_a_failed_job_frees_its_slot():
+    factory = DriverFactory()
+    pool = RendererPool(size=1, max_renders=10, driver_factory=factory)
+    results = []
+
+    def render():
+        try:
+            with pool.checkout():
+                raise ValueError("render failed")
+        except ValueError:
+            results.append("failed")
+    assert run_threads(render, 3) == []
+    assert results == ["failed"] * 3
+
+
+def test_checkout_times_out_when_the_pool_stays_busy():
+    pool = RendererPool(size=1, max_renders=10, driver_factory=DriverFactory())
+    with pool.checkout():
+        with pytest.raises(TimeoutError):
+            with pool.checkout(timeout=0.05):
+                pass
+
+
+def test_failed_launch_frees_the_slot():
+    attempts = []
+
+    def factory():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("chrome did not start")
+        return FakeDriver()
+    pool = RendererPool(size=1, max_renders=10, driver_factory=factory)
+    with pytest.raises(RuntimeError):
+        with pool.checkout():
+            pass
+    with pool.checkout(timeout=1):
+        pass
+
+
+def test_closed_pool_quits_idle_browsers_and_refuses_checkouts():
+    factory = DriverFactory()
+    pool = RendererPool(size=2, max_renders=10, driver_factory=factory)
+    with pool.checkout():
+        pass
+    pool.close()
+    assert factory.drivers[0].quit_called
+    with pytest.raises(RuntimeError):
+        with pool.checkout():
+            pass
@@ -0,0 +1,68 @@
+import asyncio
+import threading
+import time
+from lib_resume_builder_AIHawk.resume_stream import DONE, SECTION, TOKEN, astream_html_resume, stream_html_resume
+
+
+class FakeGenerator:
+    def __init__(self, sections, failing=(), blocking=()):
+        self.sections = sections
+        self.failing = set(failing)
+        self.blocking = set(blocking)
+        self.release = threading.Event()
+
+    def _planned_sections(self):
+        return list(self.sections)
+
+    @staticmethod
+    def _assemble_html_resume(results):
+        return "|".join(f"{name}={html}" for name, html in results.items())
+
+    def _stream_section(self, section):
+        if section in self.blocking:
+            self.release.wait(5)
+        yield f"<{section}>"
+        if section in self.failing:
+            raise RuntimeError(f"{section} broke")
+        yield f"</{section}>"
+
+    async def _astream_section(self, section):
+        yield f"<{section}>"
+        if section in self.failing:
+            raise RuntimeError(f"{section} broke")
+        yield f"</{section}>"
+
+
+def test_sections_are_released_in_document_order():
+    events = list(stream_html_resume(FakeGenerator(["header", "education", "work_experience"])))
+    assert [event.section for event in events if event.type == SECTION] == ["header", "education", "work_experience"]
+    assert {event.section for event in events if event.type == TOKEN} == {"header", "education", "work_experience"}
+    assert events[-1].type == DONE
+    assert events[-1].html == "header=<header></header>|education=<education></education>|work_experience=<work_experience></work_experience>"
+
+
+def test_failed_section_is_logged_and_left_out(caplog):
+    events = list(stream_html_resume(FakeGenerator(["header", "education"], failing=["education"])))
+    assert events[-1].html == "header=<header></header>"
+    errors = [record for record in caplog.records if record.levelname == "ERROR"]
+    assert len(errors) == 1 and "education" in errors[0].getMessage() and errors[0].exc_info
+
+
+def test_closing_the_stream_does_not_wait_for_running_sections():
+    generator = FakeGenerator(["header", "education"], blocking=["education"])
+    stream = stream_html_resume(generator)
+    first = next(stream)
+    assert first.section == "header"
+    started = time.monotonic()
+    stream.close()
+    assert time.monotonic() - started < 1
+    generator.release.set()
+
+
+def test_async_stream_logs_failed_sections(caplog):
+    async def collect():
+        return [event async for event in astream_html_resume(FakeGenerator(["header", "education"], failing=["header"]))]
+
+    events = asyncio.run(collect())
+    assert events[-1].html == "education=<education></education>"
+    assert any(record.levelname == "ERROR" and "header" in record.getMessage() for record in caplog.records)
@@ -0,0 +1,222 @@
+import asyncio
+import time
+import httpx
+import openai
+import pytest
+from lib_resume_builder_AIHawk.retry_policy import (
+    FATAL, RATE_LIMITED, RETRYABLE, CircuitBreaker, CircuitOpenError, RetryError, RetryPolicy,
+    classify_error, parse_duration, retry_after_seconds,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def api_error(cls, status, headers=None, body=None):
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    response = httpx.Response(status, headers=headers or {}, request=request)
+    return cls(f"error {status}", response=response, body=body)
+
+
+def rate_limit_error(headers=None):
+    return api_error(openai.RateLimitError, 429, headers)
+
+
+def server_error():
+    return api_error(openai.InternalServerError, 500)
+
+
+def failing(*errors, result="ok"):
+    remaining = list(errors)
+
+    def call():
+        if remaining:
+            raise remaining.pop(0)
+        return result
+    return call
+
+
+@pytest.mark.parametrize("value, seconds", [("1s", 1), ("6m0s", 360), ("20ms", 0.02), ("1h2m3.5s", 3723.5), ("2.5", 2.5), ("soon", None)])
+def test_parse_duration(value, seconds):
+    assert parse_duration(value) == seconds
+
+
+def test_retry_after_prefers_headers_then_message():
+    assert retry_after_seconds(rate_limit_error({"retry-after-ms": "1500"})) == 1.5
+    assert retry_after_seconds(rate_limit_error({"x-ratelimit-reset-requests": "2s", "x-ratelimit-reset-tokens": "6m0s"})) == 360
+    assert retry_after_seconds(RuntimeError("Rate limit reached. Please try again in 20ms.")) == 0.02
+    assert retry_after_seconds(RuntimeError("boom")) is None
+
+
+def test_classify_error():
+    assert classify_error(rate_limit_error()) == RATE_LIMITED
+    assert classify_error(server_error()) == RETRYABLE
+    assert classify_error(api_error(openai.BadRequestError, 400)) == FATAL
+    assert classify_error(api_error(openai.RateLimitError, 429, body={"code": "insufficient_quota"})) == FATAL
+    assert classify_error(ConnectionError()) == RETRYABLE
+    assert classify_error(CircuitOpenError("open")) == FATAL
+    assert classify_error(ValueError()) == FATAL
+
+
+def policy(clock, **kwargs):
+    options = dict(max_attempts=5, deadline=60, base_delay=1, max_delay=10, clock=clock, sleep=clock.sleep)
+    options.update(kwargs)
+    return RetryPolicy(**options)
+
+
+def test_retries_transient_errors_then_succeeds():
+    clock = FakeClock()
+    assert policy(clock).call(failing(server_error(), ConnectionError())) == "ok"
+    assert clock.now >= 2
+
+
+def test_fatal_error_is_raised_without_retrying():
+    clock = FakeClock()
+    error = api_error(openai.BadRequestError, 400)
+    with pytest.raises(openai.BadRequestError):
+        policy(clock).call(failing(error))
+    assert clock.now == 0
+
+
+def test_gives_up_after_max_attempts():
+    clock = FakeClock()
+    with pytest.raises(RetryError):
+        policy(clock, max_attempts=3).call(failing(*[server_error()] * 3))
+
+
+def test_wait_that_overruns_the_deadline_ends_retries():
+    clock = FakeClock()
+    with pytest.raises(RetryError):
+        policy(clock, deadline=5).call(failing(rate_limit_error({"retry-after": "30"})))
+    assert clock.now == 0
+
+
+def test_async_attempt_is_cancelled_at_the_deadline():
+    retry_policy = RetryPolicy(max_attempts=5, deadline=0.2, base_delay=0.01, max_delay=0.01)
+
+    async def hang():
+        await asyncio.sleep(3600)
+    started = time.monotonic()
+    with pytest.raises(RetryError) as excinfo:
+        asyncio.run(retry_policy.acall(hang))
+    assert time.monotonic() - started < 2
+    assert isinstance(excinfo.value.__cause__, asyncio.TimeoutError)
+
+
+def test_sync_attempt_is_not_started_without_time_for_the_http_timeout():
+    clock = FakeClock()
+    calls = []
+
+    def slow_failure():
+        calls.append(clock.now)
+        clock.now += 40
+        raise server_error()
+    with pytest.raises(RetryError):
+        policy(clock, attempt_timeout=30).call(slow_failure)
+    # Dopo 40 s ne restano 20: un altro tentativo da 30 s sforerebbe la scadenza di 60 s
+    assert calls == [0]
+
+
+def test_rate_limit_waits_are_handed_to_the_limiter():
+    clock = FakeClock()
+    waits = []
+    result = policy(clock).call(failing(rate_limit_error({"retry-after": "3"})), on_rate_limit=waits.append)
+    assert result == "ok"
+    assert waits and waits[0] >= 3
+    assert clock.now == 0
+
+
+def test_circuit_opens_half_opens_and_closes():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30, clock=clock)
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    clock.now += 30
+    assert breaker.state == "half-open"
+    breaker.before_call()
+    # Una sola chiamata di prova alla volta
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_failed_trial_reopens_the_circuit():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30, clock=clock)
+    breaker.before_call()
+    breaker.record_failure()
+    clock.now += 30
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+
+def test_rate_limits_do_not_open_the_circuit():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30, clock=clock)
+    retry_policy = policy(clock, max_attempts=10, deadline=None, circuit_breaker=breaker)
+    assert retry_policy.call(failing(*[rate_limit_error()] * 6)) == "ok"
+    assert breaker.state == "closed"
+
+
+def test_server_errors_open_the_circuit():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30, clock=clock)
+    with pytest.raises(CircuitOpenError):
+        policy(clock, circuit_breaker=breaker).call(failing(*[server_error()] * 5))
+    assert breaker.state == "open"
+
+
+def open_then_half_open(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30, clock=clock)
+    breaker.before_call()
+    breaker.record_failure()
+    clock.now += 30
+    return breaker
+
+
+def test_cancelled_trial_does_not_leave_the_circuit_stuck():
+    clock = FakeClock()
+    breaker = open_then_half_open(clock)
+    retry_policy = policy(clock, circuit_breaker=breaker)
+
+    async def main():
+        started = asyncio.Event()
+
+        async def hang():
+            started.set()
+            await asyncio.sleep(3600)
+        task = asyncio.create_task(retry_policy.acall(hang))
+        await started.wait()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        async def ok():
+            return "ok"
+        return await retry_policy.acall(ok)
+    assert asyncio.run(main()) == "ok"
+    assert breaker.state == "closed"
+
+
+def test_interrupted_sync_trial_releases_the_circuit():
+    clock = FakeClock()
+    breaker = open_then_half_open(clock)
+    retry_policy = policy(clock, circuit_breaker=breaker)
+    with pytest.raises(KeyboardInterrupt):
+        retry_policy.call(failing(KeyboardInterrupt()))
+    assert retry_policy.call(failing()) == "ok"
+    assert breaker.state == "closed"
@@ -0,0 +1,85 @@
+import pytest
+from pydantic import BaseModel
+from lib_resume_builder_AIHawk.section_cache import SectionFragmentCache, stable_hash
+from lib_resume_builder_AIHawk.sqlite_cache import SQLiteCache
+
+
+class FakeLLM:
+    def __init__(self, **params):
+        self._identifying_params = {"model_name": "gpt-4o-mini", "temperature": 0.4, **params}
+
+
+class Experience(BaseModel):
+    position: str
+    skills_acquired: list = None
+
+
+TEMPLATE = "Write the section for {experience_details}"
+
+
+@pytest.fixture
+def section_cache(tmp_path):
+    cache = SQLiteCache(tmp_path / "cache.sqlite3", table="section_fragments")
+    yield SectionFragmentCache(cache)
+    cache.close()
+
+
+def test_stable_hash_ignores_ordering_of_dicts_and_sets():
+    assert stable_hash({"a": 1, "b": {"x", "y"}}) == stable_hash({"b": {"y", "x"}, "a": 1})
+    assert stable_hash({"a": [1, 2]}) != stable_hash({"a": [2, 1]})
+
+
+def test_stable_hash_of_pydantic_models_uses_their_fields():
+    assert stable_hash(Experience(position="Dev")) == stable_hash({"position": "Dev", "skills_acquired": None})
+    assert stable_hash(Experience(position="Dev")) != stable_hash(Experience(position="Lead"))
+
+
+def test_key_is_prefixed_with_the_section_and_stable():
+    inputs = {"experience_details": [Experience(position="Dev", skills_acquired=["Python"])]}
+    key = SectionFragmentCache.key("work_experience", TEMPLATE, inputs, FakeLLM())
+    assert key.startswith("work_experience:")
+    same_inputs = {"experience_details": [Experience(position="Dev", skills_acquired=["Python"])]}
+    assert SectionFragmentCache.key("work_experience", TEMPLATE, same_inputs, FakeLLM()) == key
+
+
+@pytest.mark.parametrize("change", ["template", "inputs", "params", "bound"])
+def test_key_changes_with_template_inputs_and_model_parameters(change):
+    llm = FakeLLM()
+    template = TEMPLATE
+    inputs = {"experience_details": [Experience(position="Dev")]}
+    key = SectionFragmentCache.key("work_experience", template, inputs, llm)
+    if change == "template":
+        template += "\nKeep it short."
+    elif change == "inputs":
+        inputs = {"experience_details": [Experience(position="Lead")]}
+    elif change == "params":
+        llm = FakeLLM(temperature=0.7)
+    else:
+        # Modello ottenuto con .bind(): gli argomenti fissati fanno parte della chiave
+        llm.kwargs = {"response_format": {"type": "json_schema"}}
+    assert SectionFragmentCache.key("work_experience", template, inputs, llm) != key
+
+
+def test_get_set_and_per_section_stats(section_cache):
+    key = SectionFragmentCache.key("header", "{personal_information}", {"personal_information": {"name": "Ada"}}, FakeLLM())
+    assert section_cache.get("header", key) is None
+    section_cache.set(key, "<header>Ada</header>")
+    assert section_cache.get("header", key) == "<header>Ada</header>"
+    stats = section_cache.stats()
+    assert stats["sections"] == {"header": {"hits": 1, "misses": 1}}
+    assert stats["entries"] == 1
+
+
+def test_invalidate_one_section_or_all(section_cache):
+    llm = FakeLLM()
+    keys = {
+        section: SectionFragmentCache.key(section, TEMPLATE, {"experience_details": []}, llm)
+        for section in ("header", "education", "work_experience")
+    }
+    for section, key in keys.items():
+        section_cache.set(key, f"<{section}/>")
+    assert section_cache.invalidate("education") == 1
+    assert section_cache.get("education", keys["education"]) is None
+    assert section_cache.get("header", keys["header"]) == "<header/>"
+    assert section_cache.invalidate() == 2
+    assert section_cache.get("header", keys["header"]) is None
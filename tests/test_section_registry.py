@@ -0,0 +1,91 @@
+from pathlib import Path
+from types import SimpleNamespace
+import pytest
+from langchain_core.runnables import RunnableLambda
+from lib_resume_builder_AIHawk.gpt_resume import LLMResumer
+from lib_resume_builder_AIHawk.gpt_resume_job_description import LLMResumeJobDescription
+from lib_resume_builder_AIHawk.module_loader import load_module
+from lib_resume_builder_AIHawk.prompt_serializer import EMPTY_VALUE
+from lib_resume_builder_AIHawk.resume import Resume
+from lib_resume_builder_AIHawk.section_registry import SECTIONS, get_prompt_pack
+
+PACKAGE_DIRECTORY = Path(__file__).resolve().parent.parent / "lib_resume_builder_AIHawk"
+RESUME_STRINGS = PACKAGE_DIRECTORY / "resume_prompt" / "strings_feder-cr.py"
+JOB_DESCRIPTION_STRINGS = PACKAGE_DIRECTORY / "resume_job_description_prompt" / "strings_feder-cr.py"
+
+RESUME_YAML = """
+personal_information: {name: Ada, surname: Lovelace, date_of_birth: '1990', country: UK, city: London, address: x,
+                       zip_code: '00100', phone_prefix: '+44', phone: '123', email: ada@example.com}
+experience_details:
+  - {position: Developer, company: Acme, employment_period: 2015 - 2020, location: London, industry: IT,
+     key_responsibilities: [{responsibility_1: Built APIs}], skills_acquired: [Python]}
+certifications:
+  - {name: AWS, description: Cloud}
+"""
+
+
+def strings_copy(path, **overrides):
+    strings = load_module(path, "strings_feder_cr")
+    prompts = {spec.prompt: getattr(strings, spec.prompt) for spec in SECTIONS}
+    prompts["summarize_prompt_template"] = getattr(strings, "summarize_prompt_template", None)
+    prompts.update(overrides)
+    return SimpleNamespace(**prompts)
+
+
+class FakeModel:
+    def __init__(self, llm, cache):
+        self.llm = llm
+        self.cache = cache
+
+    def as_runnable(self):
+        return RunnableLambda(lambda messages: "reply")
+
+
+def test_prompt_pack_is_shared_by_modules_with_the_same_texts():
+    first = get_prompt_pack(load_module(RESUME_STRINGS, "strings_feder_cr"))
+    # load_module crea un modulo nuovo ogni volta: conta il testo dei prompt
+    assert get_prompt_pack(load_module(RESUME_STRINGS, "strings_feder_cr")) is first
+    assert get_prompt_pack(strings_copy(RESUME_STRINGS)) is first
+    assert get_prompt_pack(load_module(JOB_DESCRIPTION_STRINGS, "strings_feder_cr")) is not first
+
+
+def test_prompt_pack_changes_with_any_prompt_text():
+    first = get_prompt_pack(strings_copy(RESUME_STRINGS))
+    changed = get_prompt_pack(strings_copy(RESUME_STRINGS, prompt_header="Header for {personal_information}"))
+    assert changed is not first
+    assert changed.sections["header"].input_variables == ["personal_information"]
+    assert get_prompt_pack(strings_copy(RESUME_STRINGS, summarize_prompt_template="Summarize {text}")) is not first
+
+
+def test_prompt_with_unknown_inputs_is_rejected():
+    with pytest.raises(ValueError, match="unknown inputs"):
+        get_prompt_pack(strings_copy(RESUME_STRINGS, prompt_header="Header for {salary}"))
+
+
+def test_chains_are_cached_per_model_and_cache():
+    prompt_pack = get_prompt_pack(strings_copy(RESUME_STRINGS))
+    llm, cache = object(), object()
+    chain = prompt_pack.chain("header", FakeModel(llm, cache))
+    # Un altro LoggerChatModel sugli stessi client riusa la catena
+    assert prompt_pack.chain("header", FakeModel(llm, cache)) is chain
+    assert prompt_pack.chain("header", FakeModel(llm, object())) is not chain
+    assert prompt_pack.chain("header", FakeModel(object(), cache)) is not chain
+    assert prompt_pack.chain("education", FakeModel(llm, cache)) is not chain
+
+
+def test_resume_without_job_description_plans_its_sections():
+    generator = LLMResumer("sk-test", load_module(RESUME_STRINGS, "strings_feder_cr"))
+    generator.set_resume(Resume(RESUME_YAML))
+    assert generator._planned_sections() == ["header", "work_experience", "certifications", "additional_skills"]
+    # Il prompt generico delle certificazioni cita la job description: resta vuota
+    _, inputs, _ = generator._section_request("certifications")
+    assert inputs["job_description"] == EMPTY_VALUE
+
+
+def test_job_description_generator_requires_a_job_description():
+    generator = LLMResumeJobDescription("sk-test", load_module(JOB_DESCRIPTION_STRINGS, "strings_feder_cr"))
+    generator.set_resume(Resume(RESUME_YAML))
+    with pytest.raises(ValueError, match="No job description"):
+        generator._planned_sections()
+    generator.job_description = "Python developer"
+    assert generator._planned_sections() == ["header", "work_experience", "certifications", "additional_skills"]
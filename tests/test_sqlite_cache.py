@@ -0,0 +1,127 @@
+import threading
+from types import SimpleNamespace
+import pytest
+from lib_resume_builder_AIHawk import sqlite_cache
+from lib_resume_builder_AIHawk.sqlite_cache import SQLiteCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(sqlite_cache, "time", SimpleNamespace(time=lambda: now[0]))
+    return now
+
+
+@pytest.fixture
+def make_cache(tmp_path):
+    caches = []
+
+    def make(**kwargs):
+        cache = SQLiteCache(tmp_path / "cache.sqlite3", **kwargs)
+        caches.append(cache)
+        return cache
+
+    yield make
+    for cache in caches:
+        cache.close()
+
+
+def test_round_trips_json_values(make_cache):
+    cache = make_cache()
+    cache.set("key", {"content": "<p>è</p>", "tokens": [1, 2]})
+    assert cache.get("key") == {"content": "<p>è</p>", "tokens": [1, 2]}
+    assert cache.get("missing", "default") == "default"
+    assert cache.stats() == {"hits": 1, "misses": 1, "hit_rate": 0.5, "entries": 1}
+
+
+def test_entries_expire_after_ttl(make_cache, clock):
+    cache = make_cache(ttl=60)
+    cache.set("key", "value")
+    clock[0] += 60
+    assert cache.get("key") == "value"
+    clock[0] += 1
+    assert cache.get("key") is None
+    # La voce scaduta viene cancellata alla lettura
+    assert len(cache) == 0
+
+
+def test_reading_does_not_extend_ttl(make_cache, clock):
+    cache = make_cache(ttl=60)
+    cache.set("key", "value")
+    clock[0] += 50
+    assert cache.get("key") == "value"
+    clock[0] += 20
+    assert cache.get("key") is None
+
+
+def test_expired_entries_are_purged_on_write(make_cache, clock):
+    cache = make_cache(ttl=60)
+    cache.set("old", 1)
+    clock[0] += 61
+    cache.set("new", 2)
+    assert len(cache) == 1
+    assert cache.get("new") == 2
+
+
+def test_least_recently_used_entries_are_evicted(make_cache, clock):
+    cache = make_cache(max_entries=2)
+    cache.set("a", 1)
+    clock[0] += 1
+    cache.set("b", 2)
+    clock[0] += 1
+    # Leggere "a" la rende la piu' recente: al prossimo inserimento esce "b"
+    assert cache.get("a") == 1
+    clock[0] += 1
+    cache.set("c", 3)
+    assert len(cache) == 2
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_overwriting_a_key_does_not_evict(make_cache, clock):
+    cache = make_cache(max_entries=2)
+    cache.set("a", 1)
+    clock[0] += 1
+    cache.set("b", 2)
+    clock[0] += 1
+    cache.set("a", 10)
+    assert len(cache) == 2
+    assert cache.get("a") == 10 and cache.get("b") == 2
+
+
+def test_delete_prefix_and_tables_are_independent(tmp_path):
+    sections = SQLiteCache(tmp_path / "cache.sqlite3", table="sections")
+    replies = SQLiteCache(tmp_path / "cache.sqlite3", table="replies")
+    try:
+        sections.set("header:1", "a")
+        sections.set("header:2", "b")
+        sections.set("education:1", "c")
+        replies.set("header:1", "reply")
+        assert sections.delete_prefix("header:") == 2
+        assert len(sections) == 1
+        assert replies.get("header:1") == "reply"
+    finally:
+        sections.close()
+        replies.close()
+
+
+def test_invalid_table_name_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        SQLiteCache(tmp_path / "cache.sqlite3", table="entries; DROP TABLE x")
+
+
+def test_concurrent_writers_share_one_connection(make_cache):
+    cache = make_cache(max_entries=50)
+
+    def write(worker):
+        for i in range(25):
+            cache.set(f"{worker}:{i}", i)
+            cache.get(f"{worker}:{i}")
+
+    threads = [threading.Thread(target=write, args=(worker,)) for worker in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(cache) == 50
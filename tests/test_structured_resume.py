@@ -0,0 +1,157 @@
+import asyncio
+import json
+from pathlib import Path
+from typing import List
+import pytest
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import Field
+from lib_resume_builder_AIHawk.config import global_config
+from lib_resume_builder_AIHawk.gpt_resume import LLMResumer, LoggerChatModel
+from lib_resume_builder_AIHawk.module_loader import load_module
+from lib_resume_builder_AIHawk.resume import Resume
+from lib_resume_builder_AIHawk.section_cache import SectionFragmentCache
+from lib_resume_builder_AIHawk.sqlite_cache import SQLiteCache
+from lib_resume_builder_AIHawk.structured_resume import (
+    JOB_DESCRIPTION_REFERENCE,
+    parse_structured_sections,
+    structured_messages,
+    structured_response_format,
+)
+
+RESUME_STRINGS = Path(__file__).resolve().parent.parent / "lib_resume_builder_AIHawk" / "resume_prompt" / "strings_feder-cr.py"
+
+RESUME_YAML = """
+personal_information: {name: Ada, surname: Lovelace, date_of_birth: '1990', country: UK, city: London, address: x,
+                       zip_code: '00100', phone_prefix: '+44', phone: '123', email: ada@example.com}
+experience_details:
+  - {position: Developer, company: Acme, employment_period: 2015 - 2020, location: London, industry: IT,
+     key_responsibilities: [{responsibility_1: Built APIs}], skills_acquired: [Python]}
+certifications:
+  - {name: AWS, description: Cloud}
+"""
+SECTIONS = ["header", "work_experience", "certifications", "additional_skills"]
+
+
+def test_response_format_requires_exactly_the_sections():
+    schema = structured_response_format(["header", "education"])["json_schema"]["schema"]
+    assert schema["required"] == ["header", "education"]
+    assert schema["additionalProperties"] is False
+    assert schema["properties"] == {"header": {"type": "string"}, "education": {"type": "string"}}
+
+
+def test_structured_messages_state_the_job_description_once():
+    requests = {
+        "header": ("Header for {personal_information}", {"personal_information": "name: Ada"}, None),
+        "education": ("Education {education_details} for {job_description}",
+                      {"education_details": "- BSc", "job_description": "Python developer"}, None),
+        "certifications": ("Certifications for {job_description}", {"job_description": "Python developer"}, None),
+    }
+    (message,) = structured_messages(requests).messages
+    assert message.content.count("Python developer") == 1
+    assert message.content.count(JOB_DESCRIPTION_REFERENCE) == 2
+    assert message.content.index("## Job Description") < message.content.index("## Section: header")
+    assert "## Section: education\nEducation - BSc for" in message.content
+
+
+@pytest.mark.parametrize("content", [
+    "not json",
+    '{"header": "<header>Ada</header>", "education": "<sec',
+    "",
+    None,
+    '["<header>Ada</header>"]',
+])
+def test_unusable_replies_yield_no_sections(content, caplog):
+    assert parse_structured_sections(content, ["header", "education"]) == {}
+    assert any(record.levelname == "WARNING" for record in caplog.records)
+
+
+def test_only_valid_sections_are_kept():
+    content = json.dumps({
+        "header": "  <header>Ada</header>\n",
+        "education": "",
+        "work_experience": "Plain text without HTML",
+        "certifications": 42,
+        "footer": "<footer>not requested</footer>",
+    })
+    sections = ["header", "education", "work_experience", "certifications", "side_projects"]
+    assert parse_structured_sections(content, sections) == {"header": "<header>Ada</header>"}
+
+
+class ScriptedChatModel(BaseChatModel):
+    # La risposta strutturata e' configurabile; le richieste per sezione rispondono con un frammento fisso
+    structured_reply: str = ""
+    requests: List[str] = Field(default_factory=list)
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        structured = "response_format" in kwargs
+        self.requests.append("structured" if structured else "section")
+        content = self.structured_reply if structured else "<section>fallback</section>"
+        message = AIMessage(content=content, response_metadata={"model_name": "gpt-4o-mini"},
+                            usage_metadata={"input_tokens": 10, "output_tokens": 5, "total_tokens": 15})
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+class MemoryCache:
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value):
+        self.data[key] = value
+
+
+@pytest.fixture
+def make_generator(tmp_path, monkeypatch):
+    monkeypatch.setattr(global_config, "STRUCTURED_GENERATION", True)
+    cache = SQLiteCache(tmp_path / "sections.sqlite3", table="section_fragments")
+
+    def make(structured_reply):
+        generator = LLMResumer("sk-test", load_module(RESUME_STRINGS, "strings_feder_cr"), SectionFragmentCache(cache))
+        llm = ScriptedChatModel(structured_reply=structured_reply)
+        generator.llm_cheap = LoggerChatModel(llm, cache=MemoryCache())
+        generator.set_resume(Resume(RESUME_YAML))
+        generator.job_description = "Python developer"
+        return generator, llm
+
+    yield make
+    cache.close()
+
+
+def test_invalid_sections_fall_back_to_one_request_each(make_generator):
+    generator, llm = make_generator(json.dumps({
+        "header": "<header>Ada</header>",
+        "work_experience": "<section>Acme</section>",
+        "additional_skills": "",
+        "extra": "<section>ignored</section>",
+    }))
+    html = generator.generate_html_resume()
+    # Una richiesta unica, poi una per ciascuna delle due sezioni mancanti o non valide
+    assert llm.requests == ["structured", "section", "section"]
+    assert "<header>Ada</header>" in html and "<section>Acme</section>" in html
+    assert html.count("<section>fallback</section>") == 2
+    assert "ignored" not in html
+
+
+def test_truncated_reply_falls_back_for_every_section(make_generator):
+    generator, llm = make_generator('{"header": "<header>Ada</header>", "work_experience": "<sect')
+    html = asyncio.run(generator.agenerate_html_resume())
+    assert llm.requests == ["structured"] + ["section"] * len(SECTIONS)
+    assert html.count("<section>fallback</section>") == len(SECTIONS)
+
+
+def test_valid_sections_are_cached_for_the_next_resume(make_generator):
+    reply = json.dumps({section: f"<section>{section}</section>" for section in SECTIONS})
+    generator, llm = make_generator(reply)
+    first = generator.generate_html_resume()
+    assert llm.requests == ["structured"]
+    generator, llm = make_generator(reply)
+    assert generator.generate_html_resume() == first
+    assert llm.requests == []
@@ -0,0 +1,89 @@
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from lib_resume_builder_AIHawk.tracing import NOOP_SPAN, InMemorySpanExporter, current_span, set_span_exporter, span
+
+
+@pytest.fixture
+def exporter():
+    exporter = InMemorySpanExporter()
+    set_span_exporter(exporter)
+    yield exporter
+    set_span_exporter(None)
+
+
+def by_name(exporter):
+    return {recorded.name: recorded for recorded in exporter.spans}
+
+
+def test_spans_are_noop_without_an_exporter():
+    assert span("anything", key="value") is NOOP_SPAN
+    with span("anything") as noop:
+        noop.set_attribute("key", "value")
+    assert current_span() is None
+
+
+def test_nested_spans_share_the_trace(exporter):
+    with span("outer") as outer:
+        with span("inner", section="header") as inner:
+            assert current_span() is inner
+        assert current_span() is outer
+    assert current_span() is None
+    spans = by_name(exporter)
+    assert spans["inner"].parent is spans["outer"]
+    assert spans["inner"].trace_id == spans["outer"].trace_id
+    assert spans["outer"].parent is None
+    assert spans["inner"].to_dict()["parent_id"] == spans["outer"].span_id
+    assert spans["inner"].attributes == {"section": "header"}
+
+
+def test_threads_started_with_a_copied_context_nest_under_the_caller(exporter):
+    def section(name):
+        with span(f"section.{name}"):
+            return threading.get_ident()
+
+    with span("generate") as generate:
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            futures = [executor.submit(contextvars.copy_context().run, section, name) for name in "abc"]
+            threads = {future.result() for future in futures}
+    assert threading.get_ident() not in threads
+    sections = [recorded for recorded in exporter.spans if recorded.name.startswith("section.")]
+    assert len(sections) == 3
+    assert all(recorded.parent is generate and recorded.trace_id == generate.trace_id for recorded in sections)
+
+
+def test_threads_without_the_context_start_their_own_trace(exporter):
+    def orphan():
+        with span("orphan"):
+            pass
+
+    with span("generate") as generate:
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            executor.submit(orphan).result()
+    orphan = by_name(exporter)["orphan"]
+    assert orphan.parent is None and orphan.trace_id != generate.trace_id
+
+
+def test_asyncio_tasks_nest_under_the_caller(exporter):
+    async def section(name):
+        with span(f"section.{name}"):
+            await asyncio.sleep(0.01)
+
+    async def generate():
+        with span("generate") as parent:
+            await asyncio.gather(*(section(name) for name in "ab"))
+        return parent
+
+    parent = asyncio.run(generate())
+    spans = by_name(exporter)
+    assert spans["section.a"].parent is parent and spans["section.b"].parent is parent
+
+
+def test_errors_are_recorded_and_reraised(exporter):
+    with pytest.raises(ValueError):
+        with span("failing"):
+            raise ValueError("bad input")
+    assert by_name(exporter)["failing"].error == "ValueError: bad input"
+    assert current_span() is None
@@ -0,0 +1,87 @@
+import pytest
+from lib_resume_builder_AIHawk.config import global_config
+from lib_resume_builder_AIHawk.usage_accounting import (
+    Base64PDF,
+    call_cost,
+    get_process_usage,
+    model_prices,
+    record_llm_usage,
+    reset_process_usage,
+    track_usage,
+)
+
+
+@pytest.fixture(autouse=True)
+def clean_process_usage():
+    reset_process_usage()
+    yield
+    reset_process_usage()
+
+
+@pytest.mark.parametrize("model_name, entry", [
+    ("gpt-4o-mini", "gpt-4o-mini"),
+    ("gpt-4o-mini-2024-07-18", "gpt-4o-mini"),
+    ("gpt-4o-2024-08-06", "gpt-4o"),
+    ("gpt-4.1-mini-2025-04-14", "gpt-4.1-mini"),
+    ("gpt-4.1-2025-04-14", "gpt-4.1"),
+])
+def test_longest_matching_prefix_wins(model_name, entry):
+    assert model_prices(model_name) is global_config.LLM_PRICES[entry]
+
+
+def test_unknown_models_have_no_price():
+    assert model_prices("claude-3") is None
+    assert model_prices("") is None
+    assert model_prices(None) is None
+    assert call_cost("some-local-model", 1000, 1000) == 0.0
+
+
+def test_call_cost_uses_per_million_prices():
+    # gpt-4o-mini: 0.15 input, 0.60 output per milione di token
+    assert call_cost("gpt-4o-mini-2024-07-18", 1_000_000, 0) == pytest.approx(0.15)
+    assert call_cost("gpt-4o-mini", 2000, 500) == pytest.approx((2000 * 0.15 + 500 * 0.60) / 1_000_000)
+
+
+def test_cached_input_tokens_are_billed_at_the_cached_price():
+    expected = (600 * 2.50 + 400 * 1.25 + 100 * 10.00) / 1_000_000
+    assert call_cost("gpt-4o-2024-08-06", 1000, 100, cached_input_tokens=400) == pytest.approx(expected)
+
+
+def test_missing_cached_price_falls_back_to_input_price(monkeypatch):
+    monkeypatch.setattr(global_config, "LLM_PRICES", {"custom": {"input": 1.0, "output": 2.0}})
+    assert call_cost("custom-v2", 1000, 0, cached_input_tokens=500) == pytest.approx(1000 / 1_000_000)
+
+
+def test_usage_is_tracked_per_generation_model_and_section():
+    with track_usage() as tracker:
+        record_llm_usage("gpt-4o-mini", {"input_tokens": 1000, "output_tokens": 200, "total_tokens": 1200},
+                         section="header")
+        record_llm_usage("gpt-4o-mini", {"input_tokens": 1000, "output_tokens": 200,
+                                         "input_token_details": {"cache_read": 400}}, section="education")
+        record_llm_usage("gpt-4o-mini", {"input_tokens": 1000, "output_tokens": 200}, section="header", cache_hit=True)
+    summary = tracker.summary()
+    assert summary["calls"] == 2 and summary["cache_hits"] == 1
+    assert summary["input_tokens"] == 2000 and summary["cached_input_tokens"] == 400
+    assert summary["total_tokens"] == 2400
+    first = call_cost("gpt-4o-mini", 1000, 200)
+    assert summary["cost"] == pytest.approx(first + call_cost("gpt-4o-mini", 1000, 200, 400))
+    # Le risposte dalla cache non costano: il loro costo va in saved_cost
+    assert summary["saved_cost"] == pytest.approx(first)
+    assert summary["by_section"]["header"]["calls"] == 1
+    assert summary["by_section"]["header"]["cache_hits"] == 1
+    assert summary["by_model"]["gpt-4o-mini"]["calls"] == 2
+    assert get_process_usage()["calls"] == 2
+
+
+def test_calls_outside_track_usage_only_count_for_the_process():
+    record_llm_usage("gpt-4o-mini", {"input_tokens": 10, "output_tokens": 5})
+    with track_usage() as tracker:
+        pass
+    assert tracker.summary()["calls"] == 0
+    assert get_process_usage()["calls"] == 1
+
+
+def test_base64_pdf_is_a_string_carrying_usage():
+    pdf = Base64PDF("JVBERi0=", {"cost": 0.01})
+    assert pdf == "JVBERi0=" and isinstance(pdf, str)
+    assert pdf.usage == {"cost": 0.01}